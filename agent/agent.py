@@ -7,10 +7,10 @@ from typing import Optional, Dict, Any
 from dataclasses import dataclass, field
 from langchain_ollama import OllamaLLM
 
-from agent2.states import AgentState, ActionType, classify_error
-from agent2.memory import AgentMemory
-from agent2.prompts import PromptBuilder
-from agent2.workers import AgentWorker
+from agent.states import AgentState, ActionType, classify_error
+from agent.memory import AgentMemory
+from agent.prompts import PromptBuilder
+from agent.workers import AgentWorker
 from models import extract_sql
 
 
@@ -95,7 +95,7 @@ class NL2SQLAgent:
 
         except Exception as e:
             error_msg = str(e)
-            error_type = classify_error(error_msg)
+            error_type = classify_error(error_msg, e)
 
             return {
                 "error_message": error_msg,
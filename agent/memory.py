@@ -1,7 +1,7 @@
 from typing import List, Dict, Optional, Any
 from dataclasses import dataclass, field
 from datetime import datetime
-from agent2.states import AgentState, ActionType, Checkpoint
+from agent.states import AgentState, ActionType, Checkpoint
 
 @dataclass
 class SQLAttempt:
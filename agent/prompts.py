@@ -4,8 +4,8 @@ Generates state specific prompts for the LLM
 """
 
 from typing import Dict, Optional, List
-from agent2.states import AgentState, ActionType, get_available_actions
-from agent2.memory import AgentMemory, SQLAttempt
+from agent.states import AgentState, ActionType, get_available_actions
+from agent.memory import AgentMemory, SQLAttempt
 from langchain_core.prompts.prompt import PromptTemplate
 from langchain_core.prompts.chat import ChatPromptTemplate
 
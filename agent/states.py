@@ -1,6 +1,8 @@
 from typing import List
 from enum import Enum
 
+from utils.db_pool import QueryTimeoutError
+
 class AgentState(Enum):
     """
     States for the agent state machine.
@@ -80,9 +82,15 @@ STATE_ACTIONS = {
 }
 
 
-def classify_error(error_msg: str) -> ErrorType:
+def classify_error(error_msg: str, error: Exception = None) -> ErrorType:
     error_lower = error_msg.lower()
     
+    # Timeout errors - only QueryTimeoutError (utils.db_pool) or SQLite's own
+    # "interrupted", so e.g. "... maximum ... exceeded" stays in its category
+    if (isinstance(error, QueryTimeoutError) or error_lower.startswith("query timeout:")
+            or error_lower == "interrupted"):
+        return ErrorType.TIMEOUT_ERROR
+    
     syntax_keywords = ["syntax error", "near", "unexpected", "invalid syntax"]
     if any(kw in error_lower for kw in syntax_keywords):
         return ErrorType.SYNTAX_ERROR
@@ -102,8 +110,8 @@ def classify_error(error_msg: str) -> ErrorType:
     if any(kw in error_lower for kw in permission_keywords):
         return ErrorType.PERMISSION_ERROR
     
-    # Timeout errors
-    timeout_keywords = ["timeout", "time limit", "exceeded"]
+    # Other timeouts (driver / connection level)
+    timeout_keywords = ["timeout", "time limit"]
     if any(kw in error_lower for kw in timeout_keywords):
         return ErrorType.TIMEOUT_ERROR
     
@@ -1,9 +1,7 @@
 from typing import Dict, Any, List, Optional
 import json
-from utils.jaccard import retrieve_jaccard_examples
-from utils.intent_clustering import retrieve_intent_based_examples
 from utils.random_examples import create_random_examples
-from agent2.memory import AgentMemory
+from agent.memory import AgentMemory
 
 
 class AgentWorker:
@@ -12,15 +10,24 @@ class AgentWorker:
         self.db_id = db_id
         self.db_path = db_path
         
-    def get_db_schema(self):
-        from utils.RAG_setup import summarize_schema, get_schema_safe
+    def get_db_schema(self, question: str = None, budget: int = 0):
+        """question 과 budget (토큰) 이 있으면 관련 테이블 / 컬럼만 (utils/schema_linking.py)"""
+        from utils.schema_cache import get_schema_info
+        from utils.schema_linking import prune_schema
 
-        schema = get_schema_safe(self.db_id)
-        summary_schema = summarize_schema(schema)
+        if question and budget:
+            pruned = prune_schema(question, self.db_id, budget)
+            if pruned is not None:
+                return {
+                    "structured": pruned.ddl,
+                    "summary": pruned.summary
+                }
+
+        info = get_schema_info(self.db_id)
 
         return {
-            "structured": schema,
-            "summary": summary_schema
+            "structured": info.ddl,
+            "summary": info.summary
         }
     
     def search_similar_examples(self,
@@ -32,9 +39,11 @@ class AgentWorker:
             examples = create_random_examples(k)
         
         elif strategy == "intent clustering":
+            from utils.intent_clustering import retrieve_intent_based_examples
             examples = retrieve_intent_based_examples(question=question, k=k)
         
         elif strategy == "jaccard": 
+            from utils.jaccard import retrieve_jaccard_examples
             examples = retrieve_jaccard_examples(question=question, k=k)
 
         else:
@@ -1,16 +1,43 @@
-from anthropic import Anthropic
+from anthropic import Anthropic, AsyncAnthropic, APIStatusError, APIConnectionError
 from dotenv import load_dotenv
+from email.utils import parsedate_to_datetime
+import asyncio
 import os
+import random
+import threading
+import time
 
 from utils.RAG_setup import summarize_schema
-from models import create_examples, extract_sql
+from utils.schema_linking import schema_for_prompt
+from utils import llm_cache
+from utils.token_count import count_tokens, token_record
+from models import create_examples, extract_sql, SQLStreamExtractor
 
 load_dotenv()
 
+_claude_client = None
+_claude_client_lock = threading.Lock()
+
 def get_claude_client():
-    return Anthropic(api_key=os.getenv("ANTHROPIC_API"))
+    """sync client (처음 쓸 때 한 번 생성, thread 간 공유 - import 만으로는 만들지 않음)"""
+    global _claude_client
+    if _claude_client is None:
+        with _claude_client_lock:
+            if _claude_client is None:
+                _claude_client = Anthropic(api_key=os.getenv("ANTHROPIC_API"))
+    return _claude_client
+
+def get_async_claude_client():
+    # SDK 자체 retry 는 끄고 _with_retry 에서 backoff 처리
+    # ANTHROPIC_BASE_URL 로 로컬 stub 서버를 가리킬 수 있음 (scripts/claude_stub_server.py)
+    return AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API"), max_retries=0)
 
-claude_client = get_claude_client()
+CLAUDE_MODEL = "claude-sonnet-4-5-20250929"
+MAX_RETRIES = 6
+BACKOFF_BASE = 1.0 # 초
+BACKOFF_MAX = 60.0
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+FALLBACK_SQL = "SELECT * LIMIT 1"
 
 
 top_k = 5
@@ -18,19 +45,42 @@ K = 5
 
 NOLIMIT_PREFIX="You are a SQLite expert. Learn these natural languages to SQL examples."
 K0_PREFIX="You are a SQLite expert."
-SUFFIX="""
-Now, given the following question, generate the correct SQL query:
-
-Critical Rules:
-1. If a table/column is not in the schema above, you CANNOT use it
+RULES="""Critical Rules:
+1. If a table/column is not in the database schema, you CANNOT use it
 2. Check spelling carefully (case-sensitive)
 3. Do NOT use common sense - use ONLY what's in the schema
-4. Return ONLY the SQL query
+4. Return ONLY the SQL query"""
+SUFFIX="""Now, given the following question, generate the correct SQL query:
 
 Question: 
 """
 
-def generate_sql_claude(question: str, schema: str, args):
+# prompt caching: 이 block 까지의 prefix 를 캐시 (system 규칙 / DB 스키마)
+CACHE_CONTROL = {"type": "ephemeral"}
+# API 가 캐시하는 최소 prefix 길이 (Sonnet 1024 토큰) - 이보다 짧은 prefix 의 cache_control 은 무시됨
+CACHE_MIN_TOKENS = 1024
+
+def build_message_params(question: str, schema: str, args, examples=None) -> dict:
+    """messages.create 에 넘길 파라미터 (sync / async / batch 공통)"""
+    schema_summary = summarize_schema(schema)
+    if examples is None:
+        examples = create_examples(question, schema_summary, args)
+    examples = format_claude_examples(examples)
+    # --schema-budget 이면 prompt 에는 질문과 관련된 부분만 (few-shot 검색은 전체 요약 기준)
+    prompt_schema = schema_for_prompt(question, schema, getattr(args, "schema_budget", 0))
+    system, content = create_prompt(question, prompt_schema, args, examples)
+
+    return {
+        "model": CLAUDE_MODEL,
+        "max_tokens": 2048,
+        "temperature": 0,
+        "system": system,
+        "messages": [
+            {"role": "user", "content": content}
+        ]
+    }
+
+def generate_sql_claude(question: str, schema: str, args, examples=None, stats=None):
     """
     Generate sql using Claude API
     
@@ -38,27 +88,35 @@ def generate_sql_claude(question: str, schema: str, args):
     :type question: str
     :param schema: DB schema info
     :type schema: str
+    :param examples: prefetched few-shot examples (None 이면 여기서 생성)
+    :param stats: 기록용 dict - usage (input / output / cache read / cache write 토큰), cache (hit / miss),
+                  latency (초), args.stream 이면 time_to_sql
  
     :return: SQL Query string
     :rtype: str
     """
-    schema_summary = summarize_schema(schema)
-    examples = create_examples(question, schema_summary, args)
-    examples = format_claude_examples(examples)
-    prompt = create_prompt(question, schema_summary, args, examples)
+    stats = {} if stats is None else stats
+    prompt_start = time.perf_counter()
+    params = build_message_params(question, schema, args, examples)
+    stats["prompt_time"] = time.perf_counter() - prompt_start
+    key, text = lookup_response(args, params, stats)
+    if text is not None:
+        record_tokens(stats, params, question, text)
+        return extract_sql(text.strip())
 
+    start = time.perf_counter()
     try:
-        message = claude_client.messages.create(
-            model="claude-sonnet-4-5-20250929",
-            max_tokens=2048,
-            temperature=0,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
-
-        sql_response = message.content[0].text.strip()
-        sql = extract_sql(sql_response)
+        if args.stream:
+            sql_response = stream_claude(get_claude_client(), params, stats, start)
+        else:
+            message = get_claude_client().messages.create(**params)
+            stats["usage"] = usage_dict(message.usage)
+            sql_response = message.content[0].text
+        stats["latency"] = time.perf_counter() - start
+        record_tokens(stats, params, question, sql_response, stats["latency"])
+
+        store_response(key, sql_response)
+        sql = extract_sql(sql_response.strip())
 
         return sql
     except Exception as e:
@@ -66,6 +124,235 @@ def generate_sql_claude(question: str, schema: str, args):
         raise
 
 
+def stream_claude(client, params: dict, stats: dict, start: float) -> str:
+    """
+    streaming 으로 받다가 SQL 이 완성되면 stream 을 닫음 (이후 토큰은 생성/과금되지 않음)
+
+    stats: time_to_sql (초), usage (닫는 시점까지), stopped_early
+    """
+    extractor = SQLStreamExtractor()
+    with client.messages.stream(**params) as stream:
+        for text in stream.text_stream:
+            if extractor.feed(text):
+                break
+        stats["time_to_sql"] = time.perf_counter() - start
+        stats["usage"] = usage_dict(stream.current_message_snapshot.usage)
+    stats["stopped_early"] = extractor.done
+    return extractor.text
+
+
+async def stream_claude_async(client, params: dict, stats: dict, start: float) -> str:
+    """stream_claude 의 async 버전"""
+    extractor = SQLStreamExtractor()
+    async with client.messages.stream(**params) as stream:
+        async for text in stream.text_stream:
+            if extractor.feed(text):
+                break
+        stats["time_to_sql"] = time.perf_counter() - start
+        stats["usage"] = usage_dict(stream.current_message_snapshot.usage)
+    stats["stopped_early"] = extractor.done
+    return extractor.text
+
+
+def lookup_response(args, params: dict, stats: dict):
+    """요청 전체 (system / messages / model / temperature) 로 응답 캐시 조회"""
+    key, text = llm_cache.lookup(args, "anthropic", params["model"], params["temperature"], params)
+    if key is not None:
+        stats["cache"] = "hit" if text is not None else "miss"
+    return key, text
+
+
+def prompt_parts(params: dict, question: str) -> dict:
+    """build_message_params 결과를 instructions / schema / examples / question 텍스트로 (토큰 계산용)"""
+    system = "".join(block["text"] for block in params["system"])
+    schema_block, tail = (block["text"] for block in params["messages"][0]["content"])
+    examples, _, _ = tail.rpartition(SUFFIX)
+    return {
+        "instructions": system + SUFFIX + "\nSQL Query:",
+        "schema": schema_block,
+        "examples": examples,
+        "question": question
+    }
+
+
+def record_tokens(stats: dict, params: dict, question: str, text: str, seconds: float = None):
+    """stats["tokens"]: usage 가 있으면 Claude 가 알려준 토큰 수, 없으면 (캐시 hit) 로컬 tokenizer"""
+    usage = stats.get("usage")
+    prompt_tokens = completion_tokens = None
+    if usage is not None:
+        prompt_tokens = (usage["input_tokens"] + usage["cache_read_input_tokens"]
+                         + usage["cache_creation_input_tokens"])
+        # stream 을 일찍 닫으면 최종 output_tokens (message_delta) 를 받지 못함 → 로컬 tokenizer
+        completion_tokens = None if stats.get("stopped_early") else usage["output_tokens"]
+    stats["tokens"] = token_record(prompt_parts(params, question), text,
+                                   prompt_tokens, completion_tokens, seconds)
+
+
+def store_response(key, text: str):
+    llm_cache.store(key, "anthropic", CLAUDE_MODEL, text)
+
+
+
+def retry_delay(attempt: int, error: Exception) -> float:
+    """
+    재시도 대기 시간: retry-after 헤더가 있으면 그 값, 없으면 full-jitter exponential backoff
+    """
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+            except (TypeError, ValueError):
+                delay = None
+        if delay is not None:
+            # 여러 요청이 동시에 깨어나지 않도록 약간의 jitter
+            return max(0.0, delay) + random.uniform(0, BACKOFF_BASE)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, APIStatusError):
+        return error.status_code in RETRYABLE_STATUS
+    return isinstance(error, APIConnectionError) # timeout 포함
+
+
+async def _with_retry(stats: dict, call):
+    """call() 이 만드는 coroutine 을 재시도 가능한 오류면 backoff 후 다시 실행"""
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            return await call()
+        except Exception as e:
+            if attempt == MAX_RETRIES or not is_retryable(e):
+                raise
+            delay = retry_delay(attempt, e)
+            stats["retries"] = stats.get("retries", 0) + 1
+            stats["backoff"] = stats.get("backoff", 0.0) + delay
+            await asyncio.sleep(delay)
+
+
+async def generate_sql_claude_async(client, question: str, schema: str, args,
+                                    examples=None, semaphore=None, stats=None):
+    """
+    generate_sql_claude 의 async 버전 (429 / overload 는 backoff 후 재시도)
+
+    :param client: AsyncAnthropic (get_async_claude_client)
+    :param semaphore: 동시에 보내는 요청 수 제한 (asyncio.Semaphore)
+    :param stats: 요청별 기록용 dict - latency (초, 재시도 포함), retries, backoff, usage
+                  (args.stream 이면 time_to_sql 도)
+    :return: SQL Query string
+    """
+    stats = {} if stats is None else stats
+    prompt_start = time.perf_counter()
+    params = build_message_params(question, schema, args, examples)
+    stats["prompt_time"] = time.perf_counter() - prompt_start
+    key, text = lookup_response(args, params, stats)
+    if text is not None:
+        record_tokens(stats, params, question, text)
+        return extract_sql(text.strip())
+
+    async def create():
+        message = await client.messages.create(**params)
+        stats["usage"] = usage_dict(message.usage)
+        return message.content[0].text
+
+    async with semaphore or asyncio.Semaphore(1):
+        start = time.perf_counter()
+        try:
+            if args.stream:
+                text = await _with_retry(stats, lambda: stream_claude_async(client, params, stats, start))
+            else:
+                text = await _with_retry(stats, create)
+        finally:
+            stats["latency"] = time.perf_counter() - start
+    record_tokens(stats, params, question, text, stats["latency"])
+    store_response(key, text)
+
+    return extract_sql(text.strip())
+
+
+async def generate_sql_claude_many(requests: list, args) -> list:
+    """
+    여러 질문을 동시에 (최대 args.concurrency 개) Claude 로 보냄
+
+    :param requests: list of (question, schema, examples)
+    :return: 입력 순서대로 (sql, stats). 재시도 후에도 실패하면 FALLBACK_SQL 과 stats["error"]
+    """
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with get_async_claude_client() as client:
+        async def one(question, schema, examples):
+            stats = {}
+            try:
+                sql = await generate_sql_claude_async(client, question, schema, args,
+                                                      examples, semaphore, stats)
+            except Exception as e:
+                print(f"Error calling Claude API: {e}")
+                stats["error"] = str(e)
+                sql = FALLBACK_SQL
+            return sql, stats
+
+        return await asyncio.gather(*(one(*request) for request in requests))
+
+
+def generate_sql_claude_batch(requests: list, args) -> list:
+    """
+    Message Batches API 로 배치 전체를 한 번에 제출하고 끝날 때까지 polling
+
+    :param requests: list of (question, schema, examples)
+    :return: 입력 순서대로 (sql, stats). 실패/만료된 요청은 FALLBACK_SQL 과 stats["error"]
+             응답 캐시에 있는 요청은 제출하지 않음
+    """
+    responses = [None] * len(requests)
+    batch_requests = []
+    keys = {}
+    for i, (question, schema, examples) in enumerate(requests):
+        prompt_start = time.perf_counter()
+        params = build_message_params(question, schema, args, examples)
+        stats = {"prompt_time": time.perf_counter() - prompt_start}
+        key, text = lookup_response(args, params, stats)
+        if text is not None:
+            record_tokens(stats, params, question, text)
+            responses[i] = (extract_sql(text.strip()), stats)
+        else:
+            keys[i] = (key, stats, params, question)
+            batch_requests.append({"custom_id": f"q-{i}", "params": params})
+
+    if not batch_requests:
+        return responses
+
+    client = get_claude_client()
+    start = time.perf_counter()
+    batch = client.messages.batches.create(requests=batch_requests)
+    print(f"Submitted Claude batch {batch.id} ({len(batch_requests)} requests)")
+    while batch.processing_status != "ended":
+        time.sleep(args.batch_poll)
+        batch = client.messages.batches.retrieve(batch.id)
+        counts = batch.request_counts
+        print(f"Batch {batch.id}: {batch.processing_status} "
+              f"(processing {counts.processing}, succeeded {counts.succeeded}, errored {counts.errored})")
+    elapsed = time.perf_counter() - start
+
+    for i, (_, stats, _, _) in keys.items():
+        responses[i] = (FALLBACK_SQL, dict(stats, error="missing from batch results", latency=elapsed))
+    for entry in client.messages.batches.results(batch.id):
+        i = int(entry.custom_id.split("-", 1)[1])
+        if entry.result.type == "succeeded":
+            message = entry.result.message
+            key, stats, params, question = keys[i]
+            store_response(key, message.content[0].text)
+            sql = extract_sql(message.content[0].text.strip())
+            stats = dict(stats, latency=elapsed, usage=usage_dict(message.usage))
+            # batch 는 요청별 생성 시간을 알 수 없어서 tokens/s 없음
+            record_tokens(stats, params, question, message.content[0].text)
+            responses[i] = (sql, stats)
+        else:
+            print(f"Batch request {entry.custom_id} {entry.result.type}")
+            responses[i] = (FALLBACK_SQL, dict(keys[i][1], error=entry.result.type, latency=elapsed))
+    return responses
+
 
 def format_claude_examples(examples):
     """
@@ -84,20 +371,43 @@ def format_claude_examples(examples):
     return formatted
 
 def create_prompt(question: str, schema: str, args, examples):
+    """
+    prompt 를 캐시 가능한 순서의 content block 으로 구성
+
+    1. system: 고정 지시문 + 규칙 (run 전체에서 동일)           ← cache breakpoint
+    2. user[0]: DB 스키마 요약 (같은 db_id 의 질문끼리 동일)      ← cache breakpoint
+    3. user[1]: few-shot 예제 + 질문 (질문마다 다름)
+
+    breakpoint 는 그 block 까지의 prefix 가 CACHE_MIN_TOKENS 이상일 때만 (로컬 tokenizer 추정)
+    → 작은 Spider 스키마는 대부분 최소 길이에 못 미쳐서 표시하지 않음 (cache read 0 이 정상)
+
+    :return: (system blocks, user content blocks)
+    """
     if args.k_examples > 0:
         prefix = NOLIMIT_PREFIX
     else:
         prefix = K0_PREFIX
-    suffix = SUFFIX
-    prompt = f"""{prefix}
-
-    {examples}
 
-    Database schema:
-    {schema}
+    system = [
+        {"type": "text", "text": f"{prefix}\n\n{RULES}"}
+    ]
+    content = [
+        {"type": "text", "text": f"Database schema:\n{schema}"},
+        {"type": "text", "text": f"{examples}{SUFFIX}{question}\nSQL Query:"}
+    ]
+    prefix_tokens = 0
+    for block in (system[0], content[0]):
+        prefix_tokens += count_tokens(block["text"])
+        if prefix_tokens >= CACHE_MIN_TOKENS:
+            block["cache_control"] = CACHE_CONTROL
+    return system, content
 
-    {suffix}    
-    {question}
-    SQL Query:"""
 
-    return prompt
\ No newline at end of file
+def usage_dict(usage) -> dict:
+    """Claude usage → 토큰 수 dict (캐시 필드가 없으면 0)"""
+    return {
+        "input_tokens": usage.input_tokens or 0,
+        "output_tokens": usage.output_tokens or 0,
+        "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", None) or 0,
+        "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", None) or 0
+    }
@@ -1,10 +1,50 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
+"""
+DATABASE_URL 의 SQLAlchemy engine
+
+import 시에는 .env 만 읽고, engine / Base 는 처음 쓸 때 생성 (sqlalchemy import 포함)
+→ DATABASE_URL 이 없어도 import 는 실패하지 않고, get_engine() 을 부를 때 에러
+"""
+
 import os
+import threading
+
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL)
-Base = declarative_base()
\ No newline at end of file
+
+_engine = None
+_base = None
+_lock = threading.Lock()
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                if not DATABASE_URL:
+                    raise RuntimeError("DATABASE_URL is not set (add it to .env or the environment)")
+                from sqlalchemy import create_engine
+                _engine = create_engine(DATABASE_URL)
+    return _engine
+
+
+def get_base():
+    global _base
+    if _base is None:
+        with _lock:
+            if _base is None:
+                from sqlalchemy.orm import declarative_base
+                _base = declarative_base()
+    return _base
+
+
+def __getattr__(name):
+    # 기존 `from database import engine, Base` 호환
+    if name == "engine":
+        return get_engine()
+    if name == "Base":
+        return get_base()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
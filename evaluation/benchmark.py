@@ -1,9 +1,16 @@
 import json
 from pathlib import Path
-from models import generate_sql, run_db
-from claude_integration import generate_sql_claude
+from models import generate_sql, run_db, prefetch_examples, create_examples, BATCH_STRATEGIES
 from utils.classifier import classify_level
 from utils.RAG_setup import summarize_schema, get_schema_safe
+from utils import schema_catalog
+from utils.db_pool import QueryTimeoutError
+from evaluation.execution_accuracy import evaluate_execution, report_execution_accuracy
+from evaluation.run_log import RunLog, run_config, load_results, legacy_result, SEED
+from evaluation.timings import summarize_timings, write_timings, print_timings
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
 import time
 import random
 
@@ -12,7 +19,261 @@ spider_db_dir_path = text2sql_path.parent / "spider" / "database"
 spider_dir_path = text2sql_path.parent / "spider"
 
 
-def run_spider_benchmark(args):
+def generate_prediction(question, schema, db_path, examples, args, stats):
+    if args.model == 'sonnet':
+        # anthropic SDK 는 sonnet 을 쓸 때만 import
+        from claude_integration import generate_sql_claude
+        return generate_sql_claude(question,
+                                   schema,
+                                   args,
+                                   examples,
+                                   stats)
+    # Generate SQL 
+    return generate_sql(question,
+                        schema,
+                        args,
+                        f"sqlite:///{db_path}",
+                        examples,
+                        stats)
+
+
+def run_example(item, examples, args, llm_slots, generated=None, timings=None):
+    """
+    예제 하나: SQL 생성 → 실행 → 결과 dict
+
+    :param item: (idx, example, db_path, schema, summarized_schema)
+    :param examples: prefetch 된 few-shot 예제
+    :param llm_slots: 동시에 진행 중인 LLM 호출 수를 제한하는 semaphore
+    :param generated: 이미 생성된 (SQL, stats) (async / batch claude 모드) - 있으면 LLM 호출 생략
+    :param timings: 앞 단계 (schema / retrieval) 시간 - prompt / llm / execution 을 더해서 result["timings"] 로
+                    (run log / timings.json 에만, predictions-*.json 에는 빠짐)
+    """
+    timings = dict(timings or {})
+    idx, example, db_path, schema, summarized_schema = item
+    question = example["question"]
+    db_id = example["db_id"]
+    gold_sql = example["query"]
+
+    if generated is None:
+        stats = {}
+        with llm_slots:
+            start = time.perf_counter()
+            predicted_sql = generate_prediction(question, schema, db_path, examples, args, stats)
+            generation_time = time.perf_counter() - start
+        timings["prompt"] = stats.get("prompt_time", 0.0)
+        timings["llm"] = generation_time - timings["prompt"]
+    else:
+        predicted_sql, stats = generated
+        timings["prompt"] = stats.get("prompt_time", 0.0)
+        timings["llm"] = stats.get("latency", 0.0)
+    
+    # print(f"[{idx}] Generated: {predicted_sql}")
+    level, counts = classify_level(gold_sql)
+    # print(f"*** predicted sql: {predicted_sql}")
+    # print(f"[{idx}] Running DB...")
+    execution_start = time.perf_counter()
+    try:
+        predicted_result = run_db(predicted_sql,
+                                  f"sqlite:///{db_path}",
+                                  args.sql_timeout,
+                                  args.max_rows)
+        # print(f"[{idx}] Result: {predicted_result}")
+        print(f"Success: {idx} / {args.batch}")
+
+        result = {
+            "question": question,
+            "schema": summarized_schema,
+            "predicted_sql": predicted_sql,
+            "predicted_result": predicted_result,
+            "gold_sql": gold_sql,
+            "level": level,
+            "db_id": db_id,
+            "success": True
+        }
+    
+    except Exception as e:
+        # print(f"Error on example {idx}: {str(e)}")
+        # print(f"Error on {idx}: ({type(e).__name__})")
+        print(f"{'Timeout' if isinstance(e, QueryTimeoutError) else 'Failed'}: {idx} / {args.batch}")
+        result = {
+            "question": question,
+            "schema": summarized_schema,
+            "predicted_sql": predicted_sql, # fallback
+            "predicted_result": None,
+            "gold_sql": gold_sql,
+            "level": None,
+            "db_id": db_id,
+            "success": False,
+            "timeout": isinstance(e, QueryTimeoutError),
+            "error": str(e)
+        }
+    timings["execution"] = time.perf_counter() - execution_start
+
+    if "usage" in stats:
+        result["usage"] = stats["usage"]
+    if "cache" in stats:
+        result["cache"] = stats["cache"]
+    if "output_tokens" in stats:
+        result["output_tokens"] = stats["output_tokens"]
+    if "tokens" in stats:
+        result["tokens"] = stats["tokens"]
+    for key in ("latency", "time_to_sql"):
+        if key in stats:
+            result[key] = round(stats[key], 4)
+    result["timings"] = {stage: round(seconds, 6) for stage, seconds in timings.items()}
+    return result
+
+
+def report_claude_latency(stats: list):
+    latencies = sorted(st["latency"] for st in stats if "latency" in st)
+    if not latencies:
+        return
+    retries = sum(st.get("retries", 0) for st in stats)
+    errors = sum(1 for st in stats if "error" in st)
+    print(f"Claude latency: mean {sum(latencies)/len(latencies):.2f}s, "
+          f"p50 {latencies[len(latencies)//2]:.2f}s, max {latencies[-1]:.2f}s "
+          f"(retries: {retries}, failed: {errors})")
+
+
+def report_llm_latency(results: list):
+    """LLM 호출 latency 와 (--stream) SQL 이 완성되기까지의 시간 (캐시 hit 은 제외)"""
+    latencies = [r["latency"] for r in results if "latency" in r]
+    if not latencies:
+        return
+    line = f"LLM latency: mean {sum(latencies)/len(latencies):.2f}s"
+    to_sql = [r["time_to_sql"] for r in results if "time_to_sql" in r]
+    if to_sql:
+        line += f", time-to-SQL mean {sum(to_sql)/len(to_sql):.2f}s"
+    print(line)
+
+
+def report_token_usage(results: list):
+    """Claude usage 합계 (prompt cache read / write 포함)"""
+    usages = [r["usage"] for r in results if "usage" in r]
+    if not usages:
+        return None
+    total = {key: sum(u[key] for u in usages) for key in usages[0]}
+    print(f"Claude tokens: input {total['input_tokens']}, output {total['output_tokens']}, "
+          f"cache read {total['cache_read_input_tokens']}, cache write {total['cache_creation_input_tokens']}")
+    if not total["cache_read_input_tokens"] and not total["cache_creation_input_tokens"]:
+        from claude_integration import CACHE_MIN_TOKENS
+        print(f"  (prompt caching inactive: system + schema prefix below the {CACHE_MIN_TOKENS}-token minimum)")
+    return total
+
+
+def report_generated_tokens(results: list):
+    """Ollama 질문당 평균 생성 토큰 수 (eval_count, 캐시 hit 은 제외)"""
+    counts = [r["output_tokens"] for r in results if "output_tokens" in r]
+    if not counts:
+        return None
+    mean = sum(counts) / len(counts)
+    print(f"Generated tokens: mean {mean:.1f}, max {max(counts)} ({len(counts)} requests)")
+    return mean
+
+
+def report_prompt_tokens(results: list):
+    """
+    prompt 부분별 평균 글자 / 토큰 수와 비중, completion 토큰, tokens/s
+
+    :return: 요약 dict (기록이 없으면 None)
+    """
+    records = [r["tokens"] for r in results if "tokens" in r]
+    if not records:
+        return None
+    n = len(records)
+    parts = {}
+    for part in records[0]["parts"]:
+        chars = sum(rec["parts"][part]["chars"] for rec in records) / n
+        tokens = sum(rec["parts"][part]["tokens"] for rec in records) / n
+        parts[part] = {"chars": chars, "tokens": tokens}
+    local_total = sum(entry["tokens"] for entry in parts.values()) or 1
+    rates = [rec["tokens_per_second"] for rec in records if rec["tokens_per_second"]]
+    summary = {
+        "examples": n,
+        "parts": parts,
+        "prompt_tokens": sum(rec["prompt_tokens"] for rec in records) / n,
+        "completion_tokens": sum(rec["completion_tokens"] for rec in records) / n,
+        "tokens_per_second": sum(rates) / len(rates) if rates else None,
+        "sources": sorted({rec["source"] for rec in records})
+    }
+
+    print(f"Prompt tokens per example ({', '.join(summary['sources'])}): "
+          f"mean {summary['prompt_tokens']:.0f}, completion {summary['completion_tokens']:.1f}"
+          + (f", {summary['tokens_per_second']:.1f} tok/s" if rates else ""))
+    for part, entry in parts.items():
+        print(f"  {part:<13}{entry['chars']:>8.0f} chars {entry['tokens']:>7.0f} tokens "
+              f"({entry['tokens'] / local_total * 100:>4.1f}%)")
+    return summary
+
+
+def report_cache_usage(results: list):
+    """LLM 응답 캐시 hit / miss 수 (--no-cache 면 None)"""
+    states = [r["cache"] for r in results if "cache" in r]
+    if not states:
+        return None
+    counts = {"hits": states.count("hit"), "misses": states.count("miss")}
+    print(f"LLM cache: hits {counts['hits']}, misses {counts['misses']}")
+    return counts
+
+
+def prepare_batch(dev_data: list, args, done=(), shared=None) -> tuple:
+    """
+    batch 를 sample 하고 스키마 / few-shot 예제를 준비 (이미 끝난 idx 는 마지막에 제외)
+
+    random 전략은 random 전역 상태를 순서대로 소비하므로, 예제는 끝난 예제까지 포함한 batch 전체에 대해
+    계산한 뒤에 done 을 거른다 → --resume 해도 끊기지 않은 실행과 같은 예제
+
+    :param done: 이미 끝난 idx (RunLog.done)
+    :return: (items, 예제별 few-shot 예제, 예제별 schema / retrieval 시간, 배치 검색 시간) - 앞의 셋은 같은 순서
+             배치 검색 시간은 BATCH_STRATEGIES 일 때 {"seconds", "examples"} (아니면 None, retrieval 은 예제별)
+    """
+    random.seed(SEED)
+    batch = random.sample(dev_data, args.batch)
+    # RELOAD_COUNT = 108
+    items = []
+    stage_times = []  # items 와 같은 순서, 예제별 schema / retrieval 시간
+    for idx, example in enumerate(batch, 1):
+        db_id = example["db_id"]
+        db_path = spider_db_dir_path / db_id / f"{db_id}.sqlite"
+
+        if not db_path.exists():
+            print(f"Warning: DB db_id = {db_id} not found")
+            continue
+        start = time.perf_counter()
+        schema = get_schema_safe(db_id)
+        items.append((idx, example, db_path, schema, summarize_schema(schema)))
+        stage_times.append({"schema": time.perf_counter() - start})
+
+    # few-shot 예제를 배치 전체에 대해 미리 검색 (rag 는 batch search 1회)
+    # claude 경로는 요약 스키마, ollama 경로는 원본 스키마로 예제를 만든다
+    pairs = [(example["question"], summary if args.model == 'sonnet' else schema)
+             for _, example, _, schema, summary in items]
+    retrieval_batch = None
+    if args.strategy in BATCH_STRATEGIES:
+        # 배치 검색은 예제별로 나눌 수 없음 - 배치 전체 시간만 따로 기록
+        start = time.perf_counter()
+        if shared is not None:
+            all_examples = shared.examples(pairs, args, prefetch_examples)
+        else:
+            all_examples = prefetch_examples(pairs, args)
+        retrieval_batch = {"seconds": time.perf_counter() - start, "examples": len(items)}
+    else:
+        # random / fixed / ic 는 질문마다 계산 (prefetch_examples 와 같은 순서) → 예제별 시간
+        all_examples = []
+        for (question, schema), times in zip(pairs, stage_times):
+            start = time.perf_counter()
+            all_examples.append(create_examples(question, schema, args))
+            times["retrieval"] = time.perf_counter() - start
+
+    keep = [row for row, item in enumerate(items) if item[0] not in done]
+    return ([items[row] for row in keep], [all_examples[row] for row in keep],
+            [stage_times[row] for row in keep], retrieval_batch)
+
+
+def run_spider_benchmark(args, shared=None):
+    """
+    :param shared: sweep 모드에서 조합 간에 공유하는 dev 데이터 / 검색 결과 (evaluation.sweep.SweepContext)
+    """
     print(f"example_type: {args.strategy}")
     examples_path = spider_dir_path / "evaluation_examples" / "examples"
     dev_json_path = examples_path  / "dev.json"
@@ -23,105 +284,109 @@ def run_spider_benchmark(args):
     if not tables_json_path.exists():
         raise FileNotFoundError(f"Spider tables.json not found at {tables_json_path}")
     
-    with open(dev_json_path, "r") as f:
-        dev_data = json.load(f)
+    if shared is not None:
+        dev_data = shared.dev_data
+    else:
+        with open(dev_json_path, "r") as f:
+            dev_data = json.load(f)
 
-    predictions = []
-    results = []
+    # 전체 DB 스키마를 tables.json 에서 한 번에 로드
+    catalog = schema_catalog.get_catalog()
+    print(f"Loaded schema catalog: {len(catalog)} databases")
+
+    output_dir = Path(__file__).parent.parent / "output" / f"{args.model}_{args.batch}_k-{args.k_examples}"
+    # 예제가 끝날 때마다 run-*.jsonl 에 추가 (--resume 이면 이미 끝난 예제는 건너뜀)
+    run_log = RunLog(output_dir / f"run-{args.strategy}.jsonl", run_config(args), args.resume)
+    if run_log.done:
+        print(f"Resuming: {len(run_log.done)} examples already done")
 
     print(f"Starting Spider benchmark on {args.batch} examples .... ")
     start_time = time.time()
-    random.seed(88)
-    batch = random.sample(dev_data, args.batch)
-    # RELOAD_COUNT = 108
-    for idx, example in enumerate(batch, 1):
-        question = example["question"]
-        db_id = example["db_id"]
-        gold_sql = example["query"]
-        db_path = spider_db_dir_path / db_id / f"{db_id}.sqlite"
+    items, all_examples, stage_times, retrieval_batch = prepare_batch(dev_data, args, run_log.done, shared)
+
+    # --claude-mode async: 배치 전체 SQL 을 먼저 async 로 생성 (동시 요청 --concurrency 개)
+    # --claude-mode batch: Message Batches API 로 한 번에 제출 후 polling
+    generated = [None] * len(items)
+    if args.model == 'sonnet' and args.claude_mode in ('async', 'batch'):
+        from claude_integration import generate_sql_claude_many, generate_sql_claude_batch
+        requests = [(example["question"], schema, examples)
+                    for (_, example, _, schema, _), examples in zip(items, all_examples)]
+        if args.claude_mode == 'async':
+            responses = asyncio.run(generate_sql_claude_many(requests, args))
+        else:
+            responses = generate_sql_claude_batch(requests, args)
+        generated = responses
+        report_claude_latency([stats for _, stats in responses])
+
+    # --workers N: 예제 단위로 병렬 실행, LLM 호출은 --max-inflight 개까지만 동시에
+    # executor.map 은 입력 순서대로 결과를 돌려주므로 pred-*.sql 순서는 그대로
+    llm_slots = threading.BoundedSemaphore(args.max_inflight or args.workers)
+    with run_log, ThreadPoolExecutor(max_workers=args.workers) as executor:
+        outcomes = executor.map(
+            lambda task: run_example(task[0], task[1], args, llm_slots, task[2], task[3]),
+            zip(items, all_examples, generated, stage_times)
+        )
+        for count, (item, result) in enumerate(zip(items, outcomes), len(run_log.done) + 1):
+            run_log.append(item[0], result)
+            if count % 10 == 0:
+                print(f"Progress: {count} / {args.batch}")
 
-        if not db_path.exists():
-            print(f"Warning: DB db_id = {db_id} not found")
-            continue
-        schema = get_schema_safe(db_id)
-        summarized_schema = summarize_schema(schema)
-        if args.model == 'sonnet':
-            predicted_sql = generate_sql_claude(question,
-                                                schema,
-                                                args)
-        else:# Generate SQL 
-            predicted_sql = generate_sql(question,
-                                     schema,
-                                     args,
-                                     f"sqlite:///{db_path}")
-        
-        # print(f"[{idx}] Generated: {predicted_sql}")
-        level, counts = classify_level(gold_sql)
-        # print(f"*** predicted sql: {predicted_sql}")
-        # print(f"[{idx}] Running DB...")
-        try:
-            predicted_result = run_db(predicted_sql, f"sqlite:///{db_path}")
-            # print(f"[{idx}] Result: {predicted_result}")
-
-            predictions.append(predicted_sql)
-
-            results.append({
-                "question": question,
-                "schema": summarized_schema,
-                "predicted_sql": predicted_sql,
-                "predicted_result": predicted_result,
-                "gold_sql": gold_sql,
-                "level": level,
-                "db_id": db_id,
-                "success": True
-            })
-            print(f"Success: {idx} / {args.batch}")
-        
-        except Exception as e:
-            # print(f"Error on example {idx}: {str(e)}")
-            # print(f"Error on {idx}: ({type(e).__name__})")
-            predictions.append(predicted_sql) # fallback
-            results.append({
-                "question": question,
-                "schema": summarized_schema,
-                "predicted_sql": predicted_sql,
-                "predicted_result": None,
-                "gold_sql": gold_sql,
-                "level": None,
-                "db_id": db_id,
-                "success": False,
-                "error": str(e)
-            })
-            print(f"Failed: {idx} / {args.batch}")        
-        
-        if idx % 10 == 0:
-            print(f"Progress: {idx} / {args.batch}")
     end_time = time.time()
     elapsed_time = end_time - start_time
-    
-    output_dir = Path(__file__).parent.parent / "output" / f"{args.model}_{args.batch}_k-{args.k_examples}"
+
+    # 기존 출력 파일은 JSONL 에서 idx 순서로 다시 만든다
+    results = load_results(run_log.path)
+    predictions = [r["predicted_sql"] for r in results]
     pred_file = output_dir / f"pred-{args.strategy}.sql"
-    output_dir.mkdir(parents=True, exist_ok=True)
     with open(pred_file, "w") as f:
         f.write("\n".join(predictions))
     
     results_file = output_dir / f"predictions-{args.strategy}.json"
     with open(results_file, "w") as f:
-        json.dump(results, f, indent=2)
+        json.dump([legacy_result(r) for r in results], f, indent=2)
     
     print(f"\nBenchmark complete!")
     print(f"Predictions saved to {pred_file}")
     print(f"Detailed results saved to {results_file}")
+    print(f"Run log saved to {run_log.path}")
     
     # 단순 sql 실행 성공률 (정확성 XX)
     # 정확도는 여기서 만들어진 sql 문으로
     success_count = sum(1 for r in results if r["success"])
+    timeout_count = sum(1 for r in results if r.get("timeout"))
     print(f"Success rate: {success_count}/{args.batch} ({success_count/args.batch*100:.1f}%)")
+    print(f"Timeouts: {timeout_count}")
+    report_llm_latency(results)
+    token_usage = report_token_usage(results)
+    cache_usage = report_cache_usage(results)
+    generated_tokens = report_generated_tokens(results)
+    prompt_tokens = report_prompt_tokens(results)
     print(f"Total Execution Time: {int(elapsed_time//60)}분 {elapsed_time%60:.2f}초")
+
+    # 단계별 latency 분포 → timings.json ("{strategy}/{model}" 별로 갱신)
+    timing_key = f"{args.strategy}/{args.model}"
+    timing_summary = summarize_timings(results, retrieval_batch)
+    write_timings(output_dir / "timings.json", timing_key, timing_summary)
+    print_timings(timing_key, timing_summary)
+
+    # 실행 정확도 (정답 결과는 gold_results.sqlite 에 캐시)
+    ex_report = None
+    if args.eval_ex:
+        ex_report = evaluate_execution(results, args.ex_workers, args.sql_timeout or None)
+        report_execution_accuracy(ex_report)
+        with open(output_dir / f"ex-{args.strategy}.json", "w") as f:
+            json.dump(ex_report, f, indent=2)
     
     return {
         "total": args.batch,
         "success": success_count,
         "failed": args.batch - success_count,
+        "timeout": timeout_count,
+        "usage": token_usage,
+        "cache": cache_usage,
+        "generated_tokens": generated_tokens,
+        "prompt_tokens": prompt_tokens,
+        "ex": ex_report,
+        "timings": timing_summary,
         "results": results
     }
@@ -0,0 +1,219 @@
+"""
+Execution accuracy (EX)
+
+예측 SQL 과 정답 SQL 의 실행 결과가 같은지 비교
+- 결과는 행 순서를 무시한 multiset 으로 비교: 행별 hash 를 정렬해서 하나의 digest 로
+- 정답 결과 digest 는 (DB 파일, 정답 SQL hash) 로 DATA_DIR/gold_results.sqlite 에 한 번만 저장
+  (성공한 결과와 SQL 자체의 오류만 - timeout / DB lock 같은 일시적 실패나 행 수 제한은 다음 실행에서 다시)
+- 실행은 process pool 에서 (쿼리별 timeout 은 utils.db_pool 의 progress handler)
+
+사용:
+    python -m evaluation.execution_accuracy output/qwen_100_k-3/predictions-jacc.json --workers 4
+    python main.py -m benchmark ... --eval-ex
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from paths import DATA_DIR
+from utils.classifier import classify_level
+from utils.db_pool import get_pool, fetch_rows, QueryTimeoutError
+from utils.schema_catalog import spider_db_dir
+
+gold_cache_file = DATA_DIR / "gold_results.sqlite"
+EX_TIMEOUT = 30.0  # 초
+EX_MAX_ROWS = 100000  # 넘으면 비교하지 않고 오류로 처리, 0 이면 제한 없음
+# 실행 환경에 따라 달라지는 오류 (gold 캐시에 저장하지 않음)
+TRANSIENT_ERRORS = ["timeout:", "too many rows", "interrupted", "database is locked", "database table is locked",
+                    "unable to open database", "disk i/o error", "out of memory"]
+LEVELS = ["easy", "medium", "hard", "extra"]
+
+
+def normalize_value(value):
+    # 2 와 2.0 은 같은 값으로 (COUNT vs AVG 등)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def result_digest(rows: list) -> str:
+    """행 순서와 무관한 결과 digest (같은 행이 여러 번 나오면 횟수까지 비교)"""
+    row_hashes = sorted(
+        hashlib.sha1(repr(tuple(normalize_value(v) for v in row)).encode("utf-8")).digest()
+        for row in rows
+    )
+    return hashlib.sha256(b"".join(row_hashes)).hexdigest()
+
+
+def execute_digest(task: tuple) -> tuple:
+    """
+    process pool worker: (db_path, sql, timeout, max_rows) → (digest, 행 수, 오류)
+
+    connection 은 worker process 별 pool 에서 재사용
+    """
+    db_path, sql, timeout, max_rows = task
+    try:
+        with get_pool().connection(db_path) as conn:
+            rows = fetch_rows(conn, sql, timeout, max_rows + 1 if max_rows else None)
+    except QueryTimeoutError as e:
+        return None, 0, f"timeout: {e}"
+    except Exception as e:
+        return None, 0, str(e)
+    if max_rows and len(rows) > max_rows:
+        return None, len(rows), f"too many rows (> {max_rows})"
+    return result_digest(rows), len(rows), None
+
+
+def gold_key(db_path: Path, gold_sql: str) -> str:
+    """DB 파일 (경로, 크기, 수정 시각) + 정답 SQL hash"""
+    stat = db_path.stat()
+    payload = f"{db_path.resolve()}\0{stat.st_size}\0{stat.st_mtime_ns}\0{gold_sql}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(output: tuple) -> bool:
+    """성공했거나 정답 SQL 자체가 틀린 경우만 (같은 DB 에서 다시 실행해도 같은 결과)"""
+    _, _, error = output
+    return error is None or not any(marker in error.lower() for marker in TRANSIENT_ERRORS)
+
+
+class GoldResultCache:
+
+    def __init__(self, path=gold_cache_file):
+        self.path = path
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS gold (
+                key TEXT PRIMARY KEY,
+                digest TEXT,
+                rows INTEGER,
+                error TEXT,
+                created_at REAL
+            )""")
+        self._conn.commit()
+
+    def get_many(self, keys: list) -> dict:
+        """{key: (digest, rows, error)} - 있는 것만"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                row = self._conn.execute("SELECT digest, rows, error FROM gold WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    found[key] = tuple(row)
+        return found
+
+    def put_many(self, entries: dict):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO gold VALUES (?, ?, ?, ?, ?)",
+                [(key, digest, rows, error, now) for key, (digest, rows, error) in entries.items()]
+            )
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+def evaluate_execution(results: list, workers: int = 4, timeout: float = EX_TIMEOUT,
+                       max_rows: int = EX_MAX_ROWS, cache_path=None) -> dict:
+    """
+    벤치마크 결과 (predictions-*.json 의 항목들) 의 EX 계산
+
+    :param results: gold_sql, predicted_sql, db_id 가 있는 dict list
+    :return: EX 전체 / 난이도별 + 예제별 판정 ("correct", "gold_error", "error")
+             정답 SQL 자체가 실패한 예제는 분모에서 제외
+    """
+    items = []
+    for r in results:
+        db_path = spider_db_dir / r["db_id"] / f"{r['db_id']}.sqlite"
+        items.append((r, db_path, gold_key(db_path, r["gold_sql"]) if db_path.exists() else None))
+
+    cache = GoldResultCache(cache_path or gold_cache_file)
+    gold = cache.get_many([key for _, _, key in items if key is not None])
+    cached = sum(1 for _, _, key in items if key in gold)
+    missing = {key: (db_path, r["gold_sql"]) for r, db_path, key in items
+               if key is not None and key not in gold}
+
+    gold_tasks = [(str(db_path), sql, timeout, max_rows) for db_path, sql in missing.values()]
+    pred_tasks = [(str(db_path), r["predicted_sql"], timeout, max_rows) for r, db_path, _ in items]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        outputs = list(executor.map(execute_digest, gold_tasks + pred_tasks, chunksize=8))
+    elapsed = time.perf_counter() - start
+
+    fresh = dict(zip(missing, outputs[:len(gold_tasks)]))
+    cache.put_many({key: output for key, output in fresh.items() if is_cacheable(output)})
+    cache.close()
+    gold.update(fresh)
+
+    per_example = []
+    totals = {level: [0, 0] for level in LEVELS}  # level → [correct, counted]
+    gold_errors = 0
+    for (r, db_path, key), (pred_digest, _, pred_error) in zip(items, outputs[len(gold_tasks):]):
+        level, _ = classify_level(r["gold_sql"])
+        gold_digest, _, gold_error = gold.get(key, (None, 0, "database not found"))
+        if gold_error is not None:
+            gold_errors += 1
+            per_example.append({"level": level, "correct": None, "gold_error": gold_error})
+            continue
+        correct = pred_error is None and pred_digest == gold_digest
+        totals.setdefault(level, [0, 0])
+        totals[level][0] += correct
+        totals[level][1] += 1
+        per_example.append({"level": level, "correct": correct, "error": pred_error})
+
+    correct = sum(c for c, _ in totals.values())
+    counted = sum(n for _, n in totals.values())
+    return {
+        "ex": correct / counted if counted else 0.0,
+        "correct": correct,
+        "counted": counted,
+        "gold_errors": gold_errors,
+        "gold_cached": cached,
+        "by_level": {level: {"ex": c / n if n else None, "correct": c, "count": n}
+                     for level, (c, n) in totals.items()},
+        "seconds": elapsed,
+        "examples": per_example
+    }
+
+
+def report_execution_accuracy(report: dict):
+    print(f"Execution accuracy: {report['correct']}/{report['counted']} ({report['ex']*100:.1f}%)"
+          f" - gold errors {report['gold_errors']}, gold cached {report['gold_cached']},"
+          f" {report['seconds']:.2f}s")
+    for level, entry in report["by_level"].items():
+        if entry["count"]:
+            print(f"  {level:>6}: {entry['correct']}/{entry['count']} ({entry['ex']*100:.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Execution accuracy of a predictions-*.json file")
+    parser.add_argument("predictions", type=Path)
+    parser.add_argument("-w", "--workers", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=EX_TIMEOUT)
+    parser.add_argument("--max-rows", type=int, default=EX_MAX_ROWS, help="Row cap per query, 0 = no limit")
+    args = parser.parse_args()
+
+    with open(args.predictions, "r") as f:
+        results = json.load(f)
+    report = evaluate_execution(results, args.workers, args.timeout, args.max_rows)
+    report_execution_accuracy(report)
+
+    out_file = args.predictions.with_name("ex-" + args.predictions.name.removeprefix("predictions-"))
+    with open(out_file, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"EX report saved to {out_file}")
+
+
+if __name__ == "__main__":
+    main()
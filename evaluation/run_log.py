@@ -0,0 +1,129 @@
+"""
+Append-only JSONL log of benchmark results
+
+첫 줄은 header (실행 설정 + hash), 이후 예제가 끝날 때마다 한 줄씩:
+    {"type": "header", "config": {...}, "config_hash": "..."}
+    {"type": "result", "idx": 3, "result": {...}}
+
+- 매 줄 write + flush, fsync 는 FSYNC_EVERY 줄 / FSYNC_INTERVAL 초마다 한 번 (그리고 close 시)
+- --resume: header 의 config_hash 가 같으면 이미 끝난 idx 는 건너뜀
+  (중간에 끊겨서 잘린 마지막 줄은 버리고 이어서 씀)
+- predictions-*.json / pred-*.sql 은 끝에 이 파일에서 만든다
+  (실행마다 달라지는 기록 RUN_STATS_KEYS 는 이 파일에만 - 같은 설정이면 predictions-*.json 은 항상 같음)
+"""
+
+import hashlib
+import json
+import os
+import time
+
+FSYNC_EVERY = 16
+FSYNC_INTERVAL = 2.0  # 초
+SEED = 88
+# 결과에 영향을 주는 설정만 (workers / concurrency 같은 실행 방식은 제외)
+CONFIG_KEYS = ["model", "strategy", "k_examples", "batch", "cluster", "jaccard_lsh", "use_limit",
+               "num_predict", "stop", "sql_timeout", "max_rows", "schema_budget",
+               "nprobe", "ef_search"]
+# 실행마다 달라지는 결과 항목 (run-*.jsonl / timings.json / 요약에만 사용)
+# (cache hit 이면 usage / output_tokens / tokens 도 없거나 달라짐, tokens 에는 tokens/s 포함)
+RUN_STATS_KEYS = ["timings", "latency", "time_to_sql", "cache", "usage", "output_tokens", "tokens"]
+
+
+def run_config(args, seed: int = SEED) -> dict:
+    config = {key: getattr(args, key, None) for key in CONFIG_KEYS}
+    config["seed"] = seed
+    return config
+
+
+def config_hash(config: dict) -> str:
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def read_log(path) -> tuple:
+    """
+    :return: (header, {idx: result}, 마지막 완전한 줄까지의 byte 길이)
+    """
+    header, done, good_bytes = None, {}, 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # 쓰다가 끊긴 줄
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            if record.get("type") == "header":
+                header = record
+            elif record.get("type") == "result":
+                done[record["idx"]] = record["result"]
+            good_bytes += len(line)
+    return header, done, good_bytes
+
+
+class RunLog:
+
+    def __init__(self, path, config: dict, resume: bool = False,
+                 fsync_every: int = FSYNC_EVERY, fsync_interval: float = FSYNC_INTERVAL):
+        self.path = path
+        self.config = config
+        self.hash = config_hash(config)
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.done = {}
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if resume and path.exists():
+            header, self.done, good_bytes = read_log(path)
+            if header is None or header.get("config_hash") != self.hash:
+                raise ValueError(
+                    f"{path} was written with a different configuration; "
+                    f"run without --resume to start over"
+                )
+            self._file = open(path, "r+b")
+            self._file.truncate(good_bytes)
+            self._file.seek(good_bytes)
+        else:
+            self._file = open(path, "wb")
+            self._write({"type": "header", "config": config, "config_hash": self.hash})
+            self.sync()
+
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def _write(self, record: dict):
+        self._file.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+        self._file.flush()
+
+    def sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def append(self, idx: int, result: dict):
+        self._write({"type": "result", "idx": idx, "result": result})
+        self._pending += 1
+        if self._pending >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_results(path) -> list:
+    """JSONL → idx 순서의 결과 list"""
+    _, done, _ = read_log(path)
+    return [done[idx] for idx in sorted(done)]
+
+
+def legacy_result(result: dict) -> dict:
+    """predictions-*.json 항목 (RUN_STATS_KEYS 제외)"""
+    return {key: value for key, value in result.items() if key not in RUN_STATS_KEYS}
@@ -0,0 +1,195 @@
+"""
+In-process experiment sweep (scripts/two_300_k035.sh 대체)
+
+    python main.py -m sweep -b 300 --grid k=3,5 strategy=random,rag,ic,jacc model=mistral,qwen
+
+grid 의 조합마다 run_spider_benchmark 를 같은 프로세스에서 실행
+(출력 디렉토리 / 파일은 개별 실행과 동일: output/{model}_{batch}_k-{k}/...)
+grid 값은 실행 전에 명령행 옵션과 같은 규칙 (type, choices, nargs) 으로 검증
+(--stop 처럼 여러 값을 받는 옵션은 '|' 로 구분: "stop=;|```")
+
+공유되는 것
+- dev.json, schema catalog / schema cache, DB connection pool, embedder / FAISS / Jaccard index, Ollama client
+  (모두 프로세스 전역이라 첫 조합에서 한 번만 로드)
+- few-shot 검색 결과 - 질문별로 최대 k 로 한 번 검색하고 작은 k 는 잘라서 사용
+  jacc: 상위 k 가 (점수 내림차순, idx 내림차순) 전체 순서의 prefix 라서 그대로 자름 (LSH 는 k 마다 다시 검색)
+  rag: flat index 면 FAISS 후보 (최대 k * 3 개) 만 공유하고, 앞 k * 3 개를 k 마다 다시 rerank
+       (정확한 검색이라 top-(k * 3) 이 top-(k_max * 3) 의 prefix)
+       양자화 / ivf / hnsw index 는 결과가 검색 개수 (HNSW 는 efSearch >= n) 에 따라 달라질 수 있어서 k 마다 다시 검색
+  random / ic: 조합마다 다시 계산 (random 은 매 실행 random.seed(88) 이후 순서에 의존)
+"""
+
+from itertools import product
+import argparse
+import json
+
+from evaluation.benchmark import run_spider_benchmark, spider_dir_path
+
+# --grid 에서 쓰는 짧은 이름 → args 속성
+GRID_ALIASES = {"k": "k_examples", "s": "strategy", "b": "batch", "c": "cluster"}
+
+
+def grid_action(parser: argparse.ArgumentParser, name: str) -> argparse.Action:
+    """--grid 축 이름 (짧은 이름 / dest / 옵션 이름) 에 해당하는 argparse action"""
+    dest = GRID_ALIASES.get(name, name.lstrip("-").replace("-", "_"))
+    for action in parser._actions:
+        if action.dest == dest and action.option_strings and dest not in ("help", "mode", "grid"):
+            return action
+    raise ValueError(f"Unknown grid axis '{name}'")
+
+
+def grid_value(action: argparse.Action, value: str):
+    """
+    grid 값 하나를 명령행 옵션과 같은 규칙 (type, choices, nargs) 으로 변환
+
+    - store_true 등 값이 없는 옵션: true / false
+    - 여러 값을 받는 옵션 (--stop 등 append, nargs='+'): '|' 로 구분한 list
+    """
+    option = action.option_strings[-1]
+    if action.nargs == 0:
+        if value.lower() in ("1", "true", "yes"):
+            return action.const
+        if value.lower() in ("0", "false", "no"):
+            return action.default
+        raise ValueError(f"Invalid value '{value}' for {option} (expected true/false)")
+
+    is_list = (action.nargs in ("+", "*") or isinstance(action.nargs, int)
+               or isinstance(action, argparse._AppendAction))
+    items = value.split("|") if is_list else [value]
+    convert = action.type or str
+    converted = []
+    for item in items:
+        try:
+            item = convert(item)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid value '{item}' for {option}") from None
+        if action.choices is not None and item not in action.choices:
+            choices = ", ".join(map(str, action.choices))
+            raise ValueError(f"Invalid value '{item}' for {option} (choose from {choices})")
+        converted.append(item)
+    if isinstance(action.nargs, int) and len(converted) != action.nargs:
+        raise ValueError(f"{option} expects {action.nargs} values, got '{value}'")
+    return converted if is_list else converted[0]
+
+
+def parse_grid(grid: list, parser: argparse.ArgumentParser) -> list:
+    """
+    ["k=3,5", "strategy=rag,jacc"] → [("k_examples", [3, 5]), ("strategy", ["rag", "jacc"])]
+    값은 parser 의 해당 옵션 (type, choices, nargs) 으로 변환 / 검증 - 잘못된 값은 실행 전에 ValueError
+    """
+    axes = []
+    for spec in grid:
+        if "=" not in spec:
+            raise ValueError(f"Invalid grid axis '{spec}' (expected name=v1,v2,...)")
+        name, values = spec.split("=", 1)
+        action = grid_action(parser, name)
+        axes.append((action.dest, [grid_value(action, v) for v in values.split(",")]))
+    return axes
+
+
+class SweepContext:
+    """조합 간에 공유하는 dev 데이터와 few-shot 검색 결과"""
+
+    def __init__(self, k_max: int):
+        self.k_max = k_max
+        self._dev_data = None
+        self._jaccard = {}  # question → [(score, idx), ...] (k_max 개)
+        self._faiss = {}  # question → (distances, indices) (k_max * 3 개, flat index 만)
+
+    @property
+    def dev_data(self) -> list:
+        if self._dev_data is None:
+            with open(spider_dir_path / "evaluation_examples" / "examples" / "dev.json", "r") as f:
+                self._dev_data = json.load(f)
+        return self._dev_data
+
+    def examples(self, pairs: list, args, prefetch):
+        """
+        prefetch_examples 와 같은 결과, 가능하면 이전 조합의 검색 결과를 잘라서 사용
+
+        :param prefetch: 공유할 수 없는 전략에 쓸 원래 함수 (models.prefetch_examples)
+        """
+        k = args.k_examples
+        if args.strategy == "jacc" and not args.jaccard_lsh:
+            return self._jaccard_examples([question for question, _ in pairs], k)
+        if args.strategy == "rag" and self._rag_index_type() == "flat":
+            return self._rag_examples(pairs, k)
+        return prefetch(pairs, args)
+
+    def _jaccard_examples(self, questions: list, k: int) -> list:
+        from utils import jaccard
+        if jaccard.jaccard_index is None:
+            jaccard.load_train_questions()
+        n = max(k, self.k_max)
+        missing = [q for q in dict.fromkeys(questions) if len(self._jaccard.get(q, ())) < n]
+        if missing:
+            for question, top in zip(missing, jaccard.jaccard_index.top_k_many(missing, n)):
+                self._jaccard[question] = top
+        return [jaccard.jaccard_examples(self._jaccard[q][:k]) for q in questions]
+
+    @staticmethod
+    def _rag_index_type() -> str:
+        from utils.example_store import get_example_store
+        return get_example_store().index_spec["type"]
+
+    def _rag_examples(self, pairs: list, k: int) -> list:
+        from utils.RAG_examples import search_candidates, rerank_candidates
+        n = max(k, self.k_max) * 3
+        missing = [q for q in dict.fromkeys(q for q, _ in pairs) if len(self._faiss.get(q, ((), ()))[1]) < n]
+        if missing:
+            distances, indices = search_candidates(missing, n)
+            for row, question in enumerate(missing):
+                self._faiss[question] = (distances[row], indices[row])
+        results = []
+        for question, schema in pairs:
+            distances, indices = self._faiss[question]
+            results.append(rerank_candidates(indices[:k * 3], distances[:k * 3], schema, k))
+        return results
+
+
+def run_sweep(args, parser: argparse.ArgumentParser = None) -> list:
+    """
+    grid 의 모든 조합을 순서대로 실행 (앞의 축이 바깥 loop)
+
+    :param parser: grid 값을 변환 / 검증할 명령행 parser (기본: main.build_parser())
+
+    :return: [(설정 dict, run_spider_benchmark 결과 요약)]
+    """
+    if not args.grid:
+        raise ValueError("Sweep mode needs --grid, e.g. --grid k=3,5 strategy=rag,jacc model=qwen")
+    if parser is None:
+        from main import build_parser
+        parser = build_parser()
+    axes = parse_grid(args.grid, parser)
+    combos = list(product(*(values for _, values in axes)))
+
+    k_values = [v for dest, values in axes if dest == "k_examples" for v in values]
+    context = SweepContext(max(k_values, default=args.k_examples))
+
+    summary = []
+    for current, combo in enumerate(combos, 1):
+        overrides = {dest: value for (dest, _), value in zip(axes, combo)}
+        run_args = argparse.Namespace(**{**vars(args), **overrides})
+        label = ", ".join(f"{dest}={value}" for dest, value in overrides.items())
+        print("=" * 53)
+        print(f"[{current}/{len(combos)}] {label}")
+        print("=" * 53)
+        try:
+            report = run_spider_benchmark(run_args, context)
+        except Exception:
+            print("ERROR: Experiment failed!")
+            print(label)
+            raise
+        row = {key: report[key] for key in ("total", "success", "failed", "timeout")}
+        if report.get("ex"):
+            row["ex"] = report["ex"]["ex"]
+        summary.append((overrides, row))
+
+    print(f"\nAll {len(combos)} experiments completed")
+    for overrides, report in summary:
+        label = ", ".join(f"{dest}={value}" for dest, value in overrides.items())
+        line = f"  {label}: {report['success']}/{report['total']}"
+        if "ex" in report:
+            line += f", EX {report['ex']*100:.1f}%"
+        print(line)
+    return summary
@@ -0,0 +1,66 @@
+"""
+Per-stage latency
+
+예제마다 단계별 시간 (초, time.perf_counter - monotonic) 을 result["timings"] 에 기록하고
+실행이 끝나면 단계별 p50 / p90 / p99 / max 를 output/.../timings.json 에 "{strategy}/{model}" 키로 저장
+
+단계
+- schema: 스키마 DDL / 요약 (schema cache 에서 가져오는 시간 포함)
+- retrieval: few-shot 검색 (random / fixed / ic 처럼 질문마다 계산하는 전략만)
+  배치 검색 (rag / jacc, sweep 공유 포함) 은 예제별로 나눌 수 없어서 분포 대신 "retrieval_batch" 에 전체 시간
+- prompt: prompt 생성
+- llm: LLM 호출 (캐시 hit 이면 조회 시간, async / batch claude 는 요청별 latency)
+- execution: 예측 SQL 실행
+"""
+
+import json
+
+import numpy as np
+
+STAGES = ["schema", "retrieval", "prompt", "llm", "execution"]
+PERCENTILES = [50, 90, 99]
+
+
+def summarize_timings(results: list, retrieval_batch: dict = None) -> dict:
+    """
+    {stage: {count, mean, p50, p90, p99, max}} (초)
+
+    :param retrieval_batch: 배치 검색 {"seconds", "examples"} - 있으면 "retrieval_batch" 로 그대로 추가
+    """
+    summary = {}
+    for stage in STAGES:
+        values = np.array([r["timings"][stage] for r in results
+                           if stage in r.get("timings", {})], dtype=np.float64)
+        if not len(values):
+            continue
+        entry = {"count": int(len(values)), "mean": float(values.mean())}
+        for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+            entry[f"p{p}"] = float(value)
+        entry["max"] = float(values.max())
+        summary[stage] = entry
+    if retrieval_batch is not None:
+        summary["retrieval_batch"] = dict(retrieval_batch)
+    return summary
+
+
+def write_timings(path, key: str, summary: dict):
+    """timings.json 에 key ("{strategy}/{model}") 항목만 갱신 (다른 전략의 기록은 유지)"""
+    timings = {}
+    if path.exists():
+        with open(path, "r") as f:
+            timings = json.load(f)
+    timings[key] = summary
+    with open(path, "w") as f:
+        json.dump(timings, f, indent=2, sort_keys=True)
+
+
+def print_timings(key: str, summary: dict):
+    print(f"Stage latency ({key}, ms):")
+    print(f"  {'stage':<10}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+    for stage, entry in summary.items():
+        if stage == "retrieval_batch":
+            continue
+        print(f"  {stage:<10}" + "".join(f"{entry[col] * 1000:>9.1f}" for col in ("p50", "p90", "p99", "max")))
+    batch = summary.get("retrieval_batch")
+    if batch is not None:
+        print(f"  retrieval (batch): {batch['seconds'] * 1000:.1f} ms total for {batch['examples']} examples")
@@ -1,13 +1,11 @@
-from database import DATABASE_URL
-from models import generate_sql
-from pydantic import BaseModel
-from evaluation.benchmark import run_spider_benchmark
-from evaluation.agent_benchmark import run_spider_agent_benchmark
 import argparse
 
-def main():
+# 실행 모드별 모듈 (langchain / anthropic / faiss ...) 은 argparse 이후에 필요한 것만 import
+# → --help 나 random 전략 Ollama 실행은 torch / faiss 를 로드하지 않음 (scripts/startup_time.py)
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description='NL2SQL Few-Shot Benchmark')
-    parser.add_argument('-m', '--mode', choices=['benchmark', 'app', 'agent'],
+    parser.add_argument('-m', '--mode', choices=['benchmark', 'app', 'agent', 'sweep'],
                         default='benchmark', help='Execution mode')
     parser.add_argument('-s', '--strategy', choices=['random', 'rag', 'ic', 'jacc'],
                         default='random', help='Few-shot retrieval strategy')
@@ -23,14 +21,65 @@ def main():
                         default=5,help='Number of few-shot examples')
     parser.add_argument('-c', '--cluster', type=int,
                         default=1, help='Number of clusters in intent-clustering')
+    parser.add_argument('--jaccard-lsh', action='store_true',
+                        help='Use the MinHash/LSH candidate index for jacc (build: python -m utils.jaccard_lsh build)')
+    parser.add_argument('-w', '--workers', type=int,
+                        default=1, help='Examples processed concurrently in benchmark mode')
+    parser.add_argument('--max-inflight', type=int,
+                        default=0, help='Max concurrent LLM requests (default: same as --workers)')
+    parser.add_argument('--claude-mode', choices=['sync', 'async', 'batch'],
+                        default='sync', help='How sonnet requests are sent in benchmark mode')
+    parser.add_argument('--concurrency', type=int,
+                        default=8, help='Max concurrent Claude requests in async mode')
+    parser.add_argument('--batch-poll', type=float,
+                        default=30.0, help='Seconds between status polls in Claude batch mode')
+    parser.add_argument('--sql-timeout', type=float,
+                        default=30.0, help='Wall-clock limit (seconds) per generated SQL execution, 0 = none')
+    parser.add_argument('--max-rows', type=int,
+                        default=10000, help='Max rows fetched per generated SQL execution, 0 = all')
+    parser.add_argument('--num-predict', type=int,
+                        default=256, help='Max tokens generated per Ollama request, 0 = no limit')
+    parser.add_argument('--stop', action='append',
+                        default=None, help='Ollama stop sequence (repeatable, default: models.SQL_STOP)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream LLM output and stop as soon as a complete SQL statement is received')
+    parser.add_argument('--eval-ex', action='store_true',
+                        help='Compute execution accuracy against gold results after the benchmark')
+    parser.add_argument('--ex-workers', type=int,
+                        default=4, help='Processes used for execution accuracy')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip examples already in output/.../run-<strategy>.jsonl for the same configuration')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Bypass the on-disk LLM response cache (no reads, no writes)')
+    parser.add_argument('--refresh-cache', action='store_true',
+                        help='Ignore cached LLM responses and overwrite them with fresh ones')
+    parser.add_argument('--schema-budget', type=int,
+                        default=0, help='Prune the prompt schema to tables/columns relevant to the question '
+                                        'within this many tokens (FK join paths kept), 0 = full schema')
+    parser.add_argument('--nprobe', type=int,
+                        default=None, help='IVF cells probed per RAG query (default: value in the index manifest)')
+    parser.add_argument('--ef-search', type=int,
+                        default=None, help='HNSW efSearch per RAG query (default: value in the index manifest)')
     parser.add_argument('--use-limit', action='store_true', help='Add LIMIT clause to SQL')
-    
+    parser.add_argument('--grid', nargs='+',
+                        default=None, help='Sweep axes, e.g. k=3,5 strategy=random,rag model=mistral,qwen')
+    return parser
+
+
+def main():
+    parser = build_parser()
     args = parser.parse_args()
 
     if args.mode == 'benchmark':
+        from evaluation.benchmark import run_spider_benchmark
         run_spider_benchmark(args)
     
+    if args.mode == 'sweep':
+        from evaluation.sweep import run_sweep
+        run_sweep(args, parser)
+
     if args.mode == 'agent':
+        from evaluation.agent_benchmark import run_spider_agent_benchmark
         run_spider_agent_benchmark(args)
 
 if __name__ == "__main__":
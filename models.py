@@ -1,19 +1,19 @@
-from langchain_ollama import OllamaLLM
-from langchain_community.utilities import SQLDatabase
-from database import DATABASE_URL
 from langchain_core.prompts.few_shot import FewShotPromptTemplate
 from langchain_core.prompts.prompt import PromptTemplate
 
 from pydantic import BaseModel
 from pathlib import Path
 import re
+import threading
+import time
 
+# 검색 전략 모듈 (faiss / sentence-transformers / sklearn / scipy) 은 그 전략을 쓸 때만 import
 from utils.fixed_examples import create_fixed_examples
-from utils.RAG_examples import retrieve_RAG_examples
-from utils.intent_clustering import retrieve_intent_based_examples
-from utils.jaccard import retrieve_jaccard_examples
 from utils.random_examples import create_random_examples
-from utils.RAG_setup import summarize_schema
+from utils.schema_linking import schema_for_prompt
+from utils.db_pool import get_pool, execute, QUERY_TIMEOUT, MAX_ROWS
+from utils import llm_cache
+from utils.token_count import token_record
 
 EXAMPLE_PATH = Path(__file__).parent / "utils" / "examples.txt"
 top_k = 5
@@ -60,13 +60,44 @@ def create_examples(question: str, schema: str, args):
 
     if args.strategy == "rag":
         # print(f"[DEBUG] Retrieving RAG examples...")
-        return retrieve_RAG_examples(question, schema, args.k_examples)        
+        from utils.RAG_examples import retrieve_RAG_examples
+        return retrieve_RAG_examples(question, schema, args.k_examples, rag_search_params(args))        
     
     if args.strategy == "ic":
+        from utils.intent_clustering import retrieve_intent_based_examples
         return retrieve_intent_based_examples(question, args.k_examples, args.cluster)
 
     if args.strategy == 'jacc':
-        return retrieve_jaccard_examples(question, args.k_examples)
+        from utils.jaccard import retrieve_jaccard_examples
+        return retrieve_jaccard_examples(question, args.k_examples, args.jaccard_lsh)
+
+
+def rag_search_params(args) -> dict:
+    """--nprobe / --ef-search (ivf / hnsw RAG index 의 query-time override, 없으면 manifest 값)"""
+    return {"nprobe": getattr(args, "nprobe", None), "ef_search": getattr(args, "ef_search", None)}
+
+
+# prefetch_examples 가 배치 전체를 한 번에 검색하는 전략 (나머지는 질문마다 create_examples)
+BATCH_STRATEGIES = ("rag", "jacc")
+
+
+def prefetch_examples(pairs: list, args) -> list:
+    """
+    배치 전체의 few-shot 예제를 미리 계산 (입력 순서 유지)
+    rag / jacc 는 batch 검색 한 번, 나머지는 create_examples 를 순서대로 호출
+
+    :param pairs: list of (question, schema) - create_examples 에 넘길 것과 같은 schema
+    :return: 질문별 예제 리스트
+    """
+    if args.strategy == "rag":
+        from utils.RAG_examples import retrieve_RAG_examples_batch
+        return retrieve_RAG_examples_batch(pairs, args.k_examples, rag_search_params(args))
+    if args.strategy == "jacc":
+        from utils.jaccard import retrieve_jaccard_examples_batch
+        return retrieve_jaccard_examples_batch([question for question, _ in pairs],
+                                               args.k_examples,
+                                               args.jaccard_lsh)
+    return [create_examples(question, schema, args) for question, schema in pairs]
 
 
 psql_prompt = PromptTemplate(
@@ -74,8 +105,9 @@ psql_prompt = PromptTemplate(
     template = "Question: {input}\nSQL:{query}"
 )
 
-def create_prompt(question: str, schema_summary:str, args):
-    examples = create_examples(question, schema_summary, args)
+def create_prompt(question: str, schema_summary:str, args, examples=None):
+    if examples is None:
+        examples = create_examples(question, schema_summary, args)
     prompt = FewShotPromptTemplate(
         examples=examples,
         example_prompt=psql_prompt,
@@ -85,43 +117,84 @@ def create_prompt(question: str, schema_summary:str, args):
     )
     return prompt
 
-def get_llm(model: str):
-
-    if model == "mistral":
-        return OllamaLLM(
-            # model="mistral:7b-instruct-q4_0",
-            model="mistral:7b-instruct-q5_K_M",
-            temperature=0,
-            streaming=False,
-            verbose=True)
-            # stop=['\n\n', 'Question:'])
-    if model == "qwen":
-        return OllamaLLM(model="qwen2.5-coder:7b",
-                         temperature=0, 
-                         streaming=False, 
-                         verbose=True)
-                        #  stop=['\n\n', 'Question:'])       
-        
+def prompt_parts(prompt, question: str, schema_summary: str, args) -> dict:
+    """create_prompt 결과를 instructions / schema / examples / question 텍스트로 (토큰 계산용)"""
+    examples = prompt.example_separator.join(psql_prompt.format(**example) for example in prompt.examples)
+    fixed = {"input": "", "table_info": "", "top_k": args.k_examples}
+    return {
+        "instructions": prompt.prefix.format(**fixed) + prompt.suffix.format(**fixed),
+        "schema": schema_summary,
+        "examples": examples,
+        "question": question
+    }
+
+# Ollama 모델 이름
+OLLAMA_MODELS = {
+    # "mistral": "mistral:7b-instruct-q4_0",
+    "mistral": "mistral:7b-instruct-q5_K_M",
+    "qwen": "qwen2.5-coder:7b"
+}
+# SQL 한 문장 뒤에 붙는 설명/다음 예제를 잘라내는 stop sequence
+# ('\n\n' 은 "Here is the query:\n\nSELECT ..." 처럼 SQL 앞에서 끊길 수 있어서 제외)
+SQL_STOP = ["Question:", "\n\nExplanation", "\n\nThis query", "\n\nNote"]
+NUM_PREDICT = 256  # Spider 정답 SQL 은 대부분 100 토큰 이하
+KEEP_ALIVE = "30m"  # 요청 사이에 모델을 메모리에 유지
+
+_llms = {}
+_llms_lock = threading.Lock()
+
+
+def get_llm(model: str, num_predict: int = NUM_PREDICT, stop: list = None):
+    """
+    모델별 OllamaLLM (프로세스당 설정별 1개, thread 간 공유)
+
+    OllamaLLM 의 내부 ollama.Client (httpx) 가 HTTP connection 을 재사용하고,
+    keep_alive 로 요청 사이에 모델이 unload 되지 않게 한다.
+
+    :param num_predict: 최대 생성 토큰 수 (None/0 이면 제한 없음)
+    :param stop: stop sequences (None 이면 SQL_STOP, [] 이면 없음)
+    """
+    stop = SQL_STOP if stop is None else stop
+    key = (model, num_predict or None, tuple(stop))
+    llm = _llms.get(key)
+    if llm is not None:
+        return llm
+
+    with _llms_lock:
+        if key not in _llms:
+            from langchain_ollama import OllamaLLM
+            _llms[key] = OllamaLLM(model=OLLAMA_MODELS[model],
+                                   temperature=0,
+                                   num_predict=num_predict or None,
+                                   stop=list(stop) or None,
+                                   keep_alive=KEEP_ALIVE,
+                                   verbose=True)
+        return _llms[key]
+
 
 class QueryRequest(BaseModel):
     question: str
    
-def generate_sql(question: str, schema: str, args, db_uri: str) -> tuple[str, str]:    
+def generate_sql(question: str, schema: str, args, db_uri: str, examples=None, stats=None) -> tuple[str, str]:    
     # print(f"Schema: \n{schema}")
     # print(f"[DEBUG] Creating LLM...")
-    llm = get_llm(args.model)
+    stats = {} if stats is None else stats
+    prompt_start = time.perf_counter()
+    llm = get_llm(args.model, args.num_predict, args.stop)
     # print(f"[DEBUG] Connecting to DB: {db_uri}")
 
     # print(f"[DEBUG] Creating prompt with example_type: {args.strategy}")
-    prompt = create_prompt(question, schema, args)
+    prompt = create_prompt(question, schema, args, examples)
 
     # print(f"[DEBUG] Creating chain...")
-    schema_summary = summarize_schema(schema)
+    # --schema-budget: 질문과 관련된 테이블 / 컬럼만 (utils/schema_linking.py)
+    schema_summary = schema_for_prompt(question, schema, getattr(args, "schema_budget", 0))
     filled_prompt = prompt.format(
         input=question,
         top_k=args.k_examples,
         table_info=schema_summary
     )
+    stats["prompt_time"] = time.perf_counter() - prompt_start
 
     # print("\n" + "="*80)
     # print("FULL PROMPT")
@@ -129,21 +202,89 @@ def generate_sql(question: str, schema: str, args, db_uri: str) -> tuple[str, st
     # print(filled_prompt)
     # print("="*80 + "\n")
     
-    # print(f"[DEBUG] Invoking chain...")
-    try:
-        response = llm.invoke(filled_prompt)
-    except Exception as e:
-        print(f"Chain error: {e}")
-        # Fallback SQL (LLM 재호출 안 함)
-        return "SELECT * LIMIT 1"
+    # 같은 (model, temperature, prompt, 생성 옵션) 응답은 캐시에서 (utils/llm_cache.py)
+    key, response = llm_cache.lookup(args, "ollama", llm.model, llm.temperature,
+                                     [filled_prompt, llm.num_predict, llm.stop])
+    if key is not None:
+        stats["cache"] = "hit" if response is not None else "miss"
+
+    parts = prompt_parts(prompt, question, schema_summary, args)
+    if response is not None:
+        stats["tokens"] = token_record(parts, response)
+    else:
+        # print(f"[DEBUG] Invoking chain...")
+        start = time.perf_counter()
+        info = {}
+        try:
+            if args.stream:
+                response = stream_sql(llm, filled_prompt, stats, start)
+            else:
+                generation = llm.generate([filled_prompt]).generations[0][0]
+                response = generation.text
+                info = generation.generation_info or {}
+                if "eval_count" in info:
+                    stats["output_tokens"] = info["eval_count"]
+                    stats["done_reason"] = info.get("done_reason")
+        except Exception as e:
+            print(f"Chain error: {e}")
+            # Fallback SQL (LLM 재호출 안 함)
+            return "SELECT * LIMIT 1"
+        finally:
+            stats["latency"] = time.perf_counter() - start
+        # Ollama 가 알려준 토큰 수 / 생성 시간 (eval_duration, ns) 우선
+        eval_seconds = info["eval_duration"] / 1e9 if info.get("eval_duration") else stats["latency"]
+        stats["tokens"] = token_record(parts, response,
+                                       info.get("prompt_eval_count"),
+                                       stats.get("output_tokens"),
+                                       eval_seconds)
+        llm_cache.store(key, "ollama", llm.model, response)
 
     sql = extract_sql(response.strip())
 
     return sql
 
-def run_db(sql: str, db_uri: str):
-    db = SQLDatabase.from_uri(db_uri)
-    return db.run(sql)
+def stream_sql(llm, prompt: str, stats: dict, start: float) -> str:
+    """
+    Ollama streaming - SQL 이 완성되면 바로 stream 을 닫음 (generator close → HTTP 연결 종료 → 생성 중단)
+
+    stats: time_to_sql (초), output_tokens (받은 조각 수, Ollama 는 조각 하나가 토큰 하나), stopped_early
+    """
+    extractor = SQLStreamExtractor()
+    chunks = 0
+    stream = llm.stream(prompt)
+    try:
+        for chunk in stream:
+            chunks += 1
+            if extractor.feed(chunk):
+                break
+    finally:
+        stream.close()
+    stats["time_to_sql"] = time.perf_counter() - start
+    stats["output_tokens"] = chunks
+    stats["stopped_early"] = extractor.done
+    return extractor.text
+
+
+def run_db(sql: str, db_uri: str, timeout: float = QUERY_TIMEOUT, max_rows: int = MAX_ROWS):
+    # DB 파일별 read-only connection 재사용 (utils/db_pool.py)
+    # timeout 을 넘기면 utils.db_pool.QueryTimeoutError
+    with get_pool().connection(db_uri) as conn:
+        return execute(conn, sql, timeout, max_rows)
+
+def run_many(sqls: list, db_path: str, timeout: float = QUERY_TIMEOUT, max_rows: int = MAX_ROWS) -> list:
+    """
+    여러 SQL 을 connection 하나로 실행 (timeout / max_rows 는 SQL 별로 적용)
+
+    :return: SQL 별 결과 문자열, 실패한 SQL 은 해당 Exception 객체
+    """
+    results = []
+    with get_pool().connection(db_path) as conn:
+        for sql in sqls:
+            try:
+                results.append(execute(conn, sql, timeout, max_rows))
+            except Exception as e:
+                results.append(e)
+    return results
 
 # SQL 블록 제거
 def extract_sql(text: str) -> str:
@@ -158,4 +299,38 @@ def extract_sql(text: str) -> str:
     
     sql = re.sub(r'\\(.)', r'\1', sql)
     
-    return ' '.join(sql.split())
\ No newline at end of file
+    return ' '.join(sql.split())
+
+
+class SQLStreamExtractor:
+    """
+    streaming 응답을 조각 단위로 받아서 extract_sql 결과가 더 이상 바뀌지 않는 시점을 찾음
+
+    - ```sql ... ``` 블록이 닫히면 완료 (extract_sql 은 첫 블록만 사용)
+    - 블록 없이 SQL (SELECT / WITH 로 시작) 이 ';' 로 끝나고 줄이 바뀌면 완료 (extract_sql 은 첫 ';' 앞만 사용)
+      "Note: use JOIN; here is the query: ```sql ..." 처럼 SQL 이 아닌 문장의 ';' 에서는 멈추지 않음
+      ``` 가 열려 있으면 블록이 닫힐 때까지 기다림
+    완료 후 sql() 은 전체 응답에 extract_sql 을 적용한 것과 같음
+    (예외: ';' 로 끝난 SQL 줄 뒤에 ```sql 블록이 또 나오는 응답 - 앞의 SQL 을 사용)
+    """
+
+    SQL_START = re.compile(r'\s*(SELECT|WITH)\b', re.IGNORECASE)
+
+    def __init__(self):
+        self.text = ""
+        self.done = False
+
+    def feed(self, chunk: str) -> bool:
+        """조각 추가, 완료되면 True"""
+        self.text += chunk
+        # 완료 여부는 '`' / ';' / 줄바꿈이 들어올 때만 바뀜
+        if not self.done and ('`' in chunk or ';' in chunk or '\n' in chunk):
+            if re.search(r'```sql\s*(.*?)\s*```', self.text, re.DOTALL):
+                self.done = True
+            elif ';' in self.text and '```' not in self.text:
+                statement, _, rest = self.text.partition(';')
+                self.done = bool(self.SQL_START.match(statement)) and '\n' in rest
+        return self.done
+
+    def sql(self) -> str:
+        return extract_sql(self.text.strip())
\ No newline at end of file
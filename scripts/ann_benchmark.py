@@ -0,0 +1,156 @@
+"""
+IVF / HNSW vs exact search on a synthetic scaled-up example pool
+
+수백만 개 pool 을 가정하고 가우시안 혼합 (--clusters 개 중심 + 잡음, L2 정규화) 벡터를 --pool 개 만들어서
+example_store.build_faiss_index 로 ivf / hnsw 를 빌드하고 query-time 설정을 sweep
+(--from-store 면 실제 store 벡터에 잡음을 섞어서 pool 크기까지 복제)
+
+- exact: faiss.knn (flat 과 동일) 의 top-n 을 정답으로
+- recall@n: n = k * 3 (rerank 에 넘기는 후보 수)
+- ms/query: 질문 하나씩 검색 (--latency-queries 개), QPS: 전체 query 를 한 번에
+- build: 학습 (--train-size 개 sample) + add 시간, 직렬화 크기
+
+    python scripts/ann_benchmark.py --pool 1000000 --dim 768 --nlist 1024 4096 --nprobe 8 16 64 \\
+        --hnsw-m 32 --ef-search 32 64 128 --json output/ann_benchmark.json
+"""
+
+from pathlib import Path
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.example_store import (EF_CONSTRUCTION, TRAIN_SIZE, build_faiss_index, default_nlist,
+                                 get_example_store, index_spec)
+
+SEED = 88
+CHUNK = 65536
+
+
+def normalize(x: np.ndarray) -> np.ndarray:
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def synthetic_pool(size: int, dim: int, clusters: int, noise: float, rng) -> np.ndarray:
+    """질문 임베딩처럼 몇 개의 주제 주변에 몰린 단위 벡터"""
+    centers = normalize(rng.standard_normal((clusters, dim)).astype(np.float32))
+    pool = np.empty((size, dim), dtype=np.float32)
+    for start in range(0, size, CHUNK):
+        end = min(start + CHUNK, size)
+        labels = rng.integers(0, clusters, end - start)
+        pool[start:end] = normalize(centers[labels] + noise * rng.standard_normal((end - start, dim)) / np.sqrt(dim))
+    return pool
+
+
+def store_pool(size: int, noise: float, rng) -> np.ndarray:
+    """실제 store 벡터를 잡음을 섞어서 size 개까지 복제"""
+    base = np.asarray(get_example_store().embeddings)
+    pool = np.empty((size, base.shape[1]), dtype=np.float32)
+    for start in range(0, size, CHUNK):
+        end = min(start + CHUNK, size)
+        rows = base[rng.integers(0, len(base), end - start)]
+        pool[start:end] = normalize(rows + noise * rng.standard_normal(rows.shape) / np.sqrt(base.shape[1]))
+    return pool
+
+
+def recall(exact: np.ndarray, approx: np.ndarray) -> float:
+    return float(np.mean([len(set(e) & set(a[a >= 0])) / len(e) for e, a in zip(exact, approx)]))
+
+
+def measure(search, queries: np.ndarray, n: int, latency_queries: int) -> tuple:
+    """→ (indices, 질문 하나씩 ms 평균, 배치 QPS)"""
+    start = time.perf_counter()
+    _, indices = search(queries, n)
+    qps = len(queries) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for row in range(min(latency_queries, len(queries))):
+        search(queries[row:row + 1], n)
+    ms = (time.perf_counter() - start) * 1000 / min(latency_queries, len(queries))
+    return indices, ms, qps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep IVF / HNSW parameters against exact search")
+    parser.add_argument("--pool", type=int, default=200000, help="Synthetic pool size")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=2000, help="Topics in the synthetic mixture")
+    parser.add_argument("--noise", type=float, default=1.0, help="Noise scale around each topic / store vector")
+    parser.add_argument("--from-store", action="store_true", help="Scale up the real example store instead")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--latency-queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5, help="Few-shot k (recall is measured at k * 3 candidates)")
+    parser.add_argument("--nlist", type=int, nargs="+", default=[None], help="IVF cells (default: 4 * sqrt(pool))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--hnsw-m", type=int, nargs="+", default=[16, 32])
+    parser.add_argument("--ef-construction", type=int, default=EF_CONSTRUCTION)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128])
+    parser.add_argument("--train-size", type=int, default=TRAIN_SIZE)
+    parser.add_argument("--skip", nargs="+", default=[], choices=["ivf", "hnsw"])
+    parser.add_argument("--json", type=Path, default=None, help="Also write the rows to this file")
+    cli = parser.parse_args()
+
+    import faiss
+
+    rng = np.random.default_rng(SEED)
+    if cli.from_store:
+        pool = store_pool(cli.pool, cli.noise, rng)
+    else:
+        pool = synthetic_pool(cli.pool, cli.dim, cli.clusters, cli.noise, rng)
+    # query: pool 안의 벡터 근처 (실제 질문이 학습 질문과 비슷한 것처럼)
+    queries = normalize(pool[rng.integers(0, len(pool), cli.queries)]
+                        + 0.5 * cli.noise * rng.standard_normal((cli.queries, pool.shape[1])).astype(np.float32)
+                        / np.sqrt(pool.shape[1])).astype(np.float32)
+    n = cli.k * 3
+
+    exact_search = lambda q, n: faiss.knn(q, pool, n, faiss.METRIC_L2)
+    exact, exact_ms, exact_qps = measure(exact_search, queries, n, cli.latency_queries)
+    rows = [{"index": "flat", "params": "", "build_s": 0.0, "bytes": int(pool.nbytes),
+             f"recall@{n}": 1.0, "ms": exact_ms, "qps": exact_qps}]
+
+    configs = []
+    if "ivf" not in cli.skip:
+        for nlist in cli.nlist:
+            nlist = nlist or default_nlist(len(pool))
+            spec = index_spec("ivf", nlist=nlist, train_size=cli.train_size)
+            configs.append((spec, "nprobe", [p for p in cli.nprobe if p <= nlist]))
+    if "hnsw" not in cli.skip:
+        for m in cli.hnsw_m:
+            spec = index_spec("hnsw", hnsw_m=m, ef_construction=cli.ef_construction)
+            configs.append((spec, "ef_search", cli.ef_search))
+
+    for spec, knob, values in configs:
+        start = time.perf_counter()
+        index = build_faiss_index(pool, spec)
+        build_s = time.perf_counter() - start
+        size = int(faiss.serialize_index(index).nbytes)
+        built = ", ".join(f"{key}={value}" for key, value in spec.items()
+                          if key not in ("type", "nprobe", "ef_search"))
+        for value in values:
+            if spec["type"] == "ivf":
+                params = faiss.SearchParametersIVF(nprobe=value)
+            else:
+                params = faiss.SearchParametersHNSW(efSearch=value)
+            search = lambda q, n: index.search(q, n, params=params)
+            approx, ms, qps = measure(search, queries, n, cli.latency_queries)
+            rows.append({"index": spec["type"], "params": f"{built}, {knob}={value}", "build_s": build_s,
+                         "bytes": size, f"recall@{n}": recall(exact, approx), "ms": ms, "qps": qps})
+
+    print(f"pool {len(pool)} x {pool.shape[1]}, {len(queries)} queries, recall@{n} vs exact")
+    print(f"{'index':>6} {'params':<48} {'recall':>7} {'ms/q':>8} {'QPS':>9} {'MB':>8} {'build s':>8}")
+    for row in rows:
+        print(f"{row['index']:>6} {row['params']:<48} {row[f'recall@{n}']:>7.3f} {row['ms']:>8.3f} "
+              f"{row['qps']:>9.0f} {row['bytes'] / 2**20:>8.1f} {row['build_s']:>8.1f}")
+
+    if cli.json:
+        cli.json.parent.mkdir(parents=True, exist_ok=True)
+        with open(cli.json, "w") as f:
+            json.dump({"pool": len(pool), "dim": int(pool.shape[1]), "queries": len(queries), "k": cli.k,
+                       "rows": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Local stand-in for the Anthropic Messages API
+
+실제 API 를 쓰지 않고 claude_integration 의 async / retry 경로를 확인하기 위한 stub 서버
+- POST /v1/messages: latency 만큼 기다린 후 고정 SQL 응답 (cache_control prefix 별 cache read/write usage 포함,
+  실제 API 처럼 min_cache_tokens 보다 짧은 prefix 는 캐시하지 않음)
+- rate_limit_every=N: N 번째 요청마다 429 + retry-after
+- "stream": true 요청은 SSE 로 조각마다 token_delay 초씩 전송 (text 뒤에 trailer 를 덧붙여서 설명이 이어지는 응답 흉내)
+- POST /v1/messages/batches, GET /v1/messages/batches/{id}[/results]:
+  Message Batches API 흉내 - 제출 후 batch_latency 초가 지나면 ended
+
+사용:
+    python scripts/claude_stub_server.py --port 8765 --latency 0.5 --rate-limit-every 10
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765 ANTHROPIC_API=stub python main.py --model sonnet --claude-mode async
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime, timedelta, timezone
+import argparse
+import itertools
+import json
+import threading
+import time
+
+STUB_SQL = "```sql\nSELECT count(*) FROM singer;\n```"
+MIN_CACHE_TOKENS = 1024  # Sonnet 의 최소 cacheable prefix
+
+
+class StubServer:
+
+    def __init__(self, port: int = 0, latency: float = 0.2, rate_limit_every: int = 0,
+                 retry_after: float = 0.5, text: str = STUB_SQL, batch_latency: float = 1.0,
+                 token_delay: float = 0.01, trailer: str = "", min_cache_tokens: int = MIN_CACHE_TOKENS):
+        self.latency = latency
+        self.min_cache_tokens = min_cache_tokens
+        self.token_delay = token_delay
+        self.trailer = trailer
+        self.streamed_chunks = 0
+        self.batch_latency = batch_latency
+        self.batches = {}
+        self.cached_prefixes = set()
+        self.lock = threading.Lock()
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.text = text
+        self.counter = itertools.count(1)
+        self.requests = 0
+        self.rate_limited = 0
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, status: int, body: dict, headers: dict = None):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def read_json(self) -> dict:
+                length = int(self.headers.get("content-length", 0))
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def not_found(self):
+                self.send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+            def do_GET(self):
+                parts = self.path.split("?")[0].strip("/").split("/")
+                if parts[:3] != ["v1", "messages", "batches"] or len(parts) not in (4, 5):
+                    return self.not_found()
+                batch = server.batches.get(parts[3])
+                if batch is None:
+                    return self.not_found()
+                if len(parts) == 4:
+                    return self.send_json(200, server.batch_status(batch))
+                if not server.batch_ended(batch):
+                    return self.not_found()
+                lines = [
+                    json.dumps({"custom_id": request["custom_id"],
+                                "result": {"type": "succeeded", "message": server.message(request["params"], n)}})
+                    for n, request in enumerate(batch["requests"], 1)
+                ]
+                payload = ("\n".join(lines) + "\n").encode()
+                self.send_response(200)
+                self.send_header("content-type", "application/binary")
+                self.send_header("content-length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                path = self.path.split("?")[0].rstrip("/")
+                if path == "/v1/messages/batches":
+                    batch = server.create_batch(self.read_json(), self.headers.get("host"))
+                    return self.send_json(200, server.batch_status(batch))
+                if path != "/v1/messages":
+                    return self.not_found()
+                request = self.read_json()
+                n = next(server.counter)
+                server.requests += 1
+                if server.rate_limit_every and n % server.rate_limit_every == 0:
+                    server.rate_limited += 1
+                    return self.send_json(
+                        429,
+                        {"type": "error", "error": {"type": "rate_limit_error", "message": "stub rate limit"}},
+                        {"retry-after": str(server.retry_after)}
+                    )
+                time.sleep(server.latency)
+                if request.get("stream"):
+                    return self.send_stream(server.message(request, n))
+                self.send_json(200, server.message(request, n))
+
+            def send_event(self, event: dict):
+                self.wfile.write(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode())
+                self.wfile.flush()
+
+            def send_stream(self, message: dict):
+                self.send_response(200)
+                self.send_header("content-type", "text/event-stream")
+                self.send_header("connection", "close")
+                self.end_headers()
+                usage = message["usage"]
+                chunks = server.chunks(message["content"][0]["text"] + server.trailer)
+                try:
+                    self.send_event({"type": "message_start",
+                                     "message": dict(message, content=[], stop_reason=None,
+                                                     usage=dict(usage, output_tokens=1))})
+                    self.send_event({"type": "content_block_start", "index": 0,
+                                     "content_block": {"type": "text", "text": ""}})
+                    for chunk in chunks:
+                        time.sleep(server.token_delay)
+                        self.send_event({"type": "content_block_delta", "index": 0,
+                                         "delta": {"type": "text_delta", "text": chunk}})
+                        with server.lock:
+                            server.streamed_chunks += 1
+                    self.send_event({"type": "content_block_stop", "index": 0})
+                    self.send_event({"type": "message_delta",
+                                     "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                     "usage": {"output_tokens": len(chunks)}})
+                    self.send_event({"type": "message_stop"})
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client 가 stream 을 일찍 닫음
+
+        return Handler
+
+    def cache_usage(self, request: dict) -> dict:
+        """
+        prompt caching 흉내 (토큰 수는 글자 수 / 4)
+        - cache_control block 까지의 prefix 중 min_cache_tokens 이상인 것만 캐시 대상 (짧으면 표시가 무시됨)
+        - 이미 본 가장 긴 prefix 는 cache read, 가장 긴 대상 prefix 의 나머지는 cache write
+        """
+        blocks = list(request.get("system") or [])
+        for message in request.get("messages", []):
+            content = message.get("content")
+            blocks.extend(content if isinstance(content, list) else [{"type": "text", "text": content}])
+        texts = [block.get("text", "") if isinstance(block, dict) else str(block) for block in blocks]
+        total_tokens = len("".join(texts)) // 4
+        prefixes = [("\0".join(texts[:i + 1]), len("".join(texts[:i + 1])) // 4)
+                    for i, block in enumerate(blocks) if isinstance(block, dict) and block.get("cache_control")]
+        prefixes = [(prefix, tokens) for prefix, tokens in prefixes if tokens >= self.min_cache_tokens]
+        if not prefixes:
+            return {"input_tokens": total_tokens, "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0}
+
+        with self.lock:
+            read = max((tokens for prefix, tokens in prefixes if prefix in self.cached_prefixes), default=0)
+            self.cached_prefixes.update(prefix for prefix, _ in prefixes)
+        written = prefixes[-1][1] - read
+        return {
+            "input_tokens": total_tokens - read - written,
+            "cache_read_input_tokens": read,
+            "cache_creation_input_tokens": written
+        }
+
+    def message(self, request: dict, n: int) -> dict:
+        return {
+            "id": f"msg_stub_{n}",
+            "type": "message",
+            "role": "assistant",
+            "model": request.get("model", "stub"),
+            "content": [{"type": "text", "text": self.text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {**self.cache_usage(request), "output_tokens": len(self.text) // 4}
+        }
+
+    @staticmethod
+    def chunks(text: str) -> list:
+        """토큰 흉내: 4 글자씩"""
+        return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+    def create_batch(self, body: dict, host: str) -> dict:
+        batch_id = f"msgbatch_stub_{len(self.batches) + 1}"
+        self.batches[batch_id] = {
+            "id": batch_id,
+            "requests": body.get("requests", []),
+            "created": datetime.now(timezone.utc),
+            "host": host
+        }
+        self.requests += len(body.get("requests", []))
+        return self.batches[batch_id]
+
+    def batch_ended(self, batch: dict) -> bool:
+        return datetime.now(timezone.utc) - batch["created"] >= timedelta(seconds=self.batch_latency)
+
+    def batch_status(self, batch: dict) -> dict:
+        ended = self.batch_ended(batch)
+        n = len(batch["requests"])
+        return {
+            "id": batch["id"],
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {"processing": 0 if ended else n, "succeeded": n if ended else 0,
+                               "errored": 0, "canceled": 0, "expired": 0},
+            "created_at": batch["created"].isoformat(),
+            "expires_at": (batch["created"] + timedelta(days=1)).isoformat(),
+            "ended_at": datetime.now(timezone.utc).isoformat() if ended else None,
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": f"http://{batch['host']}/v1/messages/batches/{batch['id']}/results" if ended else None
+        }
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Anthropic API stub")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per response")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="Return 429 on every Nth request")
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    parser.add_argument("--batch-latency", type=float, default=1.0, help="Seconds until a batch ends")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Seconds between streamed chunks")
+    parser.add_argument("--trailer", default="", help="Text streamed after the SQL (e.g. an explanation)")
+    parser.add_argument("--min-cache-tokens", type=int, default=MIN_CACHE_TOKENS,
+                        help="Shortest prefix (chars / 4) that cache_control caches")
+    args = parser.parse_args()
+
+    server = StubServer(args.port, args.latency, args.rate_limit_every, args.retry_after,
+                        batch_latency=args.batch_latency, token_delay=args.token_delay, trailer=args.trailer,
+                        min_cache_tokens=args.min_cache_tokens)
+    print(f"Stub Anthropic API listening on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
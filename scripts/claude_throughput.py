@@ -0,0 +1,53 @@
+"""
+Async Claude throughput vs concurrency (로컬 stub 서버 대상, 실제 API 호출 없음)
+
+    python scripts/claude_throughput.py -n 64 --latency 0.2 --concurrency 1 4 16 --rate-limit-every 20
+"""
+
+from pathlib import Path
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from claude_stub_server import StubServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Async Claude throughput against a local stub")
+    parser.add_argument("-n", "--requests", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    cli = parser.parse_args()
+
+    server = StubServer(latency=cli.latency, rate_limit_every=cli.rate_limit_every).start()
+    os.environ["ANTHROPIC_BASE_URL"] = server.base_url
+    os.environ.setdefault("ANTHROPIC_API", "stub")
+
+    from claude_integration import generate_sql_claude_many
+
+    schema = "CREATE TABLE singer (\n\tsinger_id INTEGER,\n\tname TEXT\n)"
+    requests = [(f"How many singers are there? #{i}", schema, []) for i in range(cli.requests)]
+
+    print(f"{'concurrency':>11} {'seconds':>8} {'req/s':>8} {'p50 lat':>8} {'retries':>8}")
+    for concurrency in cli.concurrency:
+        args = argparse.Namespace(k_examples=0, strategy="random", concurrency=concurrency,
+                                  no_cache=True, stream=False)
+        start = time.perf_counter()
+        responses = asyncio.run(generate_sql_claude_many(requests, args))
+        elapsed = time.perf_counter() - start
+        latencies = sorted(stats["latency"] for _, stats in responses)
+        retries = sum(stats.get("retries", 0) for _, stats in responses)
+        print(f"{concurrency:>11} {elapsed:>8.2f} {len(requests)/elapsed:>8.1f} "
+              f"{latencies[len(latencies)//2]:>8.2f} {retries:>8}")
+
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
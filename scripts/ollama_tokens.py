@@ -0,0 +1,76 @@
+"""
+Ollama 생성 토큰 수: 제한 없음 (stop / num_predict 없음) vs 기본 설정 (models.SQL_STOP, NUM_PREDICT)
+
+같은 dev 질문들로 두 설정을 돌려서 질문당 평균 생성 토큰, 잘린 응답 수, latency, SQL 이 달라진 수를 비교
+(실행 중인 Ollama 서버 필요, 응답 캐시는 사용하지 않음)
+
+    python scripts/ollama_tokens.py --model qwen -n 50 -k 3 -s jacc
+"""
+
+from pathlib import Path
+import argparse
+import json
+import random
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models import generate_sql, prefetch_examples, NUM_PREDICT
+from utils.RAG_setup import get_schema_safe
+from utils.schema_catalog import spider_db_dir
+from paths import SPIDER_DIR
+
+dev_path = SPIDER_DIR / "evaluation_examples" / "examples" / "dev.json"
+
+
+def run(items, all_examples, args):
+    sqls, tokens, truncated = [], [], 0
+    start = time.perf_counter()
+    for (example, schema), examples in zip(items, all_examples):
+        stats = {}
+        db_path = spider_db_dir / example["db_id"] / f"{example['db_id']}.sqlite"
+        sqls.append(generate_sql(example["question"], schema, args, f"sqlite:///{db_path}", examples, stats))
+        tokens.append(stats.get("output_tokens", 0))
+        truncated += stats.get("done_reason") == "length"
+    elapsed = time.perf_counter() - start
+    return sqls, sum(tokens) / len(tokens), max(tokens), truncated, elapsed / len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Average generated tokens per question, unbounded vs bounded")
+    parser.add_argument("--model", choices=["qwen", "mistral"], default="qwen")
+    parser.add_argument("-n", type=int, default=50, help="Number of dev questions")
+    parser.add_argument("-k", "--k-examples", type=int, default=3)
+    parser.add_argument("-s", "--strategy", choices=["random", "rag", "ic", "jacc"], default="jacc")
+    parser.add_argument("--num-predict", type=int, default=NUM_PREDICT)
+    cli = parser.parse_args()
+
+    with open(dev_path, "r") as f:
+        dev_data = json.load(f)
+    random.seed(88)
+    batch = random.sample(dev_data, cli.n)
+    items = [(example, get_schema_safe(example["db_id"])) for example in batch]
+
+    base = dict(model=cli.model, k_examples=cli.k_examples, strategy=cli.strategy, cluster=1,
+                jaccard_lsh=False, use_limit=False, no_cache=True, refresh_cache=False, stream=False)
+    all_examples = prefetch_examples([(example["question"], schema) for example, schema in items],
+                                     argparse.Namespace(**base))
+
+    configs = [
+        ("unbounded", argparse.Namespace(num_predict=0, stop=[], **base)),
+        ("bounded", argparse.Namespace(num_predict=cli.num_predict, stop=None, **base)),
+    ]
+    results = {}
+    print(f"{'config':>10} {'mean tok':>9} {'max tok':>8} {'truncated':>10} {'s/question':>11}")
+    for name, args in configs:
+        sqls, mean, most, truncated, latency = run(items, all_examples, args)
+        results[name] = sqls
+        print(f"{name:>10} {mean:>9.1f} {most:>8} {truncated:>10} {latency:>11.2f}")
+
+    changed = sum(a != b for a, b in zip(results["unbounded"], results["bounded"]))
+    print(f"Extracted SQL changed: {changed}/{len(items)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Quantized RAG index vs exact flat search on the Spider train pool (example store)
+
+Spider dev 질문으로 각 index 종류를 store 의 벡터로 메모리에서 만들어서 정확한 flat 검색과 비교
+- recall@k: FAISS top-k 중 flat top-k 와 같은 예제 비율
+- candidate recall: rerank 에 넘기는 k * 3 후보 기준 recall
+- few-shot overlap: rerank_candidates 까지 거친 최종 k 개 예제가 flat 결과와 겹치는 비율
+- memory: 직렬화한 index 크기 (flat 은 float32 벡터), 예제당 bytes
+- latency: 질문 하나씩 검색한 ms (평균 / p95)
+
+    python scripts/rag_index_report.py -k 5 -n 300 --types fp16 sq8 pq --pq-m 64
+    python scripts/rag_index_report.py --json output/rag_index_report.json
+"""
+
+from collections import Counter
+from pathlib import Path
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from paths import SPIDER_DIR
+from utils import RAG_examples
+from utils.RAG_setup import get_schema_safe
+from utils.embeddings import get_embedding_service
+from utils.example_store import INDEX_TYPES, PQ_M, PQ_NBITS, build_faiss_index, get_example_store, index_spec
+
+dev_path = SPIDER_DIR / "evaluation_examples" / "examples" / "dev.json"
+
+
+def timed_search(search, queries: np.ndarray, n: int) -> tuple:
+    """질문 하나씩 검색 → (indices, distances, 질문별 ms)"""
+    indices, distances, ms = [], [], []
+    for row in range(len(queries)):
+        start = time.perf_counter()
+        d, i = search(queries[row:row + 1], n)
+        ms.append((time.perf_counter() - start) * 1000)
+        indices.append(i[0])
+        distances.append(d[0])
+    return np.array(indices), np.array(distances), np.array(ms)
+
+
+def overlap(a: list, b: list) -> int:
+    return sum((Counter(a) & Counter(b)).values())
+
+
+def few_shot(indices, distances, schemas: list, k: int) -> list:
+    return [[(ex["input"], ex["query"]) for ex in RAG_examples.rerank_candidates(i, d, schema, k)]
+            for i, d, schema in zip(indices, distances, schemas)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall / few-shot overlap / memory / latency of quantized RAG indexes")
+    parser.add_argument("-k", type=int, default=5, help="Few-shot examples per question")
+    parser.add_argument("-n", type=int, default=300, help="Number of dev questions")
+    parser.add_argument("--types", nargs="+", default=["fp16", "sq8", "pq"], choices=INDEX_TYPES[1:])
+    parser.add_argument("--pq-m", type=int, default=PQ_M)
+    parser.add_argument("--pq-nbits", type=int, default=PQ_NBITS)
+    parser.add_argument("--json", type=Path, default=None, help="Also write the report to this file")
+    cli = parser.parse_args()
+
+    import faiss
+
+    with open(dev_path, "r") as f:
+        dev = json.load(f)[:cli.n]
+    schemas = [get_schema_safe(item["db_id"]) for item in dev]
+
+    RAG_examples.load_index()
+    store = get_example_store()
+    queries = get_embedding_service().encode_many([item["question"] for item in dev])
+    n = cli.k * 3
+
+    exact_i, exact_d, exact_ms = timed_search(store.exact_search, queries, n)
+    exact_examples = few_shot(exact_i, exact_d, schemas, cli.k)
+
+    rows = [{
+        "index": "flat",
+        "bytes": int(store.embeddings.nbytes),
+        "build_s": 0.0,
+        f"recall@{cli.k}": 1.0,
+        f"candidate_recall@{n}": 1.0,
+        "few_shot_overlap": 1.0,
+        "ms_mean": float(exact_ms.mean()),
+        "ms_p95": float(np.percentile(exact_ms, 95))
+    }]
+    for index_type in cli.types:
+        spec = index_spec(index_type, cli.pq_m, cli.pq_nbits)
+        start = time.perf_counter()
+        index = build_faiss_index(store.embeddings, spec)
+        build_s = time.perf_counter() - start
+
+        approx_i, approx_d, ms = timed_search(index.search, queries, n)
+        approx_examples = few_shot(approx_i, approx_d, schemas, cli.k)
+        label = index_type if index_type != "pq" else f"pq{spec['m']}x{spec['nbits']}"
+        rows.append({
+            "index": label,
+            "bytes": int(faiss.serialize_index(index).nbytes),
+            "build_s": build_s,
+            f"recall@{cli.k}": float(np.mean([overlap(list(e[:cli.k]), list(a[:cli.k])) / cli.k
+                                              for e, a in zip(exact_i, approx_i)])),
+            f"candidate_recall@{n}": float(np.mean([overlap(list(e), list(a)) / n
+                                                    for e, a in zip(exact_i, approx_i)])),
+            "few_shot_overlap": float(np.mean([overlap(e, a) / max(len(e), 1)
+                                               for e, a in zip(exact_examples, approx_examples)])),
+            "ms_mean": float(ms.mean()),
+            "ms_p95": float(np.percentile(ms, 95))
+        })
+
+    print(f"pool {len(store)} x {store.manifest['dim']}, {len(dev)} dev questions, k={cli.k}")
+    print(f"{'index':>10} {'MB':>8} {'B/ex':>7} {'recall@k':>9} {'cand rec':>9} {'few-shot':>9} "
+          f"{'ms':>7} {'p95 ms':>7} {'build s':>8}")
+    for row in rows:
+        print(f"{row['index']:>10} {row['bytes'] / 2**20:>8.2f} {row['bytes'] / len(store):>7.0f} "
+              f"{row[f'recall@{cli.k}']:>9.3f} {row[f'candidate_recall@{n}']:>9.3f} {row['few_shot_overlap']:>9.3f} "
+              f"{row['ms_mean']:>7.3f} {row['ms_p95']:>7.3f} {row['build_s']:>8.2f}")
+
+    if cli.json:
+        cli.json.parent.mkdir(parents=True, exist_ok=True)
+        with open(cli.json, "w") as f:
+            json.dump({"pool": len(store), "dim": store.manifest["dim"], "queries": len(dev), "k": cli.k,
+                       "rows": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
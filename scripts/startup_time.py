@@ -0,0 +1,106 @@
+"""
+Startup time: `python -X importtime` 로 실행 경로별 import 시간을 재고 예산을 넘으면 exit 1
+
+경로마다 새 프로세스로 --repeat 번 실행해서 wall time 중앙값과 import 합계를 보고
+- 예산 (ms, wall time) 초과 또는 그 경로에서 로드되면 안 되는 모듈 (torch, faiss ...) 이 로드되면 실패
+- DATABASE_URL 은 지우고 실행 (database.py 가 import 시 engine 을 만들지 않는지 확인)
+
+    python scripts/startup_time.py
+    python scripts/startup_time.py --repeat 5 --budget help=200 --top 15
+"""
+
+from pathlib import Path
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+root = Path(__file__).parent.parent
+
+HEAVY = ["torch", "sentence_transformers", "faiss", "sklearn", "scipy", "tiktoken"]
+# (이름, python 인자, 로드되면 안 되는 모듈, 예산 ms)
+SCENARIOS = [
+    ("help", ["main.py", "--help"],
+     HEAVY + ["anthropic", "langchain_core", "langchain_ollama", "langchain_community", "sqlalchemy"], 250),
+    ("ollama-random", ["-c", "import evaluation.benchmark, models; models.get_llm('qwen')"],
+     HEAVY + ["anthropic", "langchain_community"], 1500),
+    ("sonnet-random", ["-c", "import evaluation.benchmark, claude_integration"],
+     HEAVY + ["langchain_ollama", "langchain_community"], 1500),
+]
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(argv: list) -> tuple:
+    """
+    :return: (wall 초, import self 합계 초, {top-level 모듈: cumulative 초}, 로드된 모듈 집합)
+    """
+    env = {key: value for key, value in os.environ.items() if key != "DATABASE_URL"}
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", *argv], cwd=root, env=env,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(argv)} exited with {proc.returncode}:\n{proc.stderr[-2000:]}")
+
+    total, top, modules = 0, {}, set()
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        total += int(self_us)
+        modules.add(name)
+        if len(indent) == 1:  # 최상위 import
+            top[name] = top.get(name, 0) + int(cumulative_us) / 1e6
+    return wall, total / 1e6, top, modules
+
+
+def parse_budgets(specs: list) -> dict:
+    budgets = {}
+    for spec in specs or []:
+        name, _, value = spec.partition("=")
+        if name not in {scenario[0] for scenario in SCENARIOS} or not value:
+            raise ValueError(f"Invalid budget '{spec}' (expected <scenario>=<ms>)")
+        budgets[name] = float(value)
+    return budgets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import-time startup cost per execution path")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario (median is reported)")
+    parser.add_argument("--budget", nargs="+", default=None, help="Override budgets, e.g. help=200 ollama-random=1500")
+    parser.add_argument("--top", type=int, default=8, help="Slowest top-level imports to list per scenario")
+    parser.add_argument("--only", nargs="+", default=None, help="Scenarios to run")
+    cli = parser.parse_args()
+    budgets = parse_budgets(cli.budget)
+
+    failures = []
+    for name, argv, forbidden, budget in SCENARIOS:
+        if cli.only and name not in cli.only:
+            continue
+        budget = budgets.get(name, budget)
+        runs = [measure(argv) for _ in range(cli.repeat)]
+        wall = statistics.median(run[0] for run in runs)
+        imports = statistics.median(run[1] for run in runs)
+        top, modules = runs[-1][2], runs[-1][3]
+        loaded = sorted(module for module in forbidden if module in modules)
+
+        status = "ok" if wall * 1000 <= budget and not loaded else "FAIL"
+        print(f"[{status}] {name}: wall {wall * 1000:.0f} ms (budget {budget:.0f} ms), imports {imports * 1000:.0f} ms")
+        for module, seconds in sorted(top.items(), key=lambda item: -item[1])[:cli.top]:
+            print(f"    {seconds * 1000:>8.1f} ms  {module}")
+        if loaded:
+            print(f"    should not be imported: {', '.join(loaded)}")
+        if status == "FAIL":
+            failures.append(name)
+
+    if failures:
+        print(f"Startup budget exceeded: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Claude prompt caching: breakpoint 는 최소 prefix 길이 이상일 때만, stub 도 같은 규칙"""
+
+from argparse import Namespace
+from pathlib import Path
+import sys
+
+import pytest
+
+pytest.importorskip("anthropic")
+
+from claude_integration import CACHE_CONTROL, CACHE_MIN_TOKENS, create_prompt  # noqa: E402
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+from claude_stub_server import StubServer  # noqa: E402
+
+SMALL_SCHEMA = "Tables:\nsinger(singer_id, name, age)\nconcert(concert_id, year)"
+LARGE_SCHEMA = "Tables:\n" + "\n".join(
+    f"table_{t}({', '.join(f'column_{t}_{c}' for c in range(12))})" for t in range(60))
+
+
+def marked(blocks: list) -> list:
+    return [block.get("cache_control") == CACHE_CONTROL for block in blocks]
+
+
+def test_small_schema_has_no_breakpoints():
+    system, content = create_prompt("How many singers?", SMALL_SCHEMA, Namespace(k_examples=3), "")
+    assert marked(system) == [False]
+    assert marked(content) == [False, False]
+
+
+def test_large_schema_prefix_gets_a_breakpoint():
+    system, content = create_prompt("How many singers?", LARGE_SCHEMA, Namespace(k_examples=3), "")
+    # system 규칙만으로는 최소 길이에 못 미침 → 스키마 block 까지만 표시, 질문 block 은 표시하지 않음
+    assert marked(system) == [False]
+    assert marked(content) == [True, False]
+
+
+def request(schema: str, question: str, mark: bool) -> dict:
+    schema_block = {"type": "text", "text": schema}
+    if mark:
+        schema_block["cache_control"] = CACHE_CONTROL
+    return {"system": [{"type": "text", "text": "rules"}],
+            "messages": [{"role": "user", "content": [schema_block, {"type": "text", "text": question}]}]}
+
+
+@pytest.fixture
+def stub():
+    server = StubServer(min_cache_tokens=CACHE_MIN_TOKENS)
+    yield server
+    server.httpd.server_close()
+
+
+def test_stub_ignores_short_prefixes(stub):
+    for _ in range(2):
+        usage = stub.cache_usage(request(SMALL_SCHEMA, "q", mark=True))
+        assert usage["cache_read_input_tokens"] == usage["cache_creation_input_tokens"] == 0
+        assert usage["input_tokens"] > 0
+
+
+def test_stub_caches_long_prefixes(stub):
+    schema = "x" * (CACHE_MIN_TOKENS * 4 + 100)
+    first = stub.cache_usage(request(schema, "first question", mark=True))
+    second = stub.cache_usage(request(schema, "second question", mark=True))
+    assert first["cache_read_input_tokens"] == 0 and first["cache_creation_input_tokens"] >= CACHE_MIN_TOKENS
+    assert second["cache_read_input_tokens"] == first["cache_creation_input_tokens"]
+    assert second["cache_creation_input_tokens"] == 0
+    # 표시가 없으면 같은 prefix 라도 캐시되지 않음
+    unmarked = stub.cache_usage(request(schema, "third question", mark=False))
+    assert unmarked["cache_read_input_tokens"] == 0
@@ -0,0 +1,61 @@
+"""fetch_rows 의 timeout / max_rows 와 timeout 오류 분류"""
+
+import sqlite3
+import time
+
+import pytest
+
+from agent.states import ErrorType, classify_error
+from utils.db_pool import QueryTimeoutError, SQLitePool, fetch_rows
+
+ENDLESS = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c"
+COUNTER = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT x FROM c"
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = tmp_path / "singer.sqlite"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE singer (name TEXT, age INTEGER)")
+    conn.executemany("INSERT INTO singer VALUES (?, ?)", [(f"s{i}", 20 + i) for i in range(50)])
+    conn.commit()
+    conn.close()
+    pool = SQLitePool()
+    yield pool, path
+    pool.close()
+
+
+def test_timeout_interrupts_and_connection_is_reusable(db):
+    pool, path = db
+    with pool.connection(path) as conn:
+        start = time.monotonic()
+        with pytest.raises(QueryTimeoutError) as info:
+            fetch_rows(conn, ENDLESS, timeout=0.2)
+        assert time.monotonic() - start < 5
+        # progress handler 는 해제되고 같은 connection 으로 계속 실행 가능
+        assert fetch_rows(conn, "SELECT count(*) FROM singer", timeout=0.2) == [(50,)]
+    with pool.connection(path) as reused:
+        assert reused is conn
+        assert fetch_rows(reused, "SELECT max(age) FROM singer") == [(69,)]
+    assert classify_error(str(info.value), info.value) == ErrorType.TIMEOUT_ERROR
+    assert classify_error(str(info.value)) == ErrorType.TIMEOUT_ERROR
+
+
+def test_max_rows_truncates(db):
+    pool, path = db
+    with pool.connection(path) as conn:
+        assert len(fetch_rows(conn, "SELECT * FROM singer", max_rows=10)) == 10
+        assert len(fetch_rows(conn, "SELECT * FROM singer", max_rows=0)) == 50
+        # 끝없는 결과도 max_rows 개만 fetch
+        assert fetch_rows(conn, COUNTER, timeout=5, max_rows=3) == [(1,), (2,), (3,)]
+
+
+def test_other_errors_are_not_timeouts(db):
+    pool, path = db
+    with pool.connection(path) as conn:
+        with pytest.raises(sqlite3.OperationalError) as info:
+            fetch_rows(conn, "SELECT nope FROM singer", timeout=0.2)
+    assert not isinstance(info.value, QueryTimeoutError)
+    assert classify_error(str(info.value), info.value) == ErrorType.SCHEMA_ERROR
+    assert classify_error("maximum recursion depth exceeded") == ErrorType.UNKNOWN_ERROR
+    assert classify_error("too many terms in compound SELECT") == ErrorType.UNKNOWN_ERROR
@@ -0,0 +1,89 @@
+"""example store: manifest / memmap / StringTable 로 쓰고 다시 읽고 검색"""
+
+import json
+
+import numpy as np
+import pytest
+
+from utils.example_store import (ExampleStore, StringTable, VERSION, index_spec, read_manifest, set_index,
+                                 write_store)
+
+
+def unit_vectors(count: int, dim: int, seed: int = 0) -> np.ndarray:
+    x = np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def pool(tmp_path):
+    count = 600
+    embeddings = unit_vectors(count, 16)
+    questions = [f"How many singers are older than {i}?" for i in range(count)]
+    questions[1] = ""
+    questions[2] = "가수는 몇 명인가요? ✓"
+    sqls = [f"SELECT count(*) FROM singer WHERE age > {i}" for i in range(count)]
+    db_ids = [["concert_singer", "pets_1", "car_1"][i % 3] for i in range(count)]
+    directory = tmp_path / "store"
+    write_store(embeddings, questions, sqls, db_ids, directory)
+    return directory, embeddings, questions, sqls, db_ids
+
+
+def test_round_trip(pool):
+    directory, embeddings, questions, sqls, db_ids = pool
+    store = ExampleStore(directory)
+
+    assert len(store) == len(questions)
+    assert store.index_spec == {"type": "flat"}
+    assert isinstance(store.embeddings, np.memmap)
+    np.testing.assert_array_equal(store.embeddings, embeddings)
+    assert isinstance(store.questions, StringTable)
+    assert list(store.questions) == questions
+    assert list(store.sqls) == sqls and list(store.db_ids) == db_ids
+    assert store.questions[2] == questions[2] and store.questions[1] == ""
+    assert store.questions[-1] == questions[-1]
+    assert store.sqls[3:6] == sqls[3:6]
+    with pytest.raises(IndexError):
+        store.questions[len(questions)]
+
+
+def test_flat_search_is_exact(pool):
+    pytest.importorskip("faiss")
+    directory, embeddings, *_ = pool
+    store = ExampleStore(directory)
+    queries = unit_vectors(5, 16, seed=1)
+    distances, indices = store.search(queries, 10)
+    expected = np.argsort(((queries[:, None, :] - embeddings[None]) ** 2).sum(-1), axis=1, kind="stable")[:, :10]
+    np.testing.assert_array_equal(indices, expected)
+    assert np.all(np.diff(distances, axis=1) >= 0)
+
+
+@pytest.mark.parametrize("index_type", ["fp16", "sq8", "ivf", "hnsw"])
+def test_set_index_round_trip(pool, index_type):
+    pytest.importorskip("faiss")
+    directory, embeddings, *_ = pool
+    manifest = set_index(index_spec(index_type, nlist=8, nprobe=8), directory)
+    assert manifest["index"]["type"] == index_type
+    assert (directory / manifest["index"]["file"]).stat().st_size == manifest["index"]["bytes"]
+
+    store = ExampleStore(directory)
+    assert read_manifest(directory)["index"] == store.index_spec
+    queries = embeddings[:20]
+    _, exact = store.exact_search(queries, 5)
+    _, approx = store.search(queries, 5, {"nprobe": 8, "ef_search": 64})
+    recall = np.mean([len(set(e) & set(a)) / 5 for e, a in zip(exact, approx)])
+    assert recall >= 0.9
+    # 자기 자신이 가장 가까움
+    assert np.mean(approx[:, 0] == np.arange(20)) >= 0.9
+
+    set_index(index_spec("flat"), directory)
+    assert ExampleStore(directory).index_spec == {"type": "flat"}
+
+
+def test_rejects_other_version_and_ragged_columns(pool, tmp_path):
+    directory, embeddings, questions, sqls, db_ids = pool
+    manifest = json.loads((directory / "manifest.json").read_text())
+    (directory / "manifest.json").write_text(json.dumps(dict(manifest, version=VERSION + 1)))
+    with pytest.raises(ValueError, match="version"):
+        ExampleStore(directory)
+    with pytest.raises(ValueError, match="Column lengths differ"):
+        write_store(embeddings, questions, sqls[:-1], db_ids, tmp_path / "ragged")
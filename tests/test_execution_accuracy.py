@@ -0,0 +1,98 @@
+"""EX: 행 순서와 무관한 digest, gold 캐시 무효화, 일시적 실패는 캐시하지 않음"""
+
+import os
+import sqlite3
+
+import pytest
+
+from evaluation import execution_accuracy
+from evaluation.execution_accuracy import GoldResultCache, gold_key, is_cacheable, result_digest
+
+
+def make_db(path, rows):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE singer (name TEXT, age INTEGER)")
+    conn.executemany("INSERT INTO singer VALUES (?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def test_digest_ignores_row_order():
+    rows = [("a", 1), ("b", 2), ("b", 2)]
+    assert result_digest(rows) == result_digest(list(reversed(rows)))
+    assert result_digest([(2,)]) == result_digest([(2.0,)])
+    # 중복 횟수와 열 순서는 구분
+    assert result_digest(rows) != result_digest([("a", 1), ("b", 2)])
+    assert result_digest([("a", 1)]) != result_digest([(1, "a")])
+
+
+def test_gold_key_changes_with_db_file(tmp_path):
+    path = tmp_path / "singer" / "singer.sqlite"
+    make_db(path, [("a", 1)])
+    key = gold_key(path, "SELECT name FROM singer")
+    cache = GoldResultCache(tmp_path / "gold.sqlite")
+    cache.put_many({key: ("digest", 1, None)})
+    assert cache.get_many([key]) == {key: ("digest", 1, None)}
+
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    touched = gold_key(path, "SELECT name FROM singer")
+    assert touched != key and cache.get_many([touched]) == {}
+
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO singer VALUES ('b', 2)")
+    conn.commit()
+    conn.close()
+    assert gold_key(path, "SELECT name FROM singer") not in (key, touched)
+    cache.close()
+
+
+@pytest.mark.parametrize("error", ["timeout: Query timeout: exceeded time limit of 1s", "interrupted",
+                                   "database is locked", "unable to open database file", "disk I/O error",
+                                   "too many rows (> 10)"])
+def test_transient_errors_are_not_cacheable(error):
+    assert not is_cacheable((None, 0, error))
+
+
+def test_results_and_sql_errors_are_cacheable():
+    assert is_cacheable(("digest", 3, None))
+    assert is_cacheable((None, 0, "no such column: nope"))
+    assert is_cacheable((None, 0, 'near "FROM": syntax error'))
+
+
+def test_evaluation_caches_only_stable_gold_results(tmp_path, monkeypatch):
+    monkeypatch.setattr(execution_accuracy, "spider_db_dir", tmp_path / "database")
+    make_db(tmp_path / "database" / "singer" / "singer.sqlite", [(f"s{i}", i) for i in range(20)])
+    results = [
+        {"db_id": "singer", "gold_sql": "SELECT name FROM singer", "predicted_sql": "SELECT name FROM singer"},
+        {"db_id": "singer", "gold_sql": "SELECT nope FROM singer", "predicted_sql": "SELECT 1"},
+        {"db_id": "singer", "gold_sql": "SELECT age FROM singer", "predicted_sql": "SELECT age FROM singer"},
+        {"db_id": "missing", "gold_sql": "SELECT 1", "predicted_sql": "SELECT 1"},
+    ]
+    cache_path = tmp_path / "gold.sqlite"
+
+    # 행 수 제한에 걸린 gold 는 캐시하지 않음 (다음 실행에서 다시)
+    report = execution_accuracy.evaluate_execution(results, 1, 5, 10, cache_path)
+    assert report["gold_cached"] == 0 and report["gold_errors"] == 4
+
+    report = execution_accuracy.evaluate_execution(results, 1, 5, 0, cache_path)
+    assert report["gold_cached"] == 1  # SQL 오류만 캐시되어 있었음
+    assert (report["correct"], report["counted"]) == (2, 2)
+
+    report = execution_accuracy.evaluate_execution(results, 1, 5, 0, cache_path)
+    assert report["gold_cached"] == 3  # DB 가 없는 예제는 hit 으로 세지 않음
+
+
+def test_gold_timeout_is_not_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(execution_accuracy, "spider_db_dir", tmp_path / "database")
+    make_db(tmp_path / "database" / "singer" / "singer.sqlite", [("a", 1)])
+    endless = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c"
+    results = [{"db_id": "singer", "gold_sql": endless, "predicted_sql": "SELECT 1"}]
+    cache_path = tmp_path / "gold.sqlite"
+
+    report = execution_accuracy.evaluate_execution(results, 1, 0.2, 0, cache_path)
+    assert report["examples"][0]["gold_error"].startswith("timeout:")
+    cache = GoldResultCache(cache_path)
+    assert cache._conn.execute("SELECT count(*) FROM gold").fetchone() == (0,)
+    cache.close()
@@ -0,0 +1,56 @@
+"""JaccardIndex: 기존 구현 (전체 점수 계산 후 (score, idx) 내림차순 정렬) 과 같은 순위"""
+
+import random
+
+import pytest
+
+from utils import jaccard
+from utils.jaccard import JaccardIndex, jaccard_similarity
+
+WORDS = ["how", "many", "singers", "are", "there", "what", "is", "the", "name", "of", "each",
+         "concert", "stadium", "average", "age", "list", "all", "Singers", "year", "?"]
+
+
+def baseline_top_k(questions: list, question: str, k: int) -> list:
+    scores = [(jaccard_similarity(question, train_q), i) for i, train_q in enumerate(questions)]
+    scores.sort(reverse=True)
+    return scores[:k]
+
+
+@pytest.fixture(scope="module")
+def pool():
+    rng = random.Random(7)
+    # 작은 어휘 → 동점이 많음
+    return [" ".join(rng.choices(WORDS, k=rng.randint(1, 8))) for _ in range(400)]
+
+
+@pytest.mark.parametrize("k", [1, 3, 5, 15, 50])
+def test_top_k_matches_baseline_sort(pool, k):
+    rng = random.Random(k)
+    queries = [" ".join(rng.choices(WORDS, k=rng.randint(1, 8))) for _ in range(30)]
+    index = JaccardIndex(pool)
+    for query, top in zip(queries, index.top_k_many(queries, k)):
+        assert top == baseline_top_k(pool, query, k)
+
+
+def test_fills_with_zero_scores_in_idx_order(pool):
+    """교집합이 있는 학습 질문이 k 개보다 적으면 나머지는 score 0, idx 내림차순"""
+    index = JaccardIndex(pool)
+    query = "unseen tokens only plus concert"
+    assert index.top_k(query, 40) == baseline_top_k(pool, query, 40)
+    assert index.top_k("completely unseen", 3) == baseline_top_k(pool, "completely unseen", 3)
+
+
+def test_k_larger_than_pool():
+    questions = ["how many singers", "list singers", "average age"]
+    index = JaccardIndex(questions)
+    assert index.top_k("singers", 10) == baseline_top_k(questions, "singers", 10)
+
+
+def test_chunked_batches_match_single_queries(pool, monkeypatch):
+    monkeypatch.setattr(jaccard, "QUERY_CHUNK", 7)
+    rng = random.Random(11)
+    queries = [" ".join(rng.choices(WORDS, k=rng.randint(1, 8))) for _ in range(30)]
+    index = JaccardIndex(pool)
+    assert index.top_k_many(queries, 5) == [baseline_top_k(pool, q, 5) for q in queries]
+    assert index.top_k_many([], 5) == []
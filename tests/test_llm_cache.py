@@ -0,0 +1,74 @@
+"""LLM 응답 캐시: key 안정성, --no-cache / --refresh-cache, 오래된 / 초과 항목 정리"""
+
+from argparse import Namespace
+import time
+
+import pytest
+
+from utils import llm_cache
+from utils.llm_cache import ResponseCache, cache_key
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path / "llm_cache.sqlite")
+    monkeypatch.setattr(llm_cache, "_cache", cache)
+    return cache
+
+
+def test_key_is_stable():
+    # 형식이 바뀌면 기존 캐시가 모두 miss 가 되므로 고정 값으로 확인
+    assert cache_key("ollama", "qwen2.5-coder:7b", 0, "SELECT") == \
+        "3ed4e419ed5a9a18e38f4314e9c12846df9986e89ad87b27d998e7119b2482bf"
+    blocks = [{"type": "text", "text": "hi", "cache_control": {"type": "ephemeral"}}]
+    reordered = [{"cache_control": {"type": "ephemeral"}, "text": "hi", "type": "text"}]
+    assert cache_key("claude", "sonnet", 0, blocks) == cache_key("claude", "sonnet", 0, reordered)
+
+
+@pytest.mark.parametrize("changed", [("claude", "qwen", 0, "p"), ("ollama", "mistral", 0, "p"),
+                                     ("ollama", "qwen", 0.7, "p"), ("ollama", "qwen", 0, "p ")])
+def test_key_covers_every_field(changed):
+    assert cache_key("ollama", "qwen", 0, "p") != cache_key(*changed)
+
+
+def test_lookup_and_store(cache):
+    args = Namespace(no_cache=False, refresh_cache=False)
+    key, response = llm_cache.lookup(args, "ollama", "qwen", 0, "prompt")
+    assert response is None and cache.misses == 1
+    llm_cache.store(key, "ollama", "qwen", "SELECT 1")
+    assert llm_cache.lookup(args, "ollama", "qwen", 0, "prompt") == (key, "SELECT 1")
+    assert cache.hits == 1
+
+
+def test_no_cache_neither_reads_nor_writes(cache):
+    llm_cache.store(cache_key("ollama", "qwen", 0, "prompt"), "ollama", "qwen", "SELECT 1")
+    key, response = llm_cache.lookup(Namespace(no_cache=True), "ollama", "qwen", 0, "prompt")
+    assert (key, response) == (None, None)
+    llm_cache.store(key, "ollama", "qwen", "SELECT 2")
+    assert cache._conn.execute("SELECT count(*) FROM responses").fetchone() == (1,)
+    assert cache.hits == cache.misses == 0
+
+
+def test_refresh_cache_overwrites(cache):
+    key = cache_key("ollama", "qwen", 0, "prompt")
+    llm_cache.store(key, "ollama", "qwen", "SELECT 1")
+    refresh_key, response = llm_cache.lookup(Namespace(refresh_cache=True), "ollama", "qwen", 0, "prompt")
+    assert (refresh_key, response) == (key, None)
+    llm_cache.store(refresh_key, "ollama", "qwen", "SELECT 2")
+    assert cache.get(key) == "SELECT 2"
+
+
+def test_evicts_old_and_least_recently_used(tmp_path):
+    path = tmp_path / "llm_cache.sqlite"
+    cache = ResponseCache(path, max_entries=0, max_age_days=0)
+    now = time.time()
+    rows = [("old", now - 100 * 86400, now), ("a", now - 10, now - 10), ("b", now - 10, now - 5),
+            ("c", now - 10, now - 1)]
+    cache._conn.executemany("INSERT INTO responses VALUES (?, 'ollama', 'qwen', 'SELECT 1', ?, ?)", rows)
+    cache._conn.commit()
+    cache._conn.close()
+
+    # 열 때 정리: 90 일 지난 항목, 그 다음 accessed_at 오래된 순으로 2 개만 남김
+    cache = ResponseCache(path, max_entries=2, max_age_days=90)
+    keys = {key for key, in cache._conn.execute("SELECT key FROM responses")}
+    assert keys == {"b", "c"}
@@ -0,0 +1,23 @@
+"""RAG rerank 의 테이블 overlap: DDL 스키마만 (요약 스키마는 기존처럼 overlap 0)"""
+
+import numpy as np
+
+from utils import RAG_examples
+from utils.RAG_examples import extract_tables, rerank_candidates
+
+DDL = "CREATE TABLE singer (\n\tname TEXT\n)\n\nCREATE TABLE \"concert\" (\n\tyear NUMERIC\n)"
+SUMMARY = "Tables:\nsinger(name)\nconcert(year)"
+
+
+def test_extract_tables_reads_ddl_only():
+    assert extract_tables(DDL) == {"singer", "concert"}
+    assert extract_tables(SUMMARY) == frozenset()
+
+
+def test_overlap_only_changes_ranking_for_ddl(monkeypatch):
+    monkeypatch.setattr(RAG_examples, "train_questions", ["q0", "q1"])
+    monkeypatch.setattr(RAG_examples, "train_sqls", ["SELECT * FROM pets", "SELECT * FROM singer"])
+    indices, distances = np.array([0, 1]), np.array([0.5, 0.4], dtype=np.float32)
+    # 0.7 * distance + 0.3 * overlap 내림차순 (기존 공식 그대로)
+    assert [e["input"] for e in rerank_candidates(indices, distances, DDL, 2)] == ["q1", "q0"]
+    assert [e["input"] for e in rerank_candidates(indices, distances, SUMMARY, 2)] == ["q0", "q1"]
@@ -0,0 +1,105 @@
+"""RunLog: --resume 가 끊기지 않은 실행과 같은 결과를 만드는지"""
+
+from argparse import Namespace
+
+import pytest
+
+from evaluation import benchmark
+from evaluation.run_log import RUN_STATS_KEYS, RunLog, legacy_result, load_results, run_config
+from utils import random_examples
+
+DB_IDS = ["concert_singer", "pets_1", "car_1", "flight_2"]
+
+
+@pytest.fixture
+def spider(tmp_path, monkeypatch):
+    """가짜 dev / train 데이터와 빈 DB 파일 (스키마는 db_id 로 대신)"""
+    for db_id in DB_IDS:
+        (tmp_path / db_id).mkdir()
+        (tmp_path / db_id / f"{db_id}.sqlite").touch()
+    monkeypatch.setattr(benchmark, "spider_db_dir_path", tmp_path)
+    monkeypatch.setattr(benchmark, "get_schema_safe", lambda db_id: f"CREATE TABLE {db_id} (id int)")
+    monkeypatch.setattr(benchmark, "summarize_schema", lambda schema: schema)
+    monkeypatch.setattr(random_examples, "train_data",
+                        [{"question": f"train question {i}", "query": f"SELECT {i}"} for i in range(500)])
+    return [{"db_id": DB_IDS[i % len(DB_IDS)], "question": f"dev question {i}", "query": f"SELECT {i}"}
+            for i in range(100)]
+
+
+def random_args(**overrides) -> Namespace:
+    args = {"model": "qwen", "strategy": "random", "k_examples": 3, "batch": 20, "resume": False}
+    return Namespace(**{**args, **overrides})
+
+
+def run(dev_data, args, path) -> list:
+    """run_spider_benchmark 의 준비 / 기록 부분만 (LLM 대신 few-shot 예제를 결과로)"""
+    run_log = RunLog(path, run_config(args), args.resume)
+    items, all_examples, _, _ = benchmark.prepare_batch(dev_data, args, run_log.done)
+    with run_log:
+        for item, examples in zip(items, all_examples):
+            run_log.append(item[0], {"question": item[1]["question"], "examples": examples})
+    return load_results(path)
+
+
+def truncate(path, results: int):
+    """header + 앞의 results 줄만 남김"""
+    lines = path.read_bytes().splitlines(keepends=True)
+    path.write_bytes(b"".join(lines[:results + 1]))
+
+
+def test_resume_matches_uninterrupted_run(spider, tmp_path):
+    full = run(spider, random_args(), tmp_path / "full.jsonl")
+
+    path = tmp_path / "resumed.jsonl"
+    run(spider, random_args(), path)
+    truncate(path, 10)
+    resumed = run(spider, random_args(resume=True), path)
+
+    assert len(full) == 20
+    assert resumed == full
+
+
+def test_resume_drops_torn_last_line(tmp_path):
+    path = tmp_path / "run.jsonl"
+    args = random_args()
+    with RunLog(path, run_config(args)) as run_log:
+        run_log.append(1, {"predicted_sql": "SELECT 1"})
+        run_log.append(2, {"predicted_sql": "SELECT 2"})
+    # 3번 결과를 쓰다가 끊긴 상태
+    with open(path, "ab") as f:
+        f.write(b'{"type": "result", "idx": 3, "result": {"predicted_')
+
+    with RunLog(path, run_config(args), resume=True) as run_log:
+        assert sorted(run_log.done) == [1, 2]
+        run_log.append(3, {"predicted_sql": "SELECT 3"})
+
+    assert [r["predicted_sql"] for r in load_results(path)] == ["SELECT 1", "SELECT 2", "SELECT 3"]
+    assert all(line.endswith(b"}") for line in path.read_bytes().splitlines())
+
+
+def test_resume_rejects_other_config(tmp_path):
+    path = tmp_path / "run.jsonl"
+    with RunLog(path, run_config(random_args())) as run_log:
+        run_log.append(1, {"predicted_sql": "SELECT 1"})
+
+    with pytest.raises(ValueError, match="different configuration"):
+        RunLog(path, run_config(random_args(k_examples=5)), resume=True)
+    # 실패한 resume 은 기존 로그를 건드리지 않음
+    assert len(load_results(path)) == 1
+
+
+def test_without_resume_starts_over(tmp_path):
+    path = tmp_path / "run.jsonl"
+    with RunLog(path, run_config(random_args())) as run_log:
+        run_log.append(1, {"predicted_sql": "SELECT 1"})
+
+    with RunLog(path, run_config(random_args(k_examples=5))) as run_log:
+        assert run_log.done == {}
+    assert load_results(path) == []
+
+
+def test_legacy_result_drops_run_stats():
+    result = {"predicted_sql": "SELECT 1", "success": True, "timings": {"llm": 0.5}, "latency": 0.6,
+              "time_to_sql": 0.4}
+    assert legacy_result(result) == {"predicted_sql": "SELECT 1", "success": True}
+    assert not set(RUN_STATS_KEYS) & set(legacy_result({key: 1 for key in RUN_STATS_KEYS}))
@@ -0,0 +1,83 @@
+"""prune_schema: FK join 경로의 테이블 유지, 넓은 테이블은 MAX_COLUMNS, 토큰 예산"""
+
+import pytest
+
+from utils import schema_linking
+from utils.schema_catalog import Column, DatabaseSchema, ForeignKey, Table
+from utils.schema_linking import MAX_COLUMNS, SchemaIndex, prune_schema
+from utils.token_count import count_tokens
+
+
+def table(name: str, columns: list, pk: str = None, fks: list = ()) -> Table:
+    t = Table(name)
+    t.columns = [Column(c, "TEXT", c == pk) for c in columns]
+    t.foreign_keys = [ForeignKey(*fk) for fk in fks]
+    return t
+
+
+def concert_db() -> DatabaseSchema:
+    wide = [f"attribute_{i}" for i in range(20)]
+    return DatabaseSchema("concert_test", [
+        table("singer", ["singer_id", "name", "age", "country"], "singer_id"),
+        table("stadium", ["stadium_id", *wide[:10], "capacity", "location", *wide[10:]], "stadium_id"),
+        # singer ↔ concert 는 이름이 질문과 겹치지 않는 연결 테이블로만 이어짐
+        table("performance", ["artist_ref", "event_ref", "fee"], None,
+              [("artist_ref", "singer", "singer_id"), ("event_ref", "concert", "concert_id")]),
+        table("concert", ["concert_id", "concert_name", "year", "stadium_id"], "concert_id",
+              [("stadium_id", "stadium", "stadium_id")]),
+        *[table(f"pet_record_{i}", ["pet_id", "pet_type", "weight", "owner_name"], "pet_id") for i in range(6)],
+    ])
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = concert_db()
+    monkeypatch.setattr(schema_linking, "_indexes", {})
+    monkeypatch.setattr(schema_linking, "get_database", lambda db_id: db if db_id == db.db_id else None)
+    # 임베딩 없이 이름 점수만 (encoder / 캐시 파일을 쓰지 않음)
+    monkeypatch.setattr(SchemaIndex, "_load_vectors", lambda self, texts: None)
+    return db
+
+
+def names(pruned) -> set:
+    return {t.name for t in pruned.tables}
+
+
+def test_keeps_join_path_tables(db):
+    index = SchemaIndex(db, use_embeddings=False)
+    keep = [db.tables[0], db.tables[2], db.tables[3]]  # singer, performance, concert
+    budget = count_tokens(index.render([0, 2, 3], {}).summary) + 2
+    assert budget < count_tokens(db.render_summary())
+
+    pruned = prune_schema("Show the name of each singer and the concert year", db.db_id, budget)
+    assert names(pruned) == {t.name for t in keep}
+    assert count_tokens(pruned.summary) <= budget
+    assert "performance.artist_ref = singer.singer_id" in pruned.summary
+    assert "performance.event_ref = concert.concert_id" in pruned.summary
+    assert "CREATE TABLE performance" in pruned.ddl
+
+
+def test_wide_table_keeps_keys_and_top_columns(db):
+    budget = count_tokens(db.render_summary()) - 20
+    pruned = prune_schema("What is the capacity and location of the stadium for each concert?", db.db_id, budget)
+    stadium = next(t for t in pruned.tables if t.name == "stadium")
+    kept = [c.name for c in stadium.columns]
+    assert len(kept) <= MAX_COLUMNS + 1  # + PK
+    assert {"stadium_id", "capacity", "location"} <= set(kept)
+    assert count_tokens(pruned.summary) <= budget
+    # FK 의 참조 컬럼이 남아 있으므로 FK 도 유지
+    assert "concert.stadium_id = stadium.stadium_id" in pruned.summary
+
+
+@pytest.mark.parametrize("budget", [40, 80, 120])
+def test_respects_budget(db, budget):
+    pruned = prune_schema("How many singers are from each country?", db.db_id, budget)
+    assert "singer" in names(pruned)
+    assert count_tokens(pruned.summary) <= budget
+
+
+def test_full_schema_when_within_budget(db):
+    full = db.render_summary()
+    pruned = prune_schema("anything", db.db_id, count_tokens(full))
+    assert pruned.summary == full and names(pruned) == {t.name for t in db.tables}
+    assert prune_schema("anything", "unknown_db", 10) is None
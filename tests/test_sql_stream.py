@@ -0,0 +1,78 @@
+"""SQLStreamExtractor: 완료 시점의 sql() 이 전체 응답의 extract_sql 과 같은지"""
+
+import random
+
+import pytest
+
+from models import SQLStreamExtractor, extract_sql
+
+RESPONSES = [
+    "SELECT count(*) FROM singer",
+    "SELECT name FROM singer WHERE age > 30;",
+    "SELECT name FROM singer;\nThis query lists the singers.",
+    "```sql\nSELECT name\nFROM singer\nWHERE age > 30\n```\nExplanation: filters by age; then returns names.",
+    "Here is the query:\n```sql\nSELECT T1.name FROM singer AS T1 JOIN concert AS T2 ON T1.id = T2.singer_id;\n```",
+    "```sql\nSELECT a FROM t\n```\n```sql\nSELECT b FROM t\n```",
+    "```\nSELECT a FROM t;\n```",
+    "```sql SELECT \\\"name\\\" FROM singer ```",
+    "SELECT name FROM singer WHERE name = 'a;b'",
+    "Note: use JOIN; here is the query:\n```sql\nSELECT T1.name FROM singer AS T1 JOIN concert AS T2\n```",
+    "Note: use JOIN; here is the query:\nSELECT name FROM singer;\nDone.",
+]
+
+
+def chunks(text: str, rng: random.Random):
+    start = 0
+    while start < len(text):
+        size = rng.randint(1, 6)
+        yield text[start:start + size]
+        start += size
+
+
+def stream(text: str, seed: int) -> tuple:
+    """조각 단위로 feed 해서 완료되면 멈춤 → (extractor, 소비한 글자 수)"""
+    extractor = SQLStreamExtractor()
+    consumed = 0
+    for chunk in chunks(text, random.Random(seed)):
+        consumed += len(chunk)
+        if extractor.feed(chunk):
+            break
+    return extractor, consumed
+
+
+@pytest.mark.parametrize("text", RESPONSES)
+@pytest.mark.parametrize("seed", range(5))
+def test_stream_matches_extract_sql(text, seed):
+    extractor, _ = stream(text, seed)
+    assert extractor.sql() == extract_sql(text)
+
+
+def test_stops_before_trailing_text():
+    text = RESPONSES[3]
+    extractor, consumed = stream(text, 0)
+    assert extractor.done
+    assert consumed < len(text)
+
+
+def test_preamble_semicolon_does_not_stop():
+    """SQL 이 아닌 문장의 ';' 에서 멈추면 뒤의 ```sql 블록을 놓침"""
+    text = "Note: use JOIN; here is the query:\n```sql\nSELECT T1.name FROM singer AS T1 JOIN concert AS T2\n```"
+    extractor = SQLStreamExtractor()
+    assert not extractor.feed("Note: use JOIN; here is the query:\n")
+    assert not extractor.feed("```sql\nSELECT T1.name FROM singer AS T1 JOIN concert AS T2\n")
+    assert extractor.feed("```")
+    assert extractor.sql() == extract_sql(text) == "SELECT T1.name FROM singer AS T1 JOIN concert AS T2"
+
+
+def test_sql_semicolon_stops_at_line_end():
+    extractor = SQLStreamExtractor()
+    assert not extractor.feed("SELECT name FROM singer;")
+    assert extractor.feed("\nThis query lists")
+    assert extractor.sql() == "SELECT name FROM singer"
+
+
+def test_open_block_waits_for_fence():
+    extractor = SQLStreamExtractor()
+    assert not extractor.feed("```sql\nSELECT a FROM t;")
+    assert extractor.feed("\n```")
+    assert extractor.sql() == "SELECT a FROM t"
@@ -0,0 +1,41 @@
+import pytest
+
+from evaluation.sweep import parse_grid
+from main import build_parser
+
+
+@pytest.fixture
+def parser():
+    return build_parser()
+
+
+def test_values_follow_argparse_types(parser):
+    axes = parse_grid(["k=3,5", "strategy=rag,jacc", "sql-timeout=0.5", "stream=true,false"], parser)
+    assert axes == [
+        ("k_examples", [3, 5]),
+        ("strategy", ["rag", "jacc"]),
+        ("sql_timeout", [0.5]),
+        ("stream", [True, False]),
+    ]
+
+
+def test_list_options_become_lists(parser):
+    assert parse_grid(["stop=;|```,;"], parser) == [("stop", [[";", "```"], [";"]])]
+
+
+def test_optional_none_default_keeps_argparse_type(parser):
+    assert parse_grid(["nprobe=8,16"], parser) == [("nprobe", [8, 16])]
+
+
+@pytest.mark.parametrize("spec", [
+    "strategy=rag,bogus",
+    "model=gpt",
+    "k=three",
+    "stream=maybe",
+    "unknown=1",
+    "mode=agent",
+    "k",
+])
+def test_invalid_values_rejected(parser, spec):
+    with pytest.raises(ValueError):
+        parse_grid([spec], parser)
@@ -0,0 +1,20 @@
+"""단계별 시간: 질문마다 계산하는 전략은 예제별 retrieval, 배치 검색은 전체 시간만"""
+
+from evaluation import benchmark
+from evaluation.timings import summarize_timings
+from test_run_log import random_args, spider  # noqa: F401 (fixture)
+
+
+def test_random_records_per_example_retrieval(spider):
+    items, _, stage_times, retrieval_batch = benchmark.prepare_batch(spider, random_args())
+    assert retrieval_batch is None
+    assert len(stage_times) == len(items) == 20
+    assert all(set(times) == {"schema", "retrieval"} for times in stage_times)
+
+
+def test_batch_retrieval_is_not_a_distribution():
+    results = [{"timings": {"schema": 0.01 * i}} for i in range(1, 11)]
+    summary = summarize_timings(results, {"seconds": 0.5, "examples": 10})
+    assert "retrieval" not in summary
+    assert summary["retrieval_batch"] == {"seconds": 0.5, "examples": 10}
+    assert summary["schema"]["count"] == 10
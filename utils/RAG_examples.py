@@ -1,48 +1,33 @@
-import pickle
-from pathlib import Path
-from sentence_transformers import SentenceTransformer
-from paths import DATA_DIR, INDEX_DIR
-import faiss
-import numpy as np
+from utils.embeddings import get_embedding_service
+from utils.example_store import get_example_store
+from functools import lru_cache
 import re
 
-embeddings_file = INDEX_DIR / "embeddings.npy"
-db_ids_file = INDEX_DIR / "db_ids.pkl"
-questions_file = INDEX_DIR / "questions.pkl"
-sqls_file = INDEX_DIR / "sqls.pkl"
-faiss_index_file = INDEX_DIR / "faiss.index"
-
-embedder = None
+# utils/example_store.py 의 memmap (벡터 / 질문 / SQL 모두 한 mapping 에서)
+embeddings = None
 train_questions = []
 train_sqls = []
-faiss_index = None
+example_store = None
 
 def load_index():
-    global embedder, embeddings, train_questions, train_sqls, faiss_index
-
-    print("*** Loading embedder...")
-    embedder = SentenceTransformer('BAAI/bge-base-en-v1.5')
-
-    print("*** Loading embeddings...")
-    embeddings = np.load(embeddings_file)
-
-    print("*** Loading questions...")
-    with open(questions_file, 'rb') as f:
-        train_questions = pickle.load(f)
-
-    print("*** Loading sqls...")
-    with open(sqls_file, 'rb') as f:
-        train_sqls = pickle.load(f)
-
-    print("*** Loading FAISS index...")
-    faiss_index = faiss.read_index(str(faiss_index_file))
-
-    print(f"*** Load {len(train_questions)} vectors on CPU")
-
-def extract_tables(schema: str) -> set:
-    """스키마에서 테이블명 추출"""
+    global embeddings, train_questions, train_sqls, example_store
+
+    print("*** Mapping example store...")
+    example_store = get_example_store()
+    embeddings = example_store.embeddings
+    train_questions = example_store.questions
+    train_sqls = example_store.sqls
+
+    print(f"*** Mapped {len(train_questions)} vectors from {example_store.directory}")
+
+@lru_cache(maxsize=1024)
+def extract_tables(schema: str) -> frozenset:
+    """
+    스키마 DDL 에서 테이블명 추출 (스키마 문자열별로 한 번만)
+    요약 스키마 (claude 경로) 는 CREATE TABLE 이 없어서 기존처럼 빈 집합 → overlap 0
+    """
     tables = re.findall(r'CREATE TABLE ["\']?(\w+)["\']?', schema, re.IGNORECASE)
-    return set(t.lower() for t in tables)
+    return frozenset(t.lower() for t in tables)
 
 
 def extract_tables_from_sql(sql: str) -> set:
@@ -61,25 +46,53 @@ def table_overlap_score(schema_tables: set, sql_tables: set) -> float:
     return len(intersection) / len(sql_tables)
 
 
-def retrieve_RAG_examples(question: str, schema: str, k: int = 5) -> list:
-    if faiss_index is None:
-        load_index()
-       
-    query_embedding = embedder.encode([question], convert_to_numpy=True)
-    query_embedding = query_embedding.astype('float32')
-    faiss.normalize_L2(query_embedding)
-    
-    distances, indices = faiss_index.search(query_embedding, k*3)
-
-    schema_tables = extract_tables(schema)    
+def rerank_candidates(indices, distances, schema: str, k: int) -> list:
+    """FAISS 후보 (한 질문분) 를 테이블 overlap 과 섞어서 상위 k 개 예제로"""
+    schema_tables = extract_tables(schema)
     scored = []
-    for idx, dist in zip(indices[0], distances[0]):
+    for idx, dist in zip(indices, distances):
+        if idx < 0:  # 근사 index (ivf / hnsw) 가 n 개를 못 채우면 -1
+            continue
         sql_tables = extract_tables_from_sql(train_sqls[idx])
         overlap = table_overlap_score(schema_tables, sql_tables)
         mix_score = dist * 0.7 + overlap * 0.3
         scored.append((idx, mix_score))
     
     final = sorted(scored, key=lambda x: x[1], reverse=True)[:k]
-    examples = [{"input": train_questions[i], "query": train_sqls[i]} for i, _ in final]
+    return [{"input": train_questions[i], "query": train_sqls[i]} for i, _ in final]
+
+
+def retrieve_RAG_examples(question: str, schema: str, k: int = 5, search_params: dict = None) -> list:
+    return retrieve_RAG_examples_batch([(question, schema)], k, search_params)[0]
+
+
+def search_candidates(questions: list, n: int, search_params: dict = None):
+    """
+    질문들의 FAISS 후보 n 개 (distance 오름차순) - (distances, indices), shape (len(questions), n)
+
+    :param search_params: ivf / hnsw query-time override {"nprobe", "ef_search"} (None 이면 manifest 값)
+    """
+    if example_store is None:
+        load_index()
+    query_embeddings = get_embedding_service().encode_many(questions)
+    return example_store.search(query_embeddings, n, search_params)
+
+
+def retrieve_RAG_examples_batch(pairs: list, k: int = 5, search_params: dict = None) -> list:
+    """
+    여러 질문을 한 번에 검색 (encode 1회 + FAISS search 1회, nq = len(pairs))
+
+    :param pairs: list of (question, schema)
+    :param k: 질문당 예제 개수
+    :param search_params: search_candidates 참고
+    :return: 질문별 예제 리스트 (retrieve_RAG_examples 와 동일한 결과)
+    """
+    if not pairs:
+        return []
+
+    distances, indices = search_candidates([question for question, _ in pairs], k*3, search_params)
 
-    return examples
\ No newline at end of file
+    return [
+        rerank_candidates(indices[row], distances[row], schema, k)
+        for row, (_, schema) in enumerate(pairs)
+    ]
@@ -1,21 +1,19 @@
 import json
-import pickle
-from paths import DATA_DIR, INDEX_DIR, SPIDER_DIR
-from sentence_transformers import SentenceTransformer
-import faiss
-import numpy as np
-from langchain_community.utilities import SQLDatabase
+from paths import DATA_DIR, SPIDER_DIR
+from utils.embeddings import get_embedding_service
 
 train_path = DATA_DIR / "train_spider.json"
 spider_db_dir = SPIDER_DIR / "database"
 
-embedding_file = INDEX_DIR / "embeddings.npy"
-db_ids_file = INDEX_DIR / "db_ids.pkl"
-questions_file = INDEX_DIR / "questions.pkl"
-sqls_file = INDEX_DIR / "sqls.pkl"
-faiss_index_file = INDEX_DIR / "faiss.index"
-
 def summarize_schema(schema):
+    """DDL → 요약 (catalog 에서 온 스키마면 catalog 렌더링, 아니면 DDL 파싱)"""
+    from utils.schema_cache import lookup_schema
+    info = lookup_schema(schema)
+    if info is not None and info.ddl == schema:
+        return info.summary
+    return summarize_ddl(schema)
+
+def summarize_ddl(schema):
     import re
     # print("=== RAW Schema ===")
     # print(schema)
@@ -65,8 +63,14 @@ def summarize_schema(schema):
     return result
 
 def get_schema_safe(db_id):
+    """db_id 의 DDL (utils/schema_cache.py 에서 catalog 로 DB 당 한 번만 렌더링)"""
+    from utils.schema_cache import get_schema_info
+    return get_schema_info(db_id).ddl
+
+def reflect_schema(db_id):
     
     try:
+        from langchain_community.utilities import SQLDatabase
         db_path = spider_db_dir / db_id / f"{db_id}.sqlite"
         if not db_path.exists():
             return ""
@@ -90,7 +94,14 @@ def get_schema_safe(db_id):
             print(f"Warning: Failed to load schema for {db_id}")
             return ""
 
-def build_save_index():
+def build_save_index(index: dict = None):
+    """
+    학습 예제 임베딩 → example store (utils/example_store.py)
+
+    :param index: 검색 index 설정 (example_store.index_spec, 기본 flat)
+    """
+    import faiss
+    from utils.example_store import write_store, set_index
 
     with open(train_path, "r") as f:
         train_data = json.load(f)
@@ -99,7 +110,7 @@ def build_save_index():
     questions = [item['question'] for item in train_data]
     sqls = [item['query'] for item in train_data]
 
-    model = SentenceTransformer('BAAI/bge-base-en-v1.5')
+    model = get_embedding_service().model
 
     combined_texts = []
     for idx, item in enumerate(train_data):
@@ -115,21 +126,39 @@ def build_save_index():
     embeddings = embeddings.astype('float32')
     faiss.normalize_L2(embeddings)
 
-    embedding_dim = embeddings.shape[1]
-    index = faiss.IndexFlatL2(embedding_dim)
-    index.add(embeddings)
-
-    np.save(embedding_file, embeddings)        
-
-    with open(db_ids_file, "wb") as f:
-        pickle.dump(db_ids, f)
-    with open(questions_file, "wb") as f:
-        pickle.dump(questions, f)
-    with open(sqls_file, "wb") as f:
-        pickle.dump(sqls, f)
-    faiss.write_index(index, str(faiss_index_file))
+    # flat 검색은 store 의 memmap 에 직접 (utils/example_store.py) - 별도 faiss.index 파일 없음
+    write_store(embeddings, questions, sqls, db_ids)
+    if index is not None and index["type"] != "flat":
+        set_index(index)
 
     print(f"Index built successfully with {len(questions)} examples!")
 
 if __name__ == "__main__":
-    build_save_index()
\ No newline at end of file
+    import argparse
+    from utils.example_store import (INDEX_TYPES, PQ_M, PQ_NBITS, NPROBE, HNSW_M, EF_CONSTRUCTION,
+                                     EF_SEARCH, TRAIN_SIZE, index_spec, set_index)
+
+    parser = argparse.ArgumentParser(description="Build the RAG example store and its search index")
+    parser.add_argument('--index', choices=INDEX_TYPES, default='flat',
+                        help='Search index: exact flat, scalar-quantized fp16/sq8, product-quantized pq, '
+                             'or approximate ivf/hnsw')
+    parser.add_argument('--pq-m', type=int, default=PQ_M, help='PQ sub-quantizers (must divide the dimension)')
+    parser.add_argument('--pq-nbits', type=int, default=PQ_NBITS, help='Bits per PQ sub-quantizer code')
+    parser.add_argument('--nlist', type=int, default=None, help='IVF cells (default: 4 * sqrt(pool size))')
+    parser.add_argument('--nprobe', type=int, default=NPROBE, help='IVF cells probed per query (stored default)')
+    parser.add_argument('--hnsw-m', type=int, default=HNSW_M, help='HNSW neighbours per node')
+    parser.add_argument('--ef-construction', type=int, default=EF_CONSTRUCTION, help='HNSW build-time search depth')
+    parser.add_argument('--ef-search', type=int, default=EF_SEARCH, help='HNSW query-time search depth (stored default)')
+    parser.add_argument('--train-size', type=int, default=TRAIN_SIZE,
+                        help='Vectors sampled to train sq8/pq/ivf, 0 = whole pool')
+    parser.add_argument('--index-only', action='store_true',
+                        help='Rebuild only the search index from the existing store (no re-embedding)')
+    args = parser.parse_args()
+
+    spec = index_spec(args.index, args.pq_m, args.pq_nbits, args.nlist, args.nprobe,
+                      args.hnsw_m, args.ef_construction, args.ef_search, args.train_size)
+    if args.index_only:
+        manifest = set_index(spec)
+        print(f"Search index set to {manifest['index']}")
+    else:
+        build_save_index(spec)
\ No newline at end of file
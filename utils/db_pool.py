@@ -0,0 +1,140 @@
+"""
+Read-only SQLite connection pool
+
+DB 파일 경로별로 connection 을 재사용 (Spider DB 는 바뀌지 않으므로 mode=ro&immutable=1)
+connection 하나는 한 번에 한 thread 만 사용하고, 반납되면 다른 thread 가 재사용
+"""
+
+from contextlib import contextmanager
+from pathlib import Path
+import queue
+import sqlite3
+import threading
+import time
+
+MAX_IDLE_PER_DB = 8
+MAX_STRING_LENGTH = 300  # langchain SQLDatabase 와 같은 값 길이 제한
+QUERY_TIMEOUT = 30.0  # 초, None/0 이면 제한 없음
+MAX_ROWS = 10000  # fetch 할 최대 행 수, None/0 이면 제한 없음
+PROGRESS_STEPS = 10000  # progress handler 호출 간격 (SQLite VM instruction 수)
+
+
+class QueryTimeoutError(sqlite3.OperationalError):
+    """wall-clock 제한을 넘겨서 중단된 쿼리"""
+
+
+def sqlite_path(db_uri) -> Path:
+    """'sqlite:///path/to/db.sqlite' 또는 경로 → Path"""
+    db_uri = str(db_uri)
+    if db_uri.startswith("sqlite:///"):
+        db_uri = db_uri[len("sqlite:///"):]
+    return Path(db_uri)
+
+
+def truncate_word(content, length: int = MAX_STRING_LENGTH, suffix: str = "..."):
+    if not isinstance(content, str) or length <= 0:
+        return content
+    if len(content) <= length:
+        return content
+    return content[: length - len(suffix)].rsplit(" ", 1)[0] + suffix
+
+
+def format_rows(rows: list) -> str:
+    """SQLDatabase.run 과 같은 결과 문자열 (빈 결과는 "")"""
+    if not rows:
+        return ""
+    return str([tuple(truncate_word(value) for value in row) for row in rows])
+
+
+class SQLitePool:
+
+    def __init__(self, max_idle_per_db: int = MAX_IDLE_PER_DB):
+        self.max_idle_per_db = max_idle_per_db
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _open(self, db_path: Path) -> sqlite3.Connection:
+        uri = db_path.resolve().as_uri() + "?mode=ro&immutable=1"
+        return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    def _queue(self, db_path: Path) -> queue.LifoQueue:
+        with self._lock:
+            idle = self._idle.get(db_path)
+            if idle is None:
+                idle = self._idle[db_path] = queue.LifoQueue(maxsize=self.max_idle_per_db)
+            return idle
+
+    @contextmanager
+    def connection(self, db_path):
+        """pool 에서 connection 을 빌리고 with 블록이 끝나면 반납"""
+        db_path = sqlite_path(db_path)
+        idle = self._queue(db_path)
+        try:
+            conn = idle.get_nowait()
+        except queue.Empty:
+            conn = self._open(db_path)
+
+        try:
+            yield conn
+        finally:
+            try:
+                idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close(self):
+        with self._lock:
+            idles, self._idle = list(self._idle.values()), {}
+        for idle in idles:
+            while True:
+                try:
+                    idle.get_nowait().close()
+                except queue.Empty:
+                    break
+
+
+def fetch_rows(conn: sqlite3.Connection, sql: str,
+               timeout: float = QUERY_TIMEOUT, max_rows: int = MAX_ROWS) -> list:
+    """
+    SQL 실행 후 결과 행 (tuple list)
+
+    :param timeout: 초 단위 제한 - 넘기면 progress handler 가 쿼리를 interrupt 하고 QueryTimeoutError
+    :param max_rows: 최대 fetch 행 수 (cartesian join 등으로 결과가 폭발하는 경우)
+    """
+    if timeout:
+        deadline = time.monotonic() + timeout
+        conn.set_progress_handler(lambda: time.monotonic() > deadline, PROGRESS_STEPS)
+
+    try:
+        cursor = conn.execute(sql)
+        try:
+            return cursor.fetchmany(max_rows) if max_rows else cursor.fetchall()
+        finally:
+            cursor.close()
+    except sqlite3.OperationalError as e:
+        if timeout and time.monotonic() > deadline and "interrupt" in str(e):
+            raise QueryTimeoutError(f"Query timeout: exceeded time limit of {timeout}s") from e
+        raise
+    finally:
+        if timeout:
+            conn.set_progress_handler(None, 0)
+
+
+def execute(conn: sqlite3.Connection, sql: str,
+            timeout: float = QUERY_TIMEOUT, max_rows: int = MAX_ROWS) -> str:
+    """SQL 실행 후 결과 문자열 (fetch_rows + format_rows)"""
+    return format_rows(fetch_rows(conn, sql, timeout, max_rows))
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> SQLitePool:
+    """프로세스 전역 SQLitePool"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SQLitePool()
+    return _pool
@@ -0,0 +1,119 @@
+"""
+Process-wide embedding service
+
+bge 모델을 프로세스당 한 번만 로드하고, 질문 임베딩을 LRU 캐시로 재사용
+RAG / intent clustering / agent 가 모두 같은 인스턴스를 사용
+"""
+
+from collections import OrderedDict
+import threading
+import numpy as np
+
+EMBEDDING_MODEL = 'BAAI/bge-base-en-v1.5'
+CACHE_SIZE = 8192
+
+
+def normalize_text(text: str) -> str:
+    """캐시 키: 앞뒤 공백 제거 + 연속 공백 하나로"""
+    return ' '.join(text.split())
+
+
+class EmbeddingService:
+    """
+    SentenceTransformer wrapper with a bounded LRU cache of query embeddings.
+
+    Vectors are returned as L2-normalized float32, ready for FAISS / dot products.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL, cache_size: int = CACHE_SIZE):
+        self.model_name = model_name
+        self.cache_size = cache_size
+        self._model = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    print("*** Loading embedder...")
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def encode(self, text: str) -> np.ndarray:
+        """질문 하나 → (dim,) 벡터"""
+        return self.encode_many([text])[0]
+
+    def encode_many(self, texts: list, batch_size: int = 64) -> np.ndarray:
+        """
+        여러 질문을 한 번의 forward pass 로 인코딩 (캐시에 없는 것만)
+
+        :param texts: list of question strings
+        :return: (len(texts), dim) float32 array, L2-normalized
+        """
+        keys = [normalize_text(t) for t in texts]
+        vectors = [None] * len(keys)
+        missing = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vec = self._cache.get(key)
+                if vec is not None:
+                    self._cache.move_to_end(key)
+                    vectors[i] = vec
+                    self.hits += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+                    self.misses += 1
+
+        if missing:
+            new_keys = list(missing)
+            encoded = self.model.encode(
+                new_keys,
+                batch_size=batch_size,
+                show_progress_bar=False,
+                convert_to_numpy=True
+            ).astype('float32')
+            norms = np.linalg.norm(encoded, axis=1, keepdims=True)
+            encoded /= np.maximum(norms, 1e-12)
+
+            with self._lock:
+                for key, vec in zip(new_keys, encoded):
+                    vec.setflags(write=False)
+                    self._cache[key] = vec
+                    self._cache.move_to_end(key)
+                    for i in missing[key]:
+                        vectors[i] = vec
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        if not vectors:
+            return np.empty((0, self.model.get_sentence_embedding_dimension()), dtype='float32')
+        return np.stack(vectors)
+
+    def cache_info(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._cache),
+                "max_size": self.cache_size
+            }
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service() -> EmbeddingService:
+    """프로세스 전역 EmbeddingService (lazy singleton)"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = EmbeddingService()
+    return _service
@@ -0,0 +1,402 @@
+"""
+Memory-mapped example store (RAG / intent clustering 공통 index artifact)
+
+INDEX_DIR/store/ 에 학습 예제 pool 을 column 별 파일로 저장
+    manifest.json          format / version / count / dim / 파일 목록 / 검색 index 설정
+    embeddings.f32         (count, dim) float32 row-major, L2 정규화 → np.memmap
+    questions.bin / .off   UTF-8 문자열을 이어 붙인 것 + uint64 offset (count + 1 개)
+    sqls.bin / .off
+    db_ids.bin / .off
+
+- 로드는 manifest 를 읽고 memmap 만 만들어서 거의 즉시, 여러 프로세스가 같은 page cache 를 공유
+  (예전처럼 npy + FAISS index + intent clustering 용으로 같은 벡터를 세 번 메모리에 올리지 않음)
+- 문자열은 index 로 접근할 때만 decode (StringTable)
+- 검색 index 는 manifest["index"] 로 선택 (build 시 결정, RAG 검색이 그대로 따름)
+    flat         별도 파일 없이 faiss.knn 을 memmap 에 직접 (IndexFlatL2 와 같은 squared L2, 정확)
+    fp16 / sq8   IndexScalarQuantizer - 벡터당 dim * 2 / dim bytes (flat 의 1/2, 1/4)
+    pq           IndexPQ - 벡터당 m * nbits / 8 bytes
+    ivf          IndexIVFFlat - nlist 개 cell 중 nprobe 개만 검색 (수백만 개 pool 용 근사 검색)
+    hnsw         IndexHNSWFlat - 그래프 검색, efSearch 가 클수록 정확 / 느림 (학습 없음)
+  flat 이 아닌 index 는 index-<type>.faiss 파일 (set_index 가 store 의 벡터로 만들어서 저장)
+  학습이 필요한 index (sq8 / pq / ivf) 는 최대 train_size 개를 고정 seed 로 뽑아서 학습
+  query-time 설정 (nprobe / ef_search) 은 manifest 값이 기본, 검색 시 override 가능 (--nprobe / --ef-search)
+- 파일은 임시 이름으로 쓴 뒤 os.replace 하고 manifest 를 마지막에 씀
+  → 이미 mapping 중인 프로세스는 예전 파일을 계속 보고, manifest 가 있으면 완성된 store
+
+빌드:                                       python -m utils.RAG_setup [--index sq8]
+index 만 다시 (임베딩 재사용):              python -m utils.RAG_setup --index pq --pq-m 64 --index-only
+예전 파일 (embeddings.npy + *.pkl) 변환:    python -m utils.example_store convert
+정보:                                       python -m utils.example_store info
+"""
+
+from datetime import datetime, timezone
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import threading
+
+import numpy as np
+
+from paths import INDEX_DIR
+from utils.embeddings import EMBEDDING_MODEL
+
+FORMAT = "text2sql-example-store"
+VERSION = 1
+STRING_COLUMNS = ["questions", "sqls", "db_ids"]
+INDEX_TYPES = ["flat", "fp16", "sq8", "pq", "ivf", "hnsw"]
+PQ_M = 64  # 768 차원 → sub-vector 당 12 차원
+PQ_NBITS = 8
+NPROBE = 16
+HNSW_M = 32
+EF_CONSTRUCTION = 200
+EF_SEARCH = 64
+TRAIN_SIZE = 100000
+TRAIN_SEED = 42
+ADD_CHUNK = 65536  # memmap 에서 index 로 한 번에 add 하는 행 수
+
+store_dir = INDEX_DIR / "store"
+
+# 예전 형식 (convert 용)
+legacy_embeddings_file = INDEX_DIR / "embeddings.npy"
+legacy_string_files = {
+    "questions": INDEX_DIR / "questions.pkl",
+    "sqls": INDEX_DIR / "sqls.pkl",
+    "db_ids": INDEX_DIR / "db_ids.pkl"
+}
+
+
+def pool_fingerprint(questions) -> str:
+    """store 가 어느 질문 pool 로 만들어졌는지 확인용 (clusters 등 파생 파일 검증)"""
+    digest = hashlib.sha1()
+    for question in questions:
+        digest.update(question.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class StringTable:
+    """offset 으로 접근하는 읽기 전용 문자열 column (list 처럼 len / [i] / iteration)"""
+
+    def __init__(self, data_path, offsets_path, count: int):
+        self.count = count
+        self.offsets = np.memmap(offsets_path, dtype=np.uint64, mode="r", shape=(count + 1,))
+        # 길이 0 인 파일은 mmap 할 수 없음 (빈 문자열만 있는 경우)
+        if os.path.getsize(data_path):
+            self.data = np.memmap(data_path, dtype=np.uint8, mode="r")
+        else:
+            self.data = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.count))]
+        i = int(i)
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(f"string table index {i} out of range")
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return bytes(self.data[start:end]).decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(self.count))
+
+
+def _replace(path, write):
+    """path.tmp-<pid> 에 write(f) 한 뒤 os.replace"""
+    tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def write_string_table(directory, name: str, strings) -> dict:
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    _replace(directory / f"{name}.bin", lambda f: f.write(b"".join(encoded)))
+    _replace(directory / f"{name}.off", lambda f: f.write(offsets.tobytes()))
+    return {"data": f"{name}.bin", "offsets": f"{name}.off"}
+
+
+def write_manifest(directory, manifest: dict):
+    _replace(directory / "manifest.json",
+             lambda f: f.write(json.dumps(manifest, indent=2).encode("utf-8")))
+
+
+def write_store(embeddings, questions: list, sqls: list, db_ids: list, directory=store_dir) -> dict:
+    """
+    예제 pool 을 store 로 저장 (검색 index 는 flat 으로 초기화 - 다른 index 는 set_index 로)
+
+    :param embeddings: (count, dim) L2 정규화된 벡터
+    :return: manifest
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    count = len(questions)
+    if not (embeddings.shape[0] == len(sqls) == len(db_ids) == count):
+        raise ValueError(f"Column lengths differ: embeddings {embeddings.shape[0]}, "
+                         f"questions {count}, sqls {len(sqls)}, db_ids {len(db_ids)}")
+
+    directory.mkdir(parents=True, exist_ok=True)
+    _replace(directory / "embeddings.f32", lambda f: f.write(embeddings.tobytes()))
+    files = {"embeddings": "embeddings.f32"}
+    for name, strings in zip(STRING_COLUMNS, (questions, sqls, db_ids)):
+        files[name] = write_string_table(directory, name, strings)
+
+    manifest = {
+        "format": FORMAT,
+        "version": VERSION,
+        "count": count,
+        "dim": int(embeddings.shape[1]),
+        "dtype": "float32",
+        "metric": "l2",
+        "normalized": True,
+        "embedding_model": EMBEDDING_MODEL,
+        "fingerprint": pool_fingerprint(questions),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "files": files,
+        "index": {"type": "flat"}
+    }
+    write_manifest(directory, manifest)
+    return manifest
+
+
+def index_spec(index_type: str, pq_m: int = PQ_M, pq_nbits: int = PQ_NBITS, nlist: int = None,
+               nprobe: int = NPROBE, hnsw_m: int = HNSW_M, ef_construction: int = EF_CONSTRUCTION,
+               ef_search: int = EF_SEARCH, train_size: int = TRAIN_SIZE) -> dict:
+    """
+    manifest["index"] 에 들어갈 설정 (파일 이름 / 크기는 set_index 가 추가)
+
+    :param nlist: IVF cell 수 (None 이면 build 시 pool 크기로 결정, default_nlist)
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}' (expected one of {INDEX_TYPES})")
+    spec = {"type": index_type}
+    if index_type == "pq":
+        spec.update(m=pq_m, nbits=pq_nbits)
+    if index_type == "ivf":
+        spec.update(nlist=nlist, nprobe=nprobe)
+    if index_type == "hnsw":
+        spec.update(m=hnsw_m, ef_construction=ef_construction, ef_search=ef_search)
+    if index_type in ("sq8", "pq", "ivf"):
+        spec.update(train_size=train_size)
+    return spec
+
+
+def default_nlist(count: int) -> int:
+    """4 * sqrt(N), cell 당 학습 벡터가 39 개 이상 되도록 (FAISS k-means 권장)"""
+    return max(1, min(int(4 * np.sqrt(count)), count // 39))
+
+
+def training_sample(embeddings, train_size: int) -> np.ndarray:
+    """최대 train_size 행 (고정 seed, 원래 순서) - pool 전체를 메모리에 올리지 않도록"""
+    count = embeddings.shape[0]
+    if not train_size or count <= train_size:
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+    rows = np.sort(np.random.default_rng(TRAIN_SEED).choice(count, train_size, replace=False))
+    return np.ascontiguousarray(embeddings[rows], dtype=np.float32)
+
+
+def build_faiss_index(embeddings, spec: dict):
+    """
+    spec 의 FAISS index 를 embeddings 로 학습 + 추가 (flat 은 memmap 을 직접 쓰므로 대상 아님)
+    ivf 의 nlist 가 None 이면 spec 에 결정된 값을 채움
+    """
+    import faiss
+    dim = embeddings.shape[1]
+    if spec["type"] == "fp16":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2)
+    elif spec["type"] == "sq8":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+    elif spec["type"] == "pq":
+        if dim % spec["m"]:
+            raise ValueError(f"PQ m={spec['m']} must divide the embedding dimension {dim}")
+        index = faiss.IndexPQ(dim, spec["m"], spec["nbits"], faiss.METRIC_L2)
+    elif spec["type"] == "ivf":
+        if spec.get("nlist") is None:
+            spec["nlist"] = default_nlist(embeddings.shape[0])
+        index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, spec["nlist"], faiss.METRIC_L2)
+        index.nprobe = spec["nprobe"]
+    elif spec["type"] == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, spec["m"], faiss.METRIC_L2)
+        index.hnsw.efConstruction = spec["ef_construction"]
+        index.hnsw.efSearch = spec["ef_search"]
+    else:
+        raise ValueError(f"No FAISS index to build for type '{spec['type']}'")
+
+    if not index.is_trained:
+        index.train(training_sample(embeddings, spec.get("train_size", TRAIN_SIZE)))
+    for start in range(0, embeddings.shape[0], ADD_CHUNK):
+        index.add(np.ascontiguousarray(embeddings[start:start + ADD_CHUNK], dtype=np.float32))
+    return index
+
+
+def set_index(spec: dict, directory=store_dir) -> dict:
+    """
+    store 의 벡터로 spec 의 검색 index 를 만들어 저장하고 manifest["index"] 를 교체
+
+    :return: manifest
+    """
+    import faiss
+    manifest = read_manifest(directory)
+    if spec["type"] == "flat":
+        manifest["index"] = {"type": "flat"}
+    else:
+        embeddings = np.memmap(directory / manifest["files"]["embeddings"], dtype=np.float32,
+                               mode="r", shape=(manifest["count"], manifest["dim"]))
+        spec = dict(spec)
+        index = build_faiss_index(embeddings, spec)
+        name = f"index-{spec['type']}.faiss"
+        data = faiss.serialize_index(index)
+        _replace(directory / name, lambda f: f.write(data.tobytes()))
+        manifest["index"] = dict(spec, file=name, bytes=int(data.nbytes))
+    write_manifest(directory, manifest)
+    return manifest
+
+
+def read_manifest(directory=store_dir) -> dict:
+    path = directory / "manifest.json"
+    with open(path, "r") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT:
+        raise ValueError(f"{path} is not an example store manifest")
+    if manifest.get("version") != VERSION:
+        raise ValueError(
+            f"{path} has version {manifest.get('version')}, expected {VERSION}. "
+            f"Rebuild it with: python -m utils.RAG_setup"
+        )
+    return manifest
+
+
+class ExampleStore:
+    """store 디렉토리 하나의 읽기 전용 mapping"""
+
+    def __init__(self, directory=store_dir):
+        self.directory = directory
+        self.manifest = read_manifest(directory)
+        count, dim = self.manifest["count"], self.manifest["dim"]
+        files = self.manifest["files"]
+
+        self.embeddings = np.memmap(directory / files["embeddings"], dtype=np.float32,
+                                    mode="r", shape=(count, dim))
+        self.questions, self.sqls, self.db_ids = (
+            StringTable(directory / files[name]["data"], directory / files[name]["offsets"], count)
+            for name in STRING_COLUMNS
+        )
+        self._index = None
+        self._index_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.manifest["count"]
+
+    @property
+    def index_spec(self) -> dict:
+        return self.manifest["index"]
+
+    def faiss_index(self):
+        """manifest 의 FAISS index (처음 검색할 때 한 번 로드)"""
+        if self._index is None:
+            with self._index_lock:
+                if self._index is None:
+                    import faiss
+                    path = self.directory / self.index_spec["file"]
+                    print(f"*** Loading {self.index_spec['type']} index from {path}...")
+                    self._index = faiss.read_index(str(path))
+        return self._index
+
+    def exact_search(self, queries: np.ndarray, n: int):
+        """memmap 전체에 정확한 검색 (squared L2 오름차순, IndexFlatL2.search 와 같은 결과)"""
+        import faiss
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        return faiss.knn(queries, self.embeddings, n, faiss.METRIC_L2)
+
+    def search_parameters(self, overrides: dict = None):
+        """
+        ivf / hnsw 의 query-time 설정 → faiss.SearchParameters* (다른 index 는 None)
+
+        :param overrides: {"nprobe": ..., "ef_search": ...} (None 값은 manifest 값 사용)
+        """
+        import faiss
+        spec = self.index_spec
+        overrides = {key: value for key, value in (overrides or {}).items() if value is not None}
+        if spec["type"] == "ivf":
+            return faiss.SearchParametersIVF(nprobe=int(overrides.get("nprobe", spec["nprobe"])))
+        if spec["type"] == "hnsw":
+            return faiss.SearchParametersHNSW(efSearch=int(overrides.get("ef_search", spec["ef_search"])))
+        return None
+
+    def search(self, queries: np.ndarray, n: int, overrides: dict = None):
+        """
+        질문 벡터들의 최근접 n 개 (manifest 의 index 로, squared L2 오름차순)
+
+        :param overrides: query-time 설정 override (search_parameters)
+        :return: (distances, indices), shape (len(queries), n)
+        """
+        if self.index_spec["type"] == "flat":
+            return self.exact_search(queries, n)
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        params = self.search_parameters(overrides)
+        if params is None:
+            return self.faiss_index().search(queries, n)
+        return self.faiss_index().search(queries, n, params=params)
+
+
+def legacy_files_exist() -> bool:
+    return legacy_embeddings_file.exists() and all(p.exists() for p in legacy_string_files.values())
+
+
+def convert_legacy(directory=store_dir) -> dict:
+    """embeddings.npy + questions/sqls/db_ids.pkl → store (예전 파일은 그대로 둠)"""
+    columns = {}
+    for name, path in legacy_string_files.items():
+        with open(path, "rb") as f:
+            columns[name] = pickle.load(f)
+    embeddings = np.load(legacy_embeddings_file, mmap_mode="r")
+    return write_store(embeddings, columns["questions"], columns["sqls"], columns["db_ids"], directory)
+
+
+_store = None
+_lock = threading.Lock()
+
+
+def get_example_store() -> ExampleStore:
+    """
+    프로세스 전역 ExampleStore (1회 mapping)
+    store 가 없고 예전 파일만 있으면 한 번 변환해서 사용
+    """
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                if not (store_dir / "manifest.json").exists():
+                    if not legacy_files_exist():
+                        raise FileNotFoundError(
+                            f"Example store not found at {store_dir}. "
+                            f"Build it with: python -m utils.RAG_setup"
+                        )
+                    print(f"*** Converting {INDEX_DIR} pickles to {store_dir}...")
+                    convert_legacy(store_dir)
+                _store = ExampleStore(store_dir)
+    return _store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory-mapped example store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("convert", help="Convert embeddings.npy + *.pkl into the store format")
+    sub.add_parser("info", help="Print the store manifest")
+
+    args = parser.parse_args()
+    if args.command == "convert":
+        manifest = convert_legacy(store_dir)
+        print(f"*** Wrote {manifest['count']} examples (dim {manifest['dim']}) to {store_dir}")
+    else:
+        print(json.dumps(read_manifest(store_dir), indent=2))
+
+
+if __name__ == "__main__":
+    main()
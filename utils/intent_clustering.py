@@ -7,22 +7,19 @@ Intent-based clustering for NL2SQL Few-Shot Learning
 """
 
 import pickle
-from sentence_transformers import SentenceTransformer
 import faiss
 import numpy as np
 from sklearn.cluster import KMeans
 from paths import INDEX_DIR
+from utils.embeddings import get_embedding_service
+from utils.example_store import get_example_store
 
-# 기존 파일들
-questions_file = INDEX_DIR / "questions.pkl"
-sqls_file = INDEX_DIR / "sqls.pkl"
-embeddings_file = INDEX_DIR / "embeddings.npy"
-
-# 새로운 clustering 관련 파일들
+# 벡터 / 질문 / SQL 은 RAG 와 같은 example store mapping (utils/example_store.py)
+# clustering 관련 파일들
 clusters_file = INDEX_DIR / "clusters.pkl"
 cluster_centers_file = INDEX_DIR / "cluster_centers.npy"
 
-embeddings, embedder, cluster_centers, cluster_labels = None, None, None, None
+embeddings, cluster_centers, cluster_labels = None, None, None
 questions, sqls = [], []
 
 # SQL 패턴 추출 함수
@@ -73,26 +70,23 @@ def build_intent_clusters(n_clusters: int = 50):
         n_clusters: 클러스터 개수 (기본 50)
     """
     
-    print("*** Loading embeddings and questions...")
-    embeddings = np.load(embeddings_file)
-    
-    with open(questions_file, 'rb') as f:
-        questions = pickle.load(f)
-    
-    with open(sqls_file, 'rb') as f:
-        sqls = pickle.load(f)
+    print("*** Mapping example store...")
+    store = get_example_store()
+    embeddings = store.embeddings
+    questions = store.questions
+    sqls = store.sqls
     
     print(f"*** Clustering {len(questions)} questions into {n_clusters} intent clusters...")
     
     # K-means clustering
     kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-    cluster_labels = kmeans.fit_predict(embeddings)
+    cluster_labels = kmeans.fit_predict(np.asarray(embeddings))
     
     # 각 클러스터별 예제 분석
     cluster_info = {}
     for i in range(n_clusters):
         cluster_mask = cluster_labels == i
-        cluster_sqls = [sqls[j] for j in range(len(sqls)) if cluster_mask[j]]
+        cluster_sqls = [sqls[j] for j in np.where(cluster_mask)[0][:5]]
         
         # 이 클러스터의 대표 SQL 패턴들
         patterns = [extract_sql_pattern(sql) for sql in cluster_sqls[:5]]
@@ -107,6 +101,7 @@ def build_intent_clusters(n_clusters: int = 50):
         pickle.dump({
             'labels': cluster_labels,
             'n_clusters': n_clusters,
+            'fingerprint': store.manifest['fingerprint'],
             'info': cluster_info
         }, f)
     
@@ -126,23 +121,26 @@ def build_intent_clusters(n_clusters: int = 50):
 
 
 def load_clusters():
-    global embeddings, embedder, embeddings, cluster_centers, cluster_labels, questions, sqls
-
-    # Load resources
-    embedder = SentenceTransformer('BAAI/bge-base-en-v1.5')
+    global embeddings, cluster_centers, cluster_labels, questions, sqls
 
-    embeddings = np.load(embeddings_file)
+    # Load resources (벡터 / 문자열은 store mapping 을 공유, 복사 없음)
+    store = get_example_store()
     cluster_centers = np.load(cluster_centers_file)
     
-    with open(questions_file, 'rb') as f:
-        questions = pickle.load(f)
-    
-    with open(sqls_file, 'rb') as f:
-        sqls = pickle.load(f)
-    
     with open(clusters_file, 'rb') as f:
         cluster_data = pickle.load(f)
-        cluster_labels = cluster_data['labels']
+    # 예전 clusters.pkl 에는 fingerprint 가 없음 → 개수만 확인
+    if (len(cluster_data['labels']) != len(store)
+            or cluster_data.get('fingerprint', store.manifest['fingerprint']) != store.manifest['fingerprint']):
+        raise ValueError(
+            f"{clusters_file} was built from a different example pool. "
+            f"Rebuild it with: python -m utils.intent_clustering"
+        )
+
+    embeddings = store.embeddings
+    questions = store.questions
+    sqls = store.sqls
+    cluster_labels = cluster_data['labels']
 
 
 def retrieve_intent_based_examples(question: str, k: int = 5, k_clusters: int = 3) -> list:
@@ -158,13 +156,11 @@ def retrieve_intent_based_examples(question: str, k: int = 5, k_clusters: int =
         list of examples
     """    
 
-    if embedder is None:
+    if embeddings is None:
         load_clusters()
     
-    # 1. 질문 embedding
-    question_embedding = embedder.encode([question], convert_to_numpy=True)
-    question_embedding = question_embedding.astype('float32')
-    faiss.normalize_L2(question_embedding)
+    # 1. 질문 embedding (공유 embedding service, 정규화된 float32)
+    question_embedding = get_embedding_service().encode_many([question])
     
     # 2. 가장 가까운 k_clusters개의 클러스터 찾기
     centers_normalized = cluster_centers.astype('float32')
@@ -1,5 +1,7 @@
 import json
 from pathlib import Path
+import numpy as np
+from scipy import sparse
 
 PRJ_ROOT = Path(__file__).parent.parent
 DATA_DIR = PRJ_ROOT / "data"
@@ -7,47 +9,166 @@ INDEX_DIR = DATA_DIR / "index"
 
 train_path = DATA_DIR / "train_spider.json"
 jaccard_matrix_file = INDEX_DIR / "jaccard_matrix.npy"
-questions_file = INDEX_DIR / "questions.pkl"
-sqls_file = INDEX_DIR / "sqls.pkl"
+# top_k_many 가 한 번에 곱하는 질의 수 - "what" / "the" 같은 흔한 토큰은 거의 모든 행과 겹쳐서
+# (질의 수 x pool) 결과가 거의 dense 가 되므로 chunk 단위로 (메모리 ~ QUERY_CHUNK x pool)
+QUERY_CHUNK = 64
+
+def tokenize(question: str) -> set:
+    return set(question.lower().split())
 
 def jaccard_similarity(q1, q2):
-    set1 = set(q1.lower().split())
-    set2 = set(q2.lower().split())
+    set1 = tokenize(q1)
+    set2 = tokenize(q2)
     return len(set1 & set2) / len(set1 | set2)
 
+
+class JaccardIndex:
+    """
+    학습 질문 pool 을 한 번만 토큰화해서 sparse binary 행렬로 보관
+
+    - vocab: token -> column id
+    - postings: (V x N) CSR, token 별 해당 질문 목록
+    - row_sizes: 질문별 토큰 집합 크기 |A|
+
+    질의 토큰 벡터 q 와 postings 의 sparse 곱 한 번으로 교집합 크기를 얻고
+    |A ∪ B| = |A| + |B| - |A ∩ B| 로 점수를 계산한다.
+    순위는 기존 구현과 같게 (score, idx) 내림차순.
+    """
+
+    def __init__(self, questions: list):
+        self.vocab = {}
+        indptr = [0]
+        indices = []
+        for question in questions:
+            ids = sorted({self.vocab.setdefault(tok, len(self.vocab)) for tok in tokenize(question)})
+            indices.extend(ids)
+            indptr.append(len(indices))
+
+        self.size = len(questions)
+        matrix = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.int32), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+            shape=(self.size, len(self.vocab))
+        )
+        self.row_sizes = np.diff(matrix.indptr).astype(np.int64)
+        self.postings = matrix.T.tocsr()
+
+    def query_matrix(self, questions: list):
+        """질의들을 (nq x V) binary CSR 로. vocab 에 없는 토큰은 |B| 에만 반영"""
+        indptr = [0]
+        indices = []
+        query_sizes = []
+        for question in questions:
+            tokens = tokenize(question)
+            query_sizes.append(len(tokens))
+            indices.extend(sorted(self.vocab[tok] for tok in tokens if tok in self.vocab))
+            indptr.append(len(indices))
+        query = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.int32), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+            shape=(len(questions), len(self.vocab))
+        )
+        return query, np.array(query_sizes, dtype=np.int64)
+
+    def top_k(self, question: str, k: int = 5) -> list:
+        return self.top_k_many([question], k)[0]
+
+    def top_k_many(self, questions: list, k: int = 5) -> list:
+        """
+        질의 배치의 상위 k 개 학습 질문 index (QUERY_CHUNK 개씩 sparse 곱)
+
+        :return: 질의별 [(score, idx), ...] (점수 내림차순, 동점은 idx 내림차순)
+        """
+        results = []
+        for start in range(0, len(questions), QUERY_CHUNK):
+            results.extend(self._top_k_chunk(questions[start:start + QUERY_CHUNK], k))
+        return results
+
+    def _top_k_chunk(self, questions: list, k: int) -> list:
+        query, query_sizes = self.query_matrix(questions)
+        overlap = (query @ self.postings).tocsr()
+
+        results = []
+        for row in range(len(questions)):
+            start, end = overlap.indptr[row], overlap.indptr[row + 1]
+            cols = overlap.indices[start:end].astype(np.int64)
+            inter = overlap.data[start:end].astype(np.int64)
+            scores = inter / (self.row_sizes[cols] + query_sizes[row] - inter)
+            results.append(self.select_top_k(cols, scores, k))
+        return results
+
+    def score_candidates(self, question: str, candidates, k: int = 5) -> list:
+        """후보 index 들만 정확한 Jaccard 로 다시 계산해서 상위 k 개 (LSH 후보 재정렬용)"""
+        candidates = np.unique(np.asarray(candidates, dtype=np.int64))
+        query, query_sizes = self.query_matrix([question])
+        overlap = (query @ self.postings[:, candidates]).toarray().ravel().astype(np.int64)
+        scores = overlap / (self.row_sizes[candidates] + query_sizes[0] - overlap)
+        return self.select_top_k(candidates, scores, k, fill=False)
+
+    def select_top_k(self, cols, scores, k: int, fill: bool = True) -> list:
+        """교집합이 있는 행 (score > 0) 에서 argpartition 으로 k 개, 부족하면 score 0 인 행을 idx 내림차순으로 채움"""
+        if k <= 0:
+            return []
+        if len(cols) > k:
+            part = np.argpartition(-scores, k - 1)[:k]
+            keep = scores >= scores[part].min()  # 경계 동점은 모두 남기고 idx 로 정렬
+            cols, scores = cols[keep], scores[keep]
+        order = np.lexsort((-cols, -scores))[:k]
+        top = [(float(scores[i]), int(cols[i])) for i in order]
+
+        if fill and len(top) < k:
+            matched = set(int(c) for c in cols)
+            idx = self.size - 1
+            while len(top) < k and idx >= 0:
+                if idx not in matched:
+                    top.append((0.0, idx))
+                idx -= 1
+        return top
+
+
 train_questions = []
 train_sqls = []
+jaccard_index = None
 
 def load_train_questions():
-    global train_questions, train_sqls
+    global train_questions, train_sqls, jaccard_index
     with open(train_path, "r") as f:
         train_data = json.load(f)
     train_questions = [item['question'] for item in train_data]
     train_sqls = [item['query'] for item in train_data]
+    jaccard_index = JaccardIndex(train_questions)
     
 
-def retrieve_jaccard_examples(question, k=5):    
+def retrieve_jaccard_examples(question, k=5, use_lsh=False):    
     """
     Jaccard 유사도 기반 k개의 예제 반환
     
     :param question: input string
     :param k: 예제 개수
+    :param use_lsh: True 면 MinHash/LSH 후보만 정확히 재계산 (utils/jaccard_lsh.py)
+    """
+    return retrieve_jaccard_examples_batch([question], k, use_lsh)[0]
+
+
+def retrieve_jaccard_examples_batch(questions, k=5, use_lsh=False):
+    """
+    여러 질문의 Jaccard 예제를 sparse 곱 한 번으로 검색
+
+    :param questions: list of input strings
+    :param k: 질문당 예제 개수
+    :param use_lsh: True 면 MinHash/LSH 후보만 정확히 재계산 (utils/jaccard_lsh.py)
     """
-    if len(train_questions) == 0:
+    if jaccard_index is None:
         load_train_questions()
-    
-    scores = []
-    for i, train_q in enumerate(train_questions):
-        sim = jaccard_similarity(question, train_q)
-        scores.append((sim, i))
-    
-    scores.sort(reverse=True)
-
-    examples = []
-    for _, idx in scores[:k]:
-        examples.append({
-            "input": train_questions[idx],
-            "query": train_sqls[idx]
-        })
-    
-    return examples
\ No newline at end of file
+
+    if use_lsh:
+        from utils.jaccard_lsh import get_lsh_index
+        lsh = get_lsh_index()
+        tops = [lsh.top_k(question, k) for question in questions]
+    else:
+        tops = jaccard_index.top_k_many(questions, k)
+
+    return [jaccard_examples(top) for top in tops]
+
+
+def jaccard_examples(top: list) -> list:
+    """[(score, idx), ...] → few-shot 예제 리스트"""
+    return [{"input": train_questions[idx], "query": train_sqls[idx]} for _, idx in top]
@@ -0,0 +1,243 @@
+"""
+MinHash + LSH banding index for Jaccard few-shot retrieval
+
+정확한 Jaccard (utils/jaccard.py) 는 질문당 O(N).
+예제 pool 이 수백만 개로 커지면 LSH 로 후보만 뽑고 후보만 정확히 다시 계산한다.
+
+1. 질문 토큰 집합 → MinHash signature (num_perm 개의 min hash)
+2. signature 를 bands x rows 로 나누고, band 별로 같은 bucket 에 들어간 질문이 후보
+3. 후보들을 JaccardIndex.score_candidates 로 정확히 재정렬
+
+빌드 (오프라인):  python -m utils.jaccard_lsh build --num-perm 128 --bands 32
+리포트:          python -m utils.jaccard_lsh report -k 5 -n 300
+"""
+
+import argparse
+import hashlib
+import json
+import time
+import zlib
+import numpy as np
+
+from paths import SPIDER_DIR
+from utils import jaccard
+from utils.jaccard import INDEX_DIR, jaccard_matrix_file, tokenize
+
+lsh_params_file = INDEX_DIR / "jaccard_lsh.json"
+dev_path = SPIDER_DIR / "evaluation_examples" / "examples" / "dev.json"
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+SEED = 1
+NUM_PERM = 128
+BANDS = 32
+CHUNK_ROWS = 50000
+
+
+def pool_fingerprint(questions: list) -> str:
+    """signature 가 어느 학습 pool 로 만들어졌는지 확인용"""
+    digest = hashlib.sha1()
+    for question in questions:
+        digest.update(question.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class MinHasher:
+    """(a * h(token) + b) mod p 형태의 num_perm 개 hash 함수 (seed 고정 → 재현 가능)"""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = SEED):
+        self.num_perm = num_perm
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def hash_tokens(self, tokens) -> np.ndarray:
+        """토큰들 → (len(tokens), num_perm) uint32"""
+        hv = np.array([zlib.crc32(tok.encode("utf-8")) for tok in tokens], dtype=np.uint64)
+        return ((hv[:, None] * self.a + self.b) % MERSENNE_PRIME & MAX_HASH).astype(np.uint32)
+
+    def signature(self, tokens) -> np.ndarray:
+        if not tokens:
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint32)
+        return self.hash_tokens(list(tokens)).min(axis=0)
+
+    def signatures(self, index) -> np.ndarray:
+        """JaccardIndex 의 전체 pool → (N, num_perm) signature 행렬 (vocab 단위로 hash 한 번)"""
+        vocab_tokens = [None] * len(index.vocab)
+        for tok, col in index.vocab.items():
+            vocab_tokens[col] = tok
+        token_hashes = self.hash_tokens(vocab_tokens)
+
+        rows = index.postings.T.tocsr()
+        sigs = np.full((index.size, self.num_perm), MAX_HASH, dtype=np.uint32)
+        for start in range(0, index.size, CHUNK_ROWS):
+            end = min(start + CHUNK_ROWS, index.size)
+            indptr = rows.indptr[start:end + 1]
+            cols = rows.indices[indptr[0]:indptr[-1]]
+            offsets = (indptr[:-1] - indptr[0]).astype(np.int64)
+            nonempty = np.diff(indptr) > 0
+            if cols.size:
+                reduced = np.minimum.reduceat(token_hashes[cols], offsets[nonempty], axis=0)
+                sigs[start:end][nonempty] = reduced
+        return sigs
+
+
+class LSHIndex:
+    """band 별로 정렬된 bucket key 배열 → searchsorted 로 같은 bucket 의 질문 조회"""
+
+    def __init__(self, signatures: np.ndarray, bands: int, hasher: MinHasher, exact):
+        if hasher.num_perm % bands != 0:
+            raise ValueError(f"num_perm ({hasher.num_perm}) must be divisible by bands ({bands})")
+        self.bands = bands
+        self.rows = hasher.num_perm // bands
+        self.hasher = hasher
+        self.exact = exact
+        self.mixers = np.random.RandomState(SEED + 1).randint(1, 1 << 62, size=self.rows, dtype=np.uint64) | np.uint64(1)
+
+        self.sorted_keys = []
+        self.sorted_ids = []
+        for keys in self.band_keys(signatures).T:
+            order = np.argsort(keys, kind="stable")
+            self.sorted_keys.append(keys[order])
+            self.sorted_ids.append(order.astype(np.int64))
+
+    def band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """(n, num_perm) → (n, bands) uint64 bucket key (overflow 는 그냥 wrap)"""
+        sigs = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        return (sigs * self.mixers).sum(axis=2, dtype=np.uint64)
+
+    def candidates(self, question: str) -> np.ndarray:
+        keys = self.band_keys(self.hasher.signature(tokenize(question))[None, :])[0]
+        found = []
+        for band, key in enumerate(keys):
+            lo = np.searchsorted(self.sorted_keys[band], key, side="left")
+            hi = np.searchsorted(self.sorted_keys[band], key, side="right")
+            if hi > lo:
+                found.append(self.sorted_ids[band][lo:hi])
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+    def top_k(self, question: str, k: int = 5) -> list:
+        """LSH 후보를 정확한 Jaccard 로 재정렬. 후보가 k 개 미만이면 정확한 전체 검색으로"""
+        cands = self.candidates(question)
+        if len(cands) < k:
+            return self.exact.top_k(question, k)
+        return self.exact.score_candidates(question, cands, k)
+
+
+def build_lsh_index(num_perm: int = NUM_PERM, bands: int = BANDS):
+    """학습 pool 의 MinHash signature 를 계산해서 INDEX_DIR 에 저장"""
+    if jaccard.jaccard_index is None:
+        jaccard.load_train_questions()
+
+    print(f"*** MinHashing {len(jaccard.train_questions)} questions (num_perm={num_perm})...")
+    start = time.perf_counter()
+    hasher = MinHasher(num_perm)
+    sigs = hasher.signatures(jaccard.jaccard_index)
+
+    INDEX_DIR.mkdir(parents=True, exist_ok=True)
+    np.save(jaccard_matrix_file, sigs)
+    with open(lsh_params_file, "w") as f:
+        json.dump({
+            "num_perm": num_perm,
+            "bands": bands,
+            "seed": SEED,
+            "count": len(jaccard.train_questions),
+            "fingerprint": pool_fingerprint(jaccard.train_questions)
+        }, f, indent=2)
+
+    print(f"*** Saved signatures to {jaccard_matrix_file} ({time.perf_counter() - start:.1f}s)")
+
+
+lsh_index = None
+
+def get_lsh_index() -> LSHIndex:
+    """저장된 signature 로 LSHIndex 로드 (프로세스당 1회)"""
+    global lsh_index
+    if lsh_index is not None:
+        return lsh_index
+
+    if jaccard.jaccard_index is None:
+        jaccard.load_train_questions()
+    if not lsh_params_file.exists() or not jaccard_matrix_file.exists():
+        raise FileNotFoundError(
+            f"LSH index not found at {jaccard_matrix_file}. "
+            f"Build it with: python -m utils.jaccard_lsh build"
+        )
+
+    with open(lsh_params_file, "r") as f:
+        params = json.load(f)
+    if params["fingerprint"] != pool_fingerprint(jaccard.train_questions):
+        raise ValueError(
+            f"LSH index at {jaccard_matrix_file} was built from a different example pool. "
+            f"Rebuild it with: python -m utils.jaccard_lsh build"
+        )
+
+    print("*** Loading MinHash signatures...")
+    sigs = np.load(jaccard_matrix_file, mmap_mode="r")
+    hasher = MinHasher(params["num_perm"], params["seed"])
+    lsh_index = LSHIndex(np.asarray(sigs), params["bands"], hasher, jaccard.jaccard_index)
+    return lsh_index
+
+
+def recall_report(questions: list, k: int = 5) -> dict:
+    """
+    LSH 결과를 정확한 Jaccard top-k 와 비교
+
+    :return: recall@k, 평균 후보 수, 질문당 latency (ms)
+    """
+    lsh = get_lsh_index()
+    exact = jaccard.jaccard_index
+
+    start = time.perf_counter()
+    exact_tops = [exact.top_k(q, k) for q in questions]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(questions)
+
+    start = time.perf_counter()
+    lsh_tops = [lsh.top_k(q, k) for q in questions]
+    lsh_ms = (time.perf_counter() - start) * 1000 / len(questions)
+
+    hits = sum(len({i for _, i in e} & {i for _, i in a}) for e, a in zip(exact_tops, lsh_tops))
+    n_cands = [len(lsh.candidates(q)) for q in questions]
+
+    report = {
+        "queries": len(questions),
+        "pool_size": exact.size,
+        "k": k,
+        "num_perm": lsh.hasher.num_perm,
+        "bands": lsh.bands,
+        f"recall@{k}": hits / (k * len(questions)),
+        "avg_candidates": float(np.mean(n_cands)),
+        "exact_ms_per_query": exact_ms,
+        "lsh_ms_per_query": lsh_ms
+    }
+    for key, value in report.items():
+        print(f"{key:>20}: {value:.4f}" if isinstance(value, float) else f"{key:>20}: {value}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MinHash/LSH index for Jaccard retrieval")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Compute and save MinHash signatures")
+    build.add_argument("--num-perm", type=int, default=NUM_PERM)
+    build.add_argument("--bands", type=int, default=BANDS)
+
+    report = sub.add_parser("report", help="Recall@k of LSH against exact Jaccard on Spider dev")
+    report.add_argument("-k", type=int, default=5)
+    report.add_argument("-n", type=int, default=300, help="Number of dev questions")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        build_lsh_index(args.num_perm, args.bands)
+    else:
+        with open(dev_path, "r") as f:
+            dev_questions = [item["question"] for item in json.load(f)][:args.n]
+        recall_report(dev_questions, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Content-addressed LLM response cache
+
+(backend, model, temperature, 전체 prompt) 의 sha256 → 원본 응답 텍스트
+DATA_DIR/llm_cache.sqlite 하나에 저장, 오래된 항목 / 개수 초과분은 열 때 정리
+
+- --no-cache: 읽지도 쓰지도 않음
+- --refresh-cache: 읽지 않고 새 응답으로 덮어씀
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from paths import DATA_DIR
+
+cache_file = DATA_DIR / "llm_cache.sqlite"
+MAX_ENTRIES = 200000
+MAX_AGE_DAYS = 90
+
+
+def cache_key(backend: str, model: str, temperature, prompt) -> str:
+    """prompt 는 문자열 또는 JSON 으로 직렬화 가능한 요청 (claude content block 등)"""
+    payload = json.dumps([backend, model, temperature, prompt], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+
+    def __init__(self, path=cache_file, max_entries: int = MAX_ENTRIES, max_age_days: float = MAX_AGE_DAYS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                backend TEXT,
+                model TEXT,
+                response TEXT,
+                created_at REAL,
+                accessed_at REAL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at)")
+        self._conn.commit()
+        self.evict()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, backend: str, model: str, response: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, backend, model, response, now, now)
+            )
+            self._conn.commit()
+
+    def evict(self):
+        """max_age_days 보다 오래된 항목 삭제 후, max_entries 초과분은 오래 안 쓴 것부터 삭제"""
+        with self._lock:
+            if self.max_age_days:
+                cutoff = time.time() - self.max_age_days * 86400
+                self._conn.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,))
+            if self.max_entries:
+                self._conn.execute("""
+                    DELETE FROM responses WHERE key IN (
+                        SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                    )""", (self.max_entries,))
+            self._conn.commit()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(cache_file)
+    return _cache
+
+
+def lookup(args, backend: str, model: str, temperature, prompt):
+    """
+    캐시 조회
+
+    :return: (key, 캐시된 응답 텍스트 또는 None). --no-cache 면 key 도 None
+    """
+    if getattr(args, "no_cache", False):
+        return None, None
+    key = cache_key(backend, model, temperature, prompt)
+    if getattr(args, "refresh_cache", False):
+        return key, None
+    return key, get_response_cache().get(key)
+
+
+def store(key, backend: str, model: str, response: str):
+    if key is not None:
+        get_response_cache().put(key, backend, model, response)
@@ -6,9 +6,14 @@ import random
 TRAIN_PATH = Path(__file__).parent / ".." /".." / "spider" / "evaluation_examples" / "examples" / "train_spider.json"
 
 
+train_data = None
+
 def create_random_examples(k: int = 3):
-    with open(TRAIN_PATH, 'r') as f:
-        train_data = json.load(f)
+    # 학습 데이터는 한 번만 로드 (sample 순서는 그대로 random 전역 상태를 따름)
+    global train_data
+    if train_data is None:
+        with open(TRAIN_PATH, 'r') as f:
+            train_data = json.load(f)
     
     samples = random.sample(train_data, k)
 
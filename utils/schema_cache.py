@@ -0,0 +1,72 @@
+"""
+Memoized schema layer
+
+db_id 별로 DDL / 요약 / 테이블 집합을 한 번만 만들어서 프로세스 내 dict 에 보관
+스키마는 utils/schema_catalog.py (tables.json 한 번 로드, 없으면 PRAGMA) 에서 렌더링하고,
+catalog 로 못 읽는 DB 만 SQLAlchemy reflection 으로 fallback
+"""
+
+from dataclasses import dataclass
+import re
+import threading
+
+from utils.RAG_setup import reflect_schema, summarize_ddl
+from utils.schema_catalog import get_database
+
+
+@dataclass(frozen=True)
+class SchemaInfo:
+    db_id: str
+    ddl: str
+    summary: str
+    tables: frozenset
+
+
+_schemas = {}
+_by_text = {}
+_lock = threading.Lock()
+
+
+def parse_tables(ddl: str) -> frozenset:
+    """DDL 에서 테이블명 (소문자) 추출"""
+    tables = re.findall(r'CREATE TABLE ["\']?(\w+)["\']?', ddl, re.IGNORECASE)
+    return frozenset(t.lower() for t in tables)
+
+
+def _remember(info: SchemaInfo) -> SchemaInfo:
+    _schemas[info.db_id] = info
+    _by_text[info.ddl] = info
+    _by_text[info.summary] = info
+    return info
+
+
+def get_schema_info(db_id: str) -> SchemaInfo:
+    """
+    db_id 의 스키마 정보 (DB 당 한 번만 렌더링)
+
+    :return: SchemaInfo(db_id, ddl, summary, tables)
+    """
+    info = _schemas.get(db_id)
+    if info is not None:
+        return info
+
+    with _lock:
+        info = _schemas.get(db_id)
+        if info is not None:
+            return info
+
+        try:
+            db = get_database(db_id)
+        except Exception as e:
+            print(f"Warning: catalog failed for {db_id} ({e}), reflecting instead")
+            ddl = reflect_schema(db_id)
+            return _remember(SchemaInfo(db_id, ddl, summarize_ddl(ddl), parse_tables(ddl)))
+
+        if db is None:
+            return SchemaInfo(db_id, "", summarize_ddl(""), frozenset())
+        return _remember(SchemaInfo(db_id, db.render_ddl(), db.render_summary(), db.table_names()))
+
+
+def lookup_schema(text: str):
+    """이미 로드된 DDL 또는 요약 문자열 → SchemaInfo (없으면 None)"""
+    return _by_text.get(text)
@@ -0,0 +1,190 @@
+"""
+Schema catalog
+
+Spider 의 tables.json 을 한 번에 읽어서 DB 별 테이블/컬럼/FK 를 작은 객체로 보관
+(tables.json 에 없는 DB 는 sqlite PRAGMA table_info / foreign_key_list 로 읽음)
+
+요약 스키마, DDL, 테이블 집합을 모두 여기서 렌더링한다.
+"""
+
+import json
+import re
+import sqlite3
+import threading
+
+from paths import SPIDER_DIR
+
+tables_json_path = SPIDER_DIR / "evaluation_examples" / "examples" / "tables.json"
+spider_db_dir = SPIDER_DIR / "database"
+
+# tables.json column_types → DDL 타입
+SPIDER_TYPES = {
+    "text": "TEXT",
+    "number": "NUMERIC",
+    "time": "DATETIME",
+    "boolean": "BOOLEAN",
+    "others": "BLOB"
+}
+
+
+def quote(name: str) -> str:
+    return name if re.fullmatch(r'\w+', name) else f'"{name}"'
+
+
+def quote_pragma(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class Column:
+    __slots__ = ("name", "type", "primary_key")
+
+    def __init__(self, name: str, type: str = "", primary_key: bool = False):
+        self.name = name
+        self.type = type
+        self.primary_key = primary_key
+
+
+class ForeignKey:
+    __slots__ = ("column", "ref_table", "ref_column")
+
+    def __init__(self, column: str, ref_table: str, ref_column: str):
+        self.column = column
+        self.ref_table = ref_table
+        self.ref_column = ref_column
+
+
+class Table:
+    __slots__ = ("name", "columns", "foreign_keys")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.columns = []
+        self.foreign_keys = []
+
+    def render_ddl(self) -> str:
+        lines = [f"\t{quote(col.name)} {col.type}".rstrip() for col in self.columns]
+        pks = [quote(col.name) for col in self.columns if col.primary_key]
+        if pks:
+            lines.append(f"\tPRIMARY KEY ({', '.join(pks)})")
+        for fk in self.foreign_keys:
+            lines.append(f"\tFOREIGN KEY({quote(fk.column)}) REFERENCES {quote(fk.ref_table)} ({quote(fk.ref_column)})")
+        return f"CREATE TABLE {quote(self.name)} (\n" + ",\n".join(lines) + "\n)"
+
+
+class DatabaseSchema:
+    __slots__ = ("db_id", "tables")
+
+    def __init__(self, db_id: str, tables: list):
+        self.db_id = db_id
+        self.tables = tables
+
+    def table_names(self) -> frozenset:
+        return frozenset(table.name.lower() for table in self.tables)
+
+    def render_summary(self, tables: list = None) -> str:
+        """
+        summarize_schema 와 같은 형식
+            Tables:
+            table(col, col, ...)
+
+            Foreign Keys:
+            table.col = ref_table.ref_col
+        """
+        tables = self.tables if tables is None else tables
+        tables_info = [f"{t.name}({', '.join(col.name for col in t.columns)})" for t in tables if t.columns]
+        fk_info = [f"{t.name}.{fk.column} = {fk.ref_table}.{fk.ref_column}" for t in tables for fk in t.foreign_keys]
+
+        result = "Tables:\n" + "\n".join(tables_info)
+        if fk_info:
+            result += "\n\nForeign Keys:\n" + "\n".join(fk_info)
+        return result
+
+    def render_ddl(self) -> str:
+        return "\n\n".join(table.render_ddl() for table in self.tables)
+
+
+def parse_spider_entry(entry: dict) -> DatabaseSchema:
+    """tables.json 의 DB 하나 → DatabaseSchema"""
+    tables = [Table(name) for name in entry["table_names_original"]]
+    columns = []  # 전체 column index → (table, column)
+    for (table_idx, col_name), col_type in zip(entry["column_names_original"], entry["column_types"]):
+        if table_idx < 0:  # "*"
+            columns.append(None)
+            continue
+        col = Column(col_name, SPIDER_TYPES.get(col_type, col_type.upper()))
+        tables[table_idx].columns.append(col)
+        columns.append((tables[table_idx], col))
+
+    for pk in entry["primary_keys"]:
+        # 복합 PK 는 리스트로 들어있는 버전도 있음
+        for col_idx in (pk if isinstance(pk, list) else [pk]):
+            columns[col_idx][1].primary_key = True
+
+    for from_idx, to_idx in entry["foreign_keys"]:
+        from_table, from_col = columns[from_idx]
+        to_table, to_col = columns[to_idx]
+        from_table.foreign_keys.append(ForeignKey(from_col.name, to_table.name, to_col.name))
+
+    return DatabaseSchema(entry["db_id"], tables)
+
+
+def load_catalog(path=tables_json_path) -> dict:
+    """tables.json 한 번 읽어서 {db_id: DatabaseSchema}"""
+    with open(path, "r") as f:
+        entries = json.load(f)
+    return {entry["db_id"]: parse_spider_entry(entry) for entry in entries}
+
+
+def read_sqlite_schema(db_id: str, db_path) -> DatabaseSchema:
+    """PRAGMA 로 sqlite 파일의 스키마 읽기 (tables.json 에 없는 DB 용)"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        names = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY rowid"
+        )]
+        tables = []
+        for name in names:
+            table = Table(name)
+            for _, col_name, col_type, _, _, pk in conn.execute(f"PRAGMA table_info({quote_pragma(name)})"):
+                table.columns.append(Column(col_name, col_type or "", pk > 0))
+            for row in conn.execute(f"PRAGMA foreign_key_list({quote_pragma(name)})"):
+                ref_table, from_col, to_col = row[2], row[3], row[4]
+                table.foreign_keys.append(ForeignKey(from_col, ref_table, to_col or from_col))
+            tables.append(table)
+    finally:
+        conn.close()
+    return DatabaseSchema(db_id, tables)
+
+
+_catalog = None
+_extra = {}
+_lock = threading.Lock()
+
+
+def get_catalog() -> dict:
+    """tables.json catalog (프로세스당 1회 로드, 파일이 없으면 빈 dict)"""
+    global _catalog
+    if _catalog is None:
+        with _lock:
+            if _catalog is None:
+                _catalog = load_catalog(tables_json_path) if tables_json_path.exists() else {}
+    return _catalog
+
+
+def get_database(db_id: str, db_path=None):
+    """
+    db_id 의 DatabaseSchema (tables.json → 없으면 PRAGMA)
+
+    :return: DatabaseSchema, sqlite 파일도 없으면 None
+    """
+    db = get_catalog().get(db_id) or _extra.get(db_id)
+    if db is not None:
+        return db
+
+    db_path = db_path or spider_db_dir / db_id / f"{db_id}.sqlite"
+    if not db_path.exists():
+        return None
+    with _lock:
+        if db_id not in _extra:
+            _extra[db_id] = read_sqlite_schema(db_id, db_path)
+        return _extra[db_id]
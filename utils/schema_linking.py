@@ -0,0 +1,247 @@
+"""
+Question-aware schema pruning (schema linking)
+
+테이블 / 컬럼 이름을 질문과 비교해서 순위를 매기고, 토큰 예산 안에서 요약 스키마를 다시 렌더링
+
+1. DB 별 index (처음 쓸 때 한 번 만들고 프로세스 내 dict 에 보관)
+   - lexical: 이름을 단어로 쪼갠 집합 (snake_case / camelCase, 복수형 s 제거)
+   - embedding: "table" / "table column" 문자열의 bge 임베딩 (INDEX_DIR/schema_linking/{db_id}.npy 에 저장)
+2. 점수: LEXICAL_WEIGHT * (질문과 겹치는 이름 단어 비율) + (1 - LEXICAL_WEIGHT) * cosine
+   테이블 점수는 테이블 자체와 그 컬럼 점수 중 최댓값
+3. 점수 순으로 테이블을 추가하면서 이미 고른 테이블과 FK 로 이어지는 최단 경로의 테이블도 함께 추가
+   (join 경로가 끊기지 않도록), 렌더링 결과가 예산을 넘는 테이블은 건너뜀
+   예산이 남으면 점수가 낮은 테이블도 들어감 (recall 우선, 예산이 곧 상한)
+4. 컬럼이 많은 테이블은 PK / FK 컬럼 + 점수 상위 MAX_COLUMNS 개만
+
+전체 요약이 이미 예산 안이면 그대로 (작은 Spider DB 는 결과가 바뀌지 않음)
+
+사용:
+    schema_for_prompt(question, schema, budget)   # models / claude_integration
+    prune_schema(question, db_id, budget)         # → PrunedSchema(summary, ddl, tables)
+"""
+
+from collections import deque
+import hashlib
+import re
+import threading
+
+import numpy as np
+
+from paths import INDEX_DIR
+from utils.RAG_setup import summarize_schema
+from utils.schema_catalog import Table, get_database
+from utils.schema_cache import lookup_schema
+from utils.token_count import count_tokens
+
+schema_linking_dir = INDEX_DIR / "schema_linking"
+LEXICAL_WEIGHT = 0.5
+MAX_COLUMNS = 12
+STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "and", "or", "by", "with", "is", "are", "was", "were",
+    "what", "which", "who", "whom", "how", "many", "much", "list", "show", "give", "find", "return", "all",
+    "each", "every", "that", "than", "their", "its", "do", "does", "did", "have", "has", "there", "me", "from"
+}
+
+
+def name_words(name: str) -> list:
+    """'singerId' / 'Singer_ID' → ['singer', 'id']"""
+    name = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", name)
+    return [w.lower() for w in re.split(r"[^A-Za-z0-9]+", name) if w]
+
+
+def stem(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def question_terms(question: str) -> set:
+    return {stem(w) for w in name_words(question) if w not in STOPWORDS}
+
+
+class PrunedSchema:
+    __slots__ = ("summary", "ddl", "tables")
+
+    def __init__(self, summary: str, ddl: str, tables: list):
+        self.summary = summary
+        self.ddl = ddl
+        self.tables = tables
+
+
+class SchemaIndex:
+    """DB 하나의 테이블 / 컬럼 이름 index"""
+
+    def __init__(self, db, use_embeddings: bool = True):
+        self.db = db
+        # element: (table index, column index 또는 None)
+        self.elements = []
+        texts = []
+        for t, table in enumerate(db.tables):
+            self.elements.append((t, None))
+            texts.append(" ".join(name_words(table.name)))
+            for c, col in enumerate(table.columns):
+                self.elements.append((t, c))
+                texts.append(" ".join(name_words(table.name) + name_words(col.name)))
+        self.terms = [{stem(w) for w in text.split()} for text in texts]
+        # 컬럼은 테이블명 없이 컬럼명만으로도 비교 ("singer name" vs "name")
+        self.column_terms = [
+            {stem(w) for w in name_words(db.tables[t].columns[c].name)} if c is not None else self.terms[i]
+            for i, (t, c) in enumerate(self.elements)
+        ]
+        self.vectors = self._load_vectors(texts) if use_embeddings else None
+        self.neighbors = self._fk_graph()
+
+    def _load_vectors(self, texts: list):
+        """이름 임베딩 (DB 이름 목록이 같으면 디스크에서 재사용)"""
+        digest = hashlib.sha1("\n".join(texts).encode("utf-8")).hexdigest()[:16]
+        path = schema_linking_dir / f"{self.db.db_id}-{digest}.npy"
+        if path.exists():
+            return np.load(path)
+        try:
+            from utils.embeddings import get_embedding_service
+            vectors = get_embedding_service().encode_many(texts)
+        except Exception as e:
+            print(f"Warning: schema linking embeddings unavailable ({e}), using names only")
+            return None
+        schema_linking_dir.mkdir(parents=True, exist_ok=True)
+        np.save(path, vectors)
+        return vectors
+
+    def _fk_graph(self) -> dict:
+        by_name = {table.name.lower(): t for t, table in enumerate(self.db.tables)}
+        neighbors = {t: set() for t in range(len(self.db.tables))}
+        for t, table in enumerate(self.db.tables):
+            for fk in table.foreign_keys:
+                ref = by_name.get(fk.ref_table.lower())
+                if ref is not None and ref != t:
+                    neighbors[t].add(ref)
+                    neighbors[ref].add(t)
+        return neighbors
+
+    def scores(self, question: str) -> np.ndarray:
+        """element 별 점수"""
+        terms = question_terms(question)
+        lexical = np.array([
+            max(len(terms & element) / len(element) if element else 0.0,
+                len(terms & column) / len(column) if column else 0.0)
+            for element, column in zip(self.terms, self.column_terms)
+        ], dtype=np.float32)
+        if self.vectors is None:
+            return lexical
+        try:
+            from utils.embeddings import get_embedding_service
+            semantic = self.vectors @ get_embedding_service().encode(question)
+        except Exception as e:
+            # 캐시된 이름 임베딩은 있지만 encoder 를 못 쓰는 경우 (오프라인 등) - 이후로는 이름만
+            print(f"Warning: schema linking embeddings unavailable ({e}), using names only")
+            self.vectors = None
+            return lexical
+        return LEXICAL_WEIGHT * lexical + (1 - LEXICAL_WEIGHT) * semantic
+
+    def join_path(self, start: int, targets: set) -> list:
+        """start 에서 targets 중 가장 가까운 테이블까지의 FK 경로 (start, target 제외), 연결 안 되면 []"""
+        previous = {start: None}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            if node in targets and node != start:
+                path = []
+                node = previous[node]
+                while node is not None and node != start:
+                    path.append(node)
+                    node = previous[node]
+                return path
+            for nxt in sorted(self.neighbors[node]):
+                if nxt not in previous:
+                    previous[nxt] = node
+                    queue.append(nxt)
+        return []
+
+    def prune(self, question: str, budget: int) -> PrunedSchema:
+        full = self.db.render_summary()
+        if not budget or count_tokens(full) <= budget:
+            return PrunedSchema(full, self.db.render_ddl(), list(self.db.tables))
+
+        scores = self.scores(question)
+        table_scores = np.full(len(self.db.tables), -np.inf, dtype=np.float32)
+        column_scores = {}
+        for (t, c), score in zip(self.elements, scores):
+            table_scores[t] = max(table_scores[t], score)
+            if c is not None:
+                column_scores[(t, c)] = score
+        ranked = sorted(range(len(self.db.tables)), key=lambda t: (-table_scores[t], t))
+
+        selected = []
+        for t in ranked:
+            if t in selected:
+                continue
+            candidate = selected + [p for p in self.join_path(t, set(selected)) if p not in selected] + [t]
+            rendered = self.render(candidate, column_scores)
+            if not selected or count_tokens(rendered.summary) <= budget:
+                selected = candidate
+        return self.render(selected, column_scores)
+
+    def render(self, selected: list, column_scores: dict) -> PrunedSchema:
+        """선택된 테이블 (원래 순서) 을 컬럼 pruning 해서 렌더링, FK 는 선택된 테이블 사이만"""
+        names = {self.db.tables[t].name.lower() for t in selected}
+        tables = []
+        for t in sorted(selected):
+            source = self.db.tables[t]
+            fks = [fk for fk in source.foreign_keys if fk.ref_table.lower() in names]
+            keep = set(range(len(source.columns)))
+            if len(source.columns) > MAX_COLUMNS:
+                keys = {fk.column.lower() for fk in fks}
+                keys |= {fk.ref_column.lower() for other in selected
+                         for fk in self.db.tables[other].foreign_keys if fk.ref_table.lower() == source.name.lower()}
+                required = {c for c, col in enumerate(source.columns) if col.primary_key or col.name.lower() in keys}
+                ranked = sorted(range(len(source.columns)), key=lambda c: -column_scores.get((t, c), 0.0))
+                keep = required | set(ranked[:MAX_COLUMNS])
+            table = Table(source.name)
+            table.columns = [col for c, col in enumerate(source.columns) if c in keep]
+            kept = {col.name.lower() for col in table.columns}
+            table.foreign_keys = [fk for fk in fks if fk.column.lower() in kept]
+            tables.append(table)
+        summary = self.db.render_summary(tables)
+        ddl = "\n\n".join(table.render_ddl() for table in tables)
+        return PrunedSchema(summary, ddl, tables)
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def get_schema_index(db_id: str):
+    """db_id 의 SchemaIndex (프로세스당 1회), DB 를 찾을 수 없으면 None"""
+    index = _indexes.get(db_id)
+    if index is not None:
+        return index
+    with _lock:
+        if db_id not in _indexes:
+            db = get_database(db_id)
+            if db is None:
+                return None
+            _indexes[db_id] = SchemaIndex(db)
+        return _indexes[db_id]
+
+
+def prune_schema(question: str, db_id: str, budget: int):
+    """질문에 맞춰 budget 토큰 안으로 줄인 스키마 (DB 를 찾을 수 없으면 None)"""
+    index = get_schema_index(db_id)
+    if index is None:
+        return None
+    return index.prune(question, budget)
+
+
+def schema_for_prompt(question: str, schema: str, budget: int = 0) -> str:
+    """
+    prompt 에 넣을 요약 스키마
+
+    budget 이 없거나 schema (DDL / 요약) 의 DB 를 모르면 summarize_schema 와 같음
+    """
+    info = lookup_schema(schema)
+    if not budget or info is None:
+        return summarize_schema(schema)
+    pruned = prune_schema(question, info.db_id, budget)
+    return pruned.summary if pruned is not None else summarize_schema(schema)
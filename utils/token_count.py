@@ -0,0 +1,72 @@
+"""
+Prompt / token accounting
+
+prompt 를 instructions / schema / examples / question 으로 나눠서 글자 수와 토큰 수를 센다
+- 부분별 토큰 수는 항상 로컬 추정 (tiktoken 이 있으면 cl100k_base, 없으면 단어/기호 단위 regex)
+- prompt 전체 / completion 토큰은 backend 가 알려주면 그 값 (Claude usage, Ollama prompt_eval_count / eval_count)
+"""
+
+import re
+import threading
+
+PARTS = ["instructions", "schema", "examples", "question"]
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+_encoding = None  # None: 아직 로드 전, False: tiktoken 없음 (regex 사용)
+_encoding_lock = threading.Lock()
+
+
+def get_encoding():
+    """cl100k_base encoding (tiktoken 은 처음 셀 때 import, 없거나 로드 실패면 None)"""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception:  # optional (미설치 / 오프라인에서 encoding 다운로드 실패)
+                    _encoding = False
+    return _encoding or None
+
+
+def tokenizer_name() -> str:
+    return "cl100k_base" if get_encoding() is not None else "regex"
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def prompt_accounting(parts: dict) -> dict:
+    """{part: text} → {part: {"chars", "tokens"}} (로컬 tokenizer)"""
+    return {part: {"chars": len(parts.get(part, "")), "tokens": count_tokens(parts.get(part, ""))}
+            for part in PARTS}
+
+
+def token_record(parts: dict, completion_text: str, prompt_tokens: int = None,
+                 completion_tokens: int = None, seconds: float = None) -> dict:
+    """
+    예제 하나의 토큰 기록
+
+    :param prompt_tokens / completion_tokens: backend 가 알려준 값 (None 이면 로컬 tokenizer 로 셈)
+    :param seconds: 생성 시간 (tokens/s 계산용, 캐시 hit 이면 None)
+    """
+    accounting = prompt_accounting(parts)
+    source = "backend" if prompt_tokens is not None else tokenizer_name()
+    if prompt_tokens is None:
+        prompt_tokens = sum(entry["tokens"] for entry in accounting.values())
+    if completion_tokens is None:
+        completion_tokens = count_tokens(completion_text)
+    return {
+        "parts": accounting,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "tokens_per_second": completion_tokens / seconds if seconds else None,
+        "source": source
+    }